@@ -5,37 +5,30 @@ import smtplib
 import random
 import threading
 import time
+import queue
+import atexit
+from contextlib import contextmanager
 from email.mime.text import MIMEText
 from datetime import datetime, timedelta
 from decimal import Decimal, getcontext
+import importlib
+import importlib.util
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog, simpledialog
 
-# optional libs
-try:
-    import pandas as pd
-except Exception:
-    pd = None
-try:
-    import matplotlib
-    matplotlib.use("TkAgg")
-    from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-    import matplotlib.pyplot as plt
-except Exception:
-    matplotlib = None
-    FigureCanvasTkAgg = None
-    plt = None
-try:
-    from openpyxl import Workbook
-except Exception:
-    Workbook = None
-try:
-    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
-    from reportlab.lib.pagesizes import landscape, letter
-    from reportlab.lib import colors
-    from reportlab.lib.styles import getSampleStyleSheet
-except Exception:
-    SimpleDocTemplate = None
+# optional libs (openpyxl, reportlab, matplotlib) are imported on first use, not at startup
+def _optional(name, package=None):
+    try:
+        return importlib.import_module(name)
+    except ImportError:
+        raise RuntimeError(f"{package or name.split('.')[0]} tidak terpasang")
+
+def _chart_backend():
+    # (Figure, FigureCanvasTkAgg) or None; matplotlib.figure is enough, pyplot is not needed
+    try:
+        return _optional("matplotlib.figure").Figure, _optional("matplotlib.backends.backend_tkagg").FigureCanvasTkAgg
+    except RuntimeError:
+        return None
 
 getcontext().prec = 28
 
@@ -61,6 +54,11 @@ OTP_TTL_SECONDS = 600
 DB_MAX_RETRIES = 5
 DB_RETRY_BACKOFF = 0.12  # seconds, multiplied each retry
 
+# DB connection pool
+DB_POOL_SIZE = 4
+DB_POOL_TIMEOUT = 30
+DB_POOL_HEALTHCHECK_INTERVAL = 60  # seconds idle before a pooled connection is re-checked
+
 # ---------------- Utilities ----------------
 def hash_password(pw: str) -> str:
     return hashlib.sha256(pw.encode('utf-8')).hexdigest()
@@ -79,17 +77,148 @@ def moneyfmt(x):
         return str(x)
 
 # ---------------- DB Helper ----------------
+class ConnectionPool:
+    """
+    Pool of long-lived sqlite3 connections.
+    A thread that already holds a connection gets the same one back, so nested
+    helper calls share one connection (and one transaction). Otherwise the most
+    recently used idle connection is reused, or a new one is opened while the
+    pool is below `size`; beyond that callers wait up to `timeout` seconds.
+    """
+    def __init__(self, factory, size=DB_POOL_SIZE, timeout=DB_POOL_TIMEOUT,
+                 healthcheck_interval=DB_POOL_HEALTHCHECK_INTERVAL):
+        self.factory = factory
+        self.size = max(1, int(size))
+        self.timeout = timeout
+        self.healthcheck_interval = healthcheck_interval
+        self._idle = queue.LifoQueue()
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._opened = 0
+        self._closed = False
+
+    def acquire(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            self._local.depth += 1
+            return conn
+        conn = self._checkout()
+        self._local.conn = conn
+        self._local.depth = 1
+        return conn
+
+    def release(self, conn):
+        if getattr(self._local, 'conn', None) is not conn:
+            raise RuntimeError("Koneksi tidak dipegang oleh thread ini")
+        self._local.depth -= 1
+        if self._local.depth > 0:
+            return
+        self._local.conn = None
+        if self._closed:
+            self._discard(conn)
+        else:
+            self._idle.put((conn, time.monotonic()))
+
+    def depth(self):
+        # how many nested acquire() calls the current thread has open
+        return getattr(self._local, 'depth', 0) if getattr(self._local, 'conn', None) is not None else 0
+
+    def close(self):
+        # close idle connections now; connections still in use are closed on release
+        self._closed = True
+        while True:
+            try:
+                conn, _ = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(conn)
+
+    def _checkout(self):
+        deadline = time.monotonic() + self.timeout
+        while True:
+            if self._closed:
+                raise RuntimeError("Connection pool sudah ditutup")
+            try:
+                conn, last_used = self._idle.get_nowait()
+            except queue.Empty:
+                conn = self._open_if_room()
+                if conn is not None:
+                    return conn
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise sqlite3.OperationalError("Semua koneksi database sedang dipakai (pool habis)")
+                try:
+                    conn, last_used = self._idle.get(timeout=remaining)
+                except queue.Empty:
+                    continue
+            if time.monotonic() - last_used > self.healthcheck_interval and not self._healthy(conn):
+                self._discard(conn)
+                continue
+            return conn
+
+    def _open_if_room(self):
+        with self._lock:
+            if self._opened >= self.size:
+                return None
+            self._opened += 1
+        try:
+            return self.factory()
+        except Exception:
+            with self._lock:
+                self._opened -= 1
+            raise
+
+    def _healthy(self, conn):
+        try:
+            conn.execute("SELECT 1").fetchone()
+            return not conn.in_transaction
+        except sqlite3.Error:
+            return False
+
+    def _discard(self, conn):
+        with self._lock:
+            self._opened -= 1
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+
 class DBHelper:
-    def __init__(self, filename=DB_FILENAME):
+    def __init__(self, filename=DB_FILENAME, pool_size=DB_POOL_SIZE):
         self.filename = filename
+        self.pool = ConnectionPool(self.connect, size=pool_size)
         # Ensure DB file exists + schema
         self.init_db_if_needed()
+        atexit.register(self.close)
 
     def connect(self):
-        # each operation creates its own connection; superior for multi-threading
-        # set timeout to give SQLite time to unlock
+        # raw connection factory used by the pool; timeout gives SQLite time to unlock
         return sqlite3.connect(self.filename, timeout=30, check_same_thread=False)
 
+    @contextmanager
+    def connection(self):
+        """
+        Borrow a pooled connection. The outermost holder on a thread commits on
+        success and rolls back on error (same as the old `with connect()` blocks);
+        nested holders leave that to the outermost one.
+        """
+        conn = self.pool.acquire()
+        outermost = self.pool.depth() == 1
+        try:
+            yield conn
+            if outermost and conn.in_transaction:
+                conn.commit()
+        except BaseException:
+            if outermost and conn.in_transaction:
+                conn.rollback()
+            raise
+        finally:
+            self.pool.release(conn)
+
+    def close(self):
+        self.pool.close()
+
     def _retry_execute(self, func, *args, **kwargs):
         backoff = DB_RETRY_BACKOFF
         for attempt in range(1, DB_MAX_RETRIES + 1):
@@ -105,8 +234,14 @@ class DBHelper:
     def init_db_if_needed(self):
         need_init = not os.path.exists(self.filename)
         # Use explicit connection for init
-        with self.connect() as conn:
+        with self.connection() as conn:
             cur = conn.cursor()
+            # project_refactor migrates the file in place; from version 3 amounts
+            # are integer sen and this module would write rupiah into them
+            version = cur.execute("PRAGMA user_version").fetchone()[0]
+            if version >= 3:
+                raise RuntimeError(f"Database {self.filename} sudah dimigrasi (versi {version}); "
+                                   "jalankan project_refactor/app.py.")
             # users
             cur.execute("""
                 CREATE TABLE IF NOT EXISTS users (
@@ -159,7 +294,7 @@ class DBHelper:
     # Generic helpers
     def execute(self, sql, params=(), commit=False):
         def _do():
-            with self.connect() as conn:
+            with self.connection() as conn:
                 cur = conn.cursor()
                 cur.execute(sql, params)
                 if commit:
@@ -170,7 +305,7 @@ class DBHelper:
 
     def fetchall(self, sql, params=()):
         def _do():
-            with self.connect() as conn:
+            with self.connection() as conn:
                 cur = conn.cursor()
                 cur.execute(sql, params)
                 rows = cur.fetchall()
@@ -179,7 +314,7 @@ class DBHelper:
 
     def fetchone(self, sql, params=()):
         def _do():
-            with self.connect() as conn:
+            with self.connection() as conn:
                 cur = conn.cursor()
                 cur.execute(sql, params)
                 row = cur.fetchone()
@@ -319,35 +454,26 @@ def apply_adjustments():
     backoff = DB_RETRY_BACKOFF
     for attempt in range(1, DB_MAX_RETRIES + 1):
         try:
-            conn = db.connect()
-            cur = conn.cursor()
-            cur.execute("BEGIN")
-            cur.execute("SELECT id, tanggal, akun_debit, akun_kredit, debit, kredit, keterangan FROM adjusting WHERE applied=0")
-            rows = cur.fetchall()
-            if not rows:
+            # pooled connection; rolled back by db.connection() if anything below fails
+            with db.connection() as conn:
+                cur = conn.cursor()
+                cur.execute("BEGIN")
+                cur.execute("SELECT id, tanggal, akun_debit, akun_kredit, debit, kredit, keterangan FROM adjusting WHERE applied=0")
+                rows = cur.fetchall()
+                if not rows:
+                    cur.execute("COMMIT")
+                    return 0
+                today = datetime.now().strftime("%Y-%m-%d")
+                applied = 0
+                for _id, tanggal, ad, ak, d, k, ket in rows:
+                    note = f"{ket} (Penyesuaian from {tanggal})" if ket else f"Penyesuaian from {tanggal}"
+                    cur.execute("""INSERT INTO jurnal (tanggal, akun_debit, akun_kredit, debit, kredit, keterangan)
+                                   VALUES (?, ?, ?, ?, ?, ?)""", (today, ad, ak, float(d), float(k), note))
+                    cur.execute("UPDATE adjusting SET applied=1 WHERE id=?", (_id,))
+                    applied += 1
                 cur.execute("COMMIT")
-                conn.close()
-                return 0
-            today = datetime.now().strftime("%Y-%m-%d")
-            applied = 0
-            for _id, tanggal, ad, ak, d, k, ket in rows:
-                note = f"{ket} (Penyesuaian from {tanggal})" if ket else f"Penyesuaian from {tanggal}"
-                cur.execute("""INSERT INTO jurnal (tanggal, akun_debit, akun_kredit, debit, kredit, keterangan)
-                               VALUES (?, ?, ?, ?, ?, ?)""", (today, ad, ak, float(d), float(k), note))
-                cur.execute("UPDATE adjusting SET applied=1 WHERE id=?", (_id,))
-                applied += 1
-            cur.execute("COMMIT")
-            conn.close()
-            return applied
+                return applied
         except sqlite3.OperationalError as e:
-            try:
-                conn.rollback()
-            except Exception:
-                pass
-            try:
-                conn.close()
-            except Exception:
-                pass
             if "locked" in str(e).lower() and attempt < DB_MAX_RETRIES:
                 time.sleep(backoff)
                 backoff *= 1.8
@@ -479,8 +605,7 @@ def compute_financial_statements(include_adjustments=False):
 
 # ---------------- Export helpers ----------------
 def export_trial_to_excel(path, include_adjustments=False):
-    if Workbook is None:
-        raise RuntimeError("openpyxl tidak terpasang")
+    Workbook = _optional("openpyxl").Workbook
     rows = compute_trial_rows(include_adjustments)
     wb = Workbook(); ws = wb.active; ws.title = "Neraca Saldo"
     ws.append(["No Akun","Nama","Tipe","Debit","Kredit"])
@@ -489,8 +614,7 @@ def export_trial_to_excel(path, include_adjustments=False):
     wb.save(path)
 
 def export_journal_to_excel(path):
-    if Workbook is None:
-        raise RuntimeError("openpyxl tidak terpasang")
+    Workbook = _optional("openpyxl").Workbook
     rows = list_journal_entries()
     wb = Workbook(); ws = wb.active; ws.title = "Jurnal"
     ws.append(["ID","Tanggal","Akun Debit","Akun Kredit","Debit","Kredit","Keterangan"])
@@ -499,8 +623,7 @@ def export_journal_to_excel(path):
     wb.save(path)
 
 def export_adjusting_to_excel(path):
-    if Workbook is None:
-        raise RuntimeError("openpyxl tidak terpasang")
+    Workbook = _optional("openpyxl").Workbook
     rows = db.fetchall("SELECT id, tanggal, akun_debit, akun_kredit, debit, kredit, keterangan, applied FROM adjusting ORDER BY tanggal, id")
     wb = Workbook(); ws = wb.active; ws.title = "Penyesuaian"
     ws.append(["ID","Tanggal","Akun Debit","Akun Kredit","Debit","Kredit","Keterangan","Applied"])
@@ -509,8 +632,11 @@ def export_adjusting_to_excel(path):
     wb.save(path)
 
 def export_reports_to_pdf(path, include_adjustments=True):
-    if SimpleDocTemplate is None:
-        raise RuntimeError("reportlab tidak terpasang")
+    _optional("reportlab")
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
+    from reportlab.lib.pagesizes import landscape, letter
+    from reportlab.lib import colors
+    from reportlab.lib.styles import getSampleStyleSheet
     income, balance, eq_rec = compute_financial_statements(include_adjustments=include_adjustments)
     doc = SimpleDocTemplate(path, pagesize=landscape(letter))
     styles = getSampleStyleSheet()
@@ -554,8 +680,7 @@ def export_reports_to_pdf(path, include_adjustments=True):
     doc.build(story)
 
 def export_reports_to_excel(path, include_adjustments=True):
-    if Workbook is None:
-        raise RuntimeError("openpyxl tidak terpasang")
+    Workbook = _optional("openpyxl").Workbook
     income, balance, eq_rec = compute_financial_statements(include_adjustments=include_adjustments)
     wb = Workbook()
     ws1 = wb.active; ws1.title = "Laba Rugi"
@@ -838,6 +963,7 @@ class MainApp(tk.Tk):
         self.nb.add(self.tab_trial_adj, text="Neraca Setelah Penyesuaian")
         self.nb.add(self.tab_reports, text="Laporan Keuangan")
         self.nb.add(self.tab_dashboard, text="Dashboard")
+        self.nb.bind("<<NotebookTabChanged>>", lambda e: self.draw_dashboard())
         # build tabs
         self.build_accounts_tab(); self.build_journal_tab(); self.build_ledger_tab()
         self.build_trial_tab(); self.build_adjust_tab(); self.build_trial_adj_tab(); self.build_reports_tab(); self.build_dashboard_tab()
@@ -1048,17 +1174,24 @@ class MainApp(tk.Tk):
         self.card3 = tk.Frame(cards_frame, bg=CARD_BG, bd=1, relief='flat'); self.card3.pack(side='left', fill='both', expand=True, padx=8, pady=8)
         tk.Label(self.card3, text="Solvabilitas (Debt-to-Equity)", bg=CARD_BG, fg=COLOR_PRIMARY, font=("Segoe UI", 12, "bold")).pack(anchor='nw', padx=12, pady=8)
         self.canvas3 = None
-        if plt and FigureCanvasTkAgg:
-            self.fig1 = plt.Figure(figsize=(4,2)); self.ax1 = self.fig1.add_subplot(111)
-            self.canvas1 = FigureCanvasTkAgg(self.fig1, master=self.card1); self.canvas1.get_tk_widget().pack(fill='both', expand=True, padx=8, pady=6)
-            self.fig2 = plt.Figure(figsize=(4,2)); self.ax2 = self.fig2.add_subplot(111)
-            self.canvas2 = FigureCanvasTkAgg(self.fig2, master=self.card2); self.canvas2.get_tk_widget().pack(fill='both', expand=True, padx=8, pady=6)
-            self.fig3 = plt.Figure(figsize=(4,2)); self.ax3 = self.fig3.add_subplot(111)
-            self.canvas3 = FigureCanvasTkAgg(self.fig3, master=self.card3); self.canvas3.get_tk_widget().pack(fill='both', expand=True, padx=8, pady=6)
-        else:
-            tk.Label(self.card1, text="matplotlib tidak tersedia", bg=CARD_BG).pack()
-            tk.Label(self.card2, text="matplotlib tidak tersedia", bg=CARD_BG).pack()
-            tk.Label(self.card3, text="matplotlib tidak tersedia", bg=CARD_BG).pack()
+        # charts are created the first time the tab is shown (see draw_dashboard)
+        self._charts_built = False
+
+    def _build_charts(self):
+        # matplotlib is only imported here, not at startup
+        self._charts_built = True
+        backend = _chart_backend()
+        if backend is None:
+            for card in (self.card1, self.card2, self.card3):
+                tk.Label(card, text="matplotlib tidak tersedia", bg=CARD_BG).pack()
+            return
+        Figure, FigureCanvasTkAgg = backend
+        self.fig1 = Figure(figsize=(4,2)); self.ax1 = self.fig1.add_subplot(111)
+        self.canvas1 = FigureCanvasTkAgg(self.fig1, master=self.card1); self.canvas1.get_tk_widget().pack(fill='both', expand=True, padx=8, pady=6)
+        self.fig2 = Figure(figsize=(4,2)); self.ax2 = self.fig2.add_subplot(111)
+        self.canvas2 = FigureCanvasTkAgg(self.fig2, master=self.card2); self.canvas2.get_tk_widget().pack(fill='both', expand=True, padx=8, pady=6)
+        self.fig3 = Figure(figsize=(4,2)); self.ax3 = self.fig3.add_subplot(111)
+        self.canvas3 = FigureCanvasTkAgg(self.fig3, master=self.card3); self.canvas3.get_tk_widget().pack(fill='both', expand=True, padx=8, pady=6)
 
     # Debounced refresh to avoid UI lag
     def debounce_refresh(self, delay=0.15):
@@ -1122,6 +1255,11 @@ class MainApp(tk.Tk):
             print("Error refresh_reports:", e)
 
     def draw_dashboard(self):
+        # hidden dashboard: nothing to draw; it is drawn when its tab is selected
+        if self.nb.select() != str(self.tab_dashboard):
+            return
+        if not self._charts_built:
+            self._build_charts()
         try:
             stats = prepare_balance_and_ratios(include_adjustments=False)
             aset = float(stats['assets']); liab = float(stats['liabilities'])
@@ -1221,11 +1359,8 @@ def main():
     db.init_db_if_needed()
     if not SMTP_EMAIL or not SMTP_PASSWORD:
         print("NOTE: SMTP kosong - OTP tidak terkirim email; OTP ditampilkan di console saat register.")
-    missing = []
-    if pd is None: missing.append("pandas")
-    if matplotlib is None or plt is None: missing.append("matplotlib")
-    if Workbook is None: missing.append("openpyxl")
-    if SimpleDocTemplate is None: missing.append("reportlab")
+    # find_spec only checks that they are installed, without importing them
+    missing = [m for m in ("matplotlib", "openpyxl", "reportlab") if importlib.util.find_spec(m) is None]
     if missing: print("Optional modules missing:", ", ".join(missing))
 
     root = tk.Tk(); root.withdraw()
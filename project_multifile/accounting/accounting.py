@@ -61,35 +61,26 @@ def apply_adjustments():
     backoff = DB_RETRY_BACKOFF
     for attempt in range(1, DB_MAX_RETRIES + 1):
         try:
-            conn = db.connect()
-            cur = conn.cursor()
-            cur.execute("BEGIN")
-            cur.execute("SELECT id, tanggal, akun_debit, akun_kredit, debit, kredit, keterangan FROM adjusting WHERE applied=0")
-            rows = cur.fetchall()
-            if not rows:
+            # pooled connection; rolled back by db.connection() if anything below fails
+            with db.connection() as conn:
+                cur = conn.cursor()
+                cur.execute("BEGIN")
+                cur.execute("SELECT id, tanggal, akun_debit, akun_kredit, debit, kredit, keterangan FROM adjusting WHERE applied=0")
+                rows = cur.fetchall()
+                if not rows:
+                    cur.execute("COMMIT")
+                    return 0
+                today = datetime.now().strftime("%Y-%m-%d")
+                applied = 0
+                for _id, tanggal, ad, ak, d, k, ket in rows:
+                    note = f"{ket} (Penyesuaian from {tanggal})" if ket else f"Penyesuaian from {tanggal}"
+                    cur.execute("""INSERT INTO jurnal (tanggal, akun_debit, akun_kredit, debit, kredit, keterangan)
+                                   VALUES (?, ?, ?, ?, ?, ?)""", (today, ad, ak, float(d), float(k), note))
+                    cur.execute("UPDATE adjusting SET applied=1 WHERE id=?", (_id,))
+                    applied += 1
                 cur.execute("COMMIT")
-                conn.close()
-                return 0
-            today = datetime.now().strftime("%Y-%m-%d")
-            applied = 0
-            for _id, tanggal, ad, ak, d, k, ket in rows:
-                note = f"{ket} (Penyesuaian from {tanggal})" if ket else f"Penyesuaian from {tanggal}"
-                cur.execute("""INSERT INTO jurnal (tanggal, akun_debit, akun_kredit, debit, kredit, keterangan)
-                               VALUES (?, ?, ?, ?, ?, ?)""", (today, ad, ak, float(d), float(k), note))
-                cur.execute("UPDATE adjusting SET applied=1 WHERE id=?", (_id,))
-                applied += 1
-            cur.execute("COMMIT")
-            conn.close()
-            return applied
+                return applied
         except sqlite3.OperationalError as e:
-            try:
-                conn.rollback()
-            except Exception:
-                pass
-            try:
-                conn.close()
-            except Exception:
-                pass
             if "locked" in str(e).lower() and attempt < DB_MAX_RETRIES:
                 time.sleep(backoff)
                 backoff *= 1.8
@@ -1,15 +1,146 @@
 # ---------------- DB Helper ----------------
+class ConnectionPool:
+    """
+    Pool of long-lived sqlite3 connections.
+    A thread that already holds a connection gets the same one back, so nested
+    helper calls share one connection (and one transaction). Otherwise the most
+    recently used idle connection is reused, or a new one is opened while the
+    pool is below `size`; beyond that callers wait up to `timeout` seconds.
+    """
+    def __init__(self, factory, size=DB_POOL_SIZE, timeout=DB_POOL_TIMEOUT,
+                 healthcheck_interval=DB_POOL_HEALTHCHECK_INTERVAL):
+        self.factory = factory
+        self.size = max(1, int(size))
+        self.timeout = timeout
+        self.healthcheck_interval = healthcheck_interval
+        self._idle = queue.LifoQueue()
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._opened = 0
+        self._closed = False
+
+    def acquire(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            self._local.depth += 1
+            return conn
+        conn = self._checkout()
+        self._local.conn = conn
+        self._local.depth = 1
+        return conn
+
+    def release(self, conn):
+        if getattr(self._local, 'conn', None) is not conn:
+            raise RuntimeError("Koneksi tidak dipegang oleh thread ini")
+        self._local.depth -= 1
+        if self._local.depth > 0:
+            return
+        self._local.conn = None
+        if self._closed:
+            self._discard(conn)
+        else:
+            self._idle.put((conn, time.monotonic()))
+
+    def depth(self):
+        # how many nested acquire() calls the current thread has open
+        return getattr(self._local, 'depth', 0) if getattr(self._local, 'conn', None) is not None else 0
+
+    def close(self):
+        # close idle connections now; connections still in use are closed on release
+        self._closed = True
+        while True:
+            try:
+                conn, _ = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(conn)
+
+    def _checkout(self):
+        deadline = time.monotonic() + self.timeout
+        while True:
+            if self._closed:
+                raise RuntimeError("Connection pool sudah ditutup")
+            try:
+                conn, last_used = self._idle.get_nowait()
+            except queue.Empty:
+                conn = self._open_if_room()
+                if conn is not None:
+                    return conn
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise sqlite3.OperationalError("Semua koneksi database sedang dipakai (pool habis)")
+                try:
+                    conn, last_used = self._idle.get(timeout=remaining)
+                except queue.Empty:
+                    continue
+            if time.monotonic() - last_used > self.healthcheck_interval and not self._healthy(conn):
+                self._discard(conn)
+                continue
+            return conn
+
+    def _open_if_room(self):
+        with self._lock:
+            if self._opened >= self.size:
+                return None
+            self._opened += 1
+        try:
+            return self.factory()
+        except Exception:
+            with self._lock:
+                self._opened -= 1
+            raise
+
+    def _healthy(self, conn):
+        try:
+            conn.execute("SELECT 1").fetchone()
+            return not conn.in_transaction
+        except sqlite3.Error:
+            return False
+
+    def _discard(self, conn):
+        with self._lock:
+            self._opened -= 1
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+
 class DBHelper:
-    def __init__(self, filename=DB_FILENAME):
+    def __init__(self, filename=DB_FILENAME, pool_size=DB_POOL_SIZE):
         self.filename = filename
+        self.pool = ConnectionPool(self.connect, size=pool_size)
         # Ensure DB file exists + schema
         self.init_db_if_needed()
+        atexit.register(self.close)
 
     def connect(self):
-        # each operation creates its own connection; superior for multi-threading
-        # set timeout to give SQLite time to unlock
+        # raw connection factory used by the pool; timeout gives SQLite time to unlock
         return sqlite3.connect(self.filename, timeout=30, check_same_thread=False)
 
+    @contextmanager
+    def connection(self):
+        """
+        Borrow a pooled connection. The outermost holder on a thread commits on
+        success and rolls back on error (same as the old `with connect()` blocks);
+        nested holders leave that to the outermost one.
+        """
+        conn = self.pool.acquire()
+        outermost = self.pool.depth() == 1
+        try:
+            yield conn
+            if outermost and conn.in_transaction:
+                conn.commit()
+        except BaseException:
+            if outermost and conn.in_transaction:
+                conn.rollback()
+            raise
+        finally:
+            self.pool.release(conn)
+
+    def close(self):
+        self.pool.close()
+
     def _retry_execute(self, func, *args, **kwargs):
         backoff = DB_RETRY_BACKOFF
         for attempt in range(1, DB_MAX_RETRIES + 1):
@@ -25,7 +156,7 @@ class DBHelper:
     def init_db_if_needed(self):
         need_init = not os.path.exists(self.filename)
         # Use explicit connection for init
-        with self.connect() as conn:
+        with self.connection() as conn:
             cur = conn.cursor()
             # users
             cur.execute("""
@@ -79,7 +210,7 @@ class DBHelper:
     # Generic helpers
     def execute(self, sql, params=(), commit=False):
         def _do():
-            with self.connect() as conn:
+            with self.connection() as conn:
                 cur = conn.cursor()
                 cur.execute(sql, params)
                 if commit:
@@ -90,7 +221,7 @@ class DBHelper:
 
     def fetchall(self, sql, params=()):
         def _do():
-            with self.connect() as conn:
+            with self.connection() as conn:
                 cur = conn.cursor()
                 cur.execute(sql, params)
                 rows = cur.fetchall()
@@ -99,7 +230,7 @@ class DBHelper:
 
     def fetchone(self, sql, params=()):
         def _do():
-            with self.connect() as conn:
+            with self.connection() as conn:
                 cur = conn.cursor()
                 cur.execute(sql, params)
                 row = cur.fetchone()
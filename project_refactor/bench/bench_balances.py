@@ -0,0 +1,84 @@
+"""
+Balance aggregation benchmark: Python row loop vs. SQL GROUP BY vs. saldo_akun.
+
+    python bench/bench_balances.py [--sizes 10000 100000 1000000] [--accounts 60] [--repeat 3]
+
+For each journal size a fresh database is seeded, then every engine of
+_balances_cents() is timed (best of --repeat) with and without adjustments.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# core.db opens SIA_DB on import; the benchmarks reopen their own database, so
+# keep that first one in memory instead of creating akuntansi.db in the cwd
+os.environ["SIA_DB"] = ":memory:"
+
+from core.db import get_db  # noqa: E402
+import core.accounting as accounting  # noqa: E402
+
+ENGINES = ("python", "sql", "saldo")
+TYPES = ("Asset", "Liability", "Equity", "Revenue", "Expense")
+
+
+def seed(db, rows, accounts, seed_value=42):
+    rnd = random.Random(seed_value)
+    nos = [f"{100 + i}" for i in range(accounts)]
+    with db.connection(write=True) as conn:
+        conn.executemany("INSERT INTO akun (no_akun, nama_akun, tipe, starting_balance) VALUES (?, ?, ?, ?)",
+                         [(no, f"Akun {no}", TYPES[i % len(TYPES)], rnd.randint(0, 10 ** 7)) for i, no in enumerate(nos)])
+
+    def gen(n):
+        for i in range(n):
+            d = rnd.randint(1, 10 ** 8)
+            yield (f"2024-{1 + i % 12:02d}-{1 + i % 28:02d}", rnd.choice(nos), rnd.choice(nos), d, d, "bench")
+    batch = 50000
+    for start in range(0, rows, batch):
+        with db.connection(write=True) as conn:
+            conn.executemany("""INSERT INTO jurnal (tanggal, akun_debit, akun_kredit, debit, kredit, keterangan)
+                                VALUES (?, ?, ?, ?, ?, ?)""", gen(min(batch, rows - start)))
+    with db.connection(write=True) as conn:
+        conn.executemany("""INSERT INTO adjusting (tanggal, akun_debit, akun_kredit, debit, kredit, keterangan, applied)
+                            VALUES ('2024-12-31', ?, ?, 100, 100, 'adj', 0)""",
+                         [(rnd.choice(nos), rnd.choice(nos)) for _ in range(max(1, rows // 100))])
+
+
+def best_of(fn, repeat):
+    best = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        dt = time.perf_counter() - t0
+        best = dt if best is None else min(best, dt)
+    return best
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000])
+    ap.add_argument("--accounts", type=int, default=60)
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args(argv)
+    db = get_db()
+    tmpdir = tempfile.mkdtemp(prefix="sia-bench-")
+    print(f"{'rows':>10}{'adj':>5}" + "".join(f"{e + ' ms':>12}" for e in ENGINES) + f"{'python/sql':>12}")
+    for n in args.sizes:
+        db.reopen(os.path.join(tmpdir, f"balances-{n}.db"))
+        seed(db, n, args.accounts)
+        for adj in (False, True):
+            ref = accounting._balances_cents(adj, engine="python")
+            times = {}
+            for engine in ENGINES:
+                assert accounting._balances_cents(adj, engine=engine) == ref, engine
+                times[engine] = best_of(lambda: accounting._balances_cents(adj, engine=engine), args.repeat)
+            print(f"{n:>10}{'y' if adj else 'n':>5}" + "".join(f"{times[e] * 1000:>12.1f}" for e in ENGINES)
+                  + f"{times['python'] / times['sql']:>11.1f}x")
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
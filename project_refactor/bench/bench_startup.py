@@ -0,0 +1,105 @@
+"""
+Startup import benchmark (python -X importtime).
+
+    python bench/bench_startup.py [--repeat 5] [--save baseline.json] [--baseline baseline.json]
+                                  [--tolerance 1.3] [--budget-ms 0]
+
+Imports what each entry point imports before its first window / output, in a
+fresh interpreter, and reports the total import time (median of --repeat runs)
+and the slowest top-level imports. Fails (exit 1) when
+  - a heavy optional library (openpyxl, reportlab, matplotlib, pandas) is
+    imported at startup: they must only load on first use (utils/lazy.py);
+  - the median exceeds --budget-ms, or the --baseline median times --tolerance.
+Timings depend on the machine; save a baseline on the machine that checks it.
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# entry point -> statement it runs before the user sees anything
+TARGETS = {
+    'gui': "import ui.main_window",
+    'cli': "import cli; import core.accounting; import core.importer",
+    'legacy': "import main",
+}
+HEAVY = ('openpyxl', 'reportlab', 'matplotlib', 'pandas')
+
+_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def parse_importtime(stderr):
+    """[(module, self_us, cumulative_us, depth)] from -X importtime output."""
+    out = []
+    for line in stderr.splitlines():
+        m = _LINE.match(line)
+        if m:
+            out.append((m.group(4), int(m.group(1)), int(m.group(2)), (len(m.group(3)) - 1) // 2))
+    return out
+
+def measure(target, cwd):
+    code = f"import sys; sys.path[:0] = [{ROOT!r}, {os.path.dirname(ROOT)!r}]; {TARGETS[target]}"
+    # SIA_DB: modules open the database at import, keep it out of the working tree
+    env = dict(os.environ, SIA_DB=os.path.join(cwd, "startup.db"))
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=cwd, env=env,
+                          capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(f"{target}: {proc.stderr.strip().splitlines()[-1]}")
+    rows = parse_importtime(proc.stderr)
+    top = [r for r in rows if r[3] == 0]
+    return {'total_ms': sum(r[2] for r in top) / 1000.0,
+            'slowest': sorted(((m, c / 1000.0) for m, _s, c, _d in top), key=lambda x: -x[1])[:8],
+            'heavy': sorted({m for m, *_ in rows if m.split('.')[0] in HEAVY})}
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Startup import benchmark")
+    ap.add_argument("--targets", nargs="+", choices=list(TARGETS), default=list(TARGETS))
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--save", help="write the medians to this JSON file")
+    ap.add_argument("--baseline", help="compare with medians saved by --save")
+    ap.add_argument("--tolerance", type=float, default=1.3, help="allowed factor over the baseline")
+    ap.add_argument("--budget-ms", type=float, default=0, help="absolute limit per target (0: none)")
+    args = ap.parse_args(argv)
+
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    failures = []
+    medians = {}
+    with tempfile.TemporaryDirectory(prefix="sia-startup-") as cwd:
+        for target in args.targets:
+            if target == 'legacy' and not os.path.exists(os.path.join(os.path.dirname(ROOT), "main.py")):
+                continue
+            runs = [measure(target, cwd) for _ in range(args.repeat)]
+            median = statistics.median(r['total_ms'] for r in runs)
+            medians[target] = median
+            last = runs[-1]
+            print(f"\n{target}: {median:.1f} ms (median dari {args.repeat}, min {min(r['total_ms'] for r in runs):.1f})")
+            for mod, ms in last['slowest']:
+                print(f"  {ms:>8.1f} ms  {mod}")
+            if last['heavy']:
+                failures.append(f"{target}: library berat diimpor saat start: {', '.join(last['heavy'])}")
+            if args.budget_ms and median > args.budget_ms:
+                failures.append(f"{target}: {median:.1f} ms > budget {args.budget_ms:.1f} ms")
+            if target in baseline and median > baseline[target] * args.tolerance:
+                failures.append(f"{target}: {median:.1f} ms > baseline {baseline[target]:.1f} ms x {args.tolerance}")
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(medians, f, indent=2)
+    print()
+    for msg in failures:
+        print("GAGAL:", msg)
+    print("OK" if not failures else f"{len(failures)} regresi")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,118 @@
+"""
+Concurrent-load benchmark for the DB storage profiles.
+
+    python bench/bench_storage.py [--seconds 5] [--readers 4] [--writers 2] [--rows 20000]
+
+Runs the same mixed workload once per storage profile: reader threads scanning
+the journal like refresh_all does, writer threads posting single entries like
+JournalDialog does, and a poster thread that periodically holds a long write
+transaction like apply_adjustments. A short busy timeout is used so lock
+contention surfaces as `_retry_execute` retries instead of silent waiting.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# core.db opens SIA_DB on import; the benchmarks reopen their own database, so
+# keep that first one in memory instead of creating akuntansi.db in the cwd
+os.environ["SIA_DB"] = ":memory:"
+
+from core.db import DBHelper  # noqa: E402
+from core.config import DB_STORAGE_PROFILES  # noqa: E402
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    idx = min(len(values) - 1, int(round(pct / 100.0 * (len(values) - 1))))
+    return values[idx]
+
+
+def seed(db, rows):
+    with db.connection(write=True) as conn:
+        conn.executemany("INSERT INTO akun (no_akun, nama_akun, tipe, starting_balance) VALUES (?, ?, ?, 0)",
+                         [("101", "Kas", "Asset"), ("401", "Pendapatan", "Revenue")])
+        conn.executemany("""INSERT INTO jurnal (tanggal, akun_debit, akun_kredit, debit, kredit, keterangan)
+                            VALUES (?, '101', '401', ?, ?, 'seed')""",
+                         ((f"2024-{1 + i % 12:02d}-{1 + i % 28:02d}", i % 500 + 1, i % 500 + 1) for i in range(rows)))
+
+
+def run_profile(profile, args):
+    tmpdir = tempfile.mkdtemp(prefix="sia-bench-")
+    db = DBHelper(os.path.join(tmpdir, "bench.db"), profile=profile, busy_timeout=args.busy_timeout)
+    seed(db, args.rows)
+    stop = threading.Event()
+    latencies = []; failures = []; reads = [0]
+
+    def reader():
+        while not stop.is_set():
+            try:
+                db.fetchall("SELECT id, tanggal, akun_debit, akun_kredit, debit, kredit, keterangan FROM jurnal ORDER BY tanggal, id")
+                reads[0] += 1
+            except Exception as e:
+                failures.append(e)
+
+    def writer():
+        while not stop.is_set():
+            t0 = time.perf_counter()
+            try:
+                db.execute("""INSERT INTO jurnal (tanggal, akun_debit, akun_kredit, debit, kredit, keterangan)
+                              VALUES ('2024-06-01', '101', '401', 10, 10, 'bench')""", commit=True)
+                latencies.append(time.perf_counter() - t0)
+            except Exception as e:
+                failures.append(e)
+
+    def poster():
+        while not stop.is_set():
+            try:
+                db._retry_execute(_post_batch)
+            except Exception as e:
+                failures.append(e)
+            time.sleep(0.05)
+
+    def _post_batch():
+        with db.connection(write=True) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.executemany("""INSERT INTO jurnal (tanggal, akun_debit, akun_kredit, debit, kredit, keterangan)
+                                VALUES ('2024-12-31', '101', '401', 1, 1, 'posting')""", [()] * 500)
+            conn.execute("COMMIT")
+
+    threads = [threading.Thread(target=reader) for _ in range(args.readers)]
+    threads += [threading.Thread(target=writer) for _ in range(args.writers)]
+    threads.append(threading.Thread(target=poster))
+    for t in threads:
+        t.start()
+    time.sleep(args.seconds)
+    stop.set()
+    for t in threads:
+        t.join()
+    db.close()
+    return {
+        'profile': profile, 'reads': reads[0], 'writes': len(latencies),
+        'lock_retries': db.lock_retries, 'failures': len(failures),
+        'p50': percentile(latencies, 50) * 1000, 'p99': percentile(latencies, 99) * 1000,
+    }
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--seconds", type=float, default=5)
+    ap.add_argument("--readers", type=int, default=4)
+    ap.add_argument("--writers", type=int, default=2)
+    ap.add_argument("--rows", type=int, default=20000)
+    ap.add_argument("--busy-timeout", type=float, default=0.05)
+    ap.add_argument("--profiles", nargs="+", default=list(DB_STORAGE_PROFILES))
+    args = ap.parse_args(argv)
+    print(f"{'profile':<10}{'reads':>8}{'writes':>8}{'lock retries':>14}{'failed':>8}{'p50 ms':>10}{'p99 ms':>10}")
+    for profile in args.profiles:
+        r = run_profile(profile, args)
+        print(f"{r['profile']:<10}{r['reads']:>8}{r['writes']:>8}{r['lock_retries']:>14}{r['failures']:>8}{r['p50']:>10.2f}{r['p99']:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
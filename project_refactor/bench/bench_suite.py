@@ -0,0 +1,210 @@
+"""
+Reproducible benchmark suite over synthetic ledgers.
+
+    python bench/bench_suite.py [--sizes 1000 100000 1000000] [--accounts 80] [--seed 42]
+                                [--cases balances trial ...] [--inline] [--json out.json]
+
+For every size a database is generated with bench/ledger_gen.py (same seed ->
+same data), then each case runs in a fresh interpreter so its numbers are its
+own: wall time, peak RSS (resource.getrusage; not available on Windows) and the
+number of SQL statements executed (one per execute/executemany call on the
+helper's connections). Result caches are cleared before each case unless the
+case is about the warm path. --inline runs everything in this process instead
+(faster, but peak RSS then only ever grows).
+"""
+import argparse
+import json
+import os
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# core.db opens SIA_DB on import; the benchmarks reopen their own database, so
+# keep that first one in memory instead of creating akuntansi.db in the cwd
+os.environ["SIA_DB"] = ":memory:"
+
+from core.db import get_db  # noqa: E402
+import core.accounting as accounting  # noqa: E402
+from bench.ledger_gen import generate  # noqa: E402
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def _busiest_account():
+    return get_db().fetchone("SELECT no_akun FROM saldo_akun ORDER BY n_jurnal DESC LIMIT 1")[0]
+
+def _refresh_headless():
+    # what MainApp loads for every tab, minus Tk
+    from ui.background import Job
+    from ui.tab_data import ALL_TABS, load_tab
+    for tab in ALL_TABS:
+        load_tab(Job(), tab)
+    accounting.count_journal_entries()
+    accounting.journal_page(limit=200)
+
+def _export(fn, name, **kwargs):
+    def run(ctx):
+        try:
+            fn(os.path.join(ctx['tmp'], name), **kwargs)
+        except RuntimeError as e:
+            # optional library missing
+            ctx['note'] = f"skip ({e})"
+    return run
+
+def _apply_adjustments(ctx):
+    accounting.apply_adjustments()
+
+def _apply_setup(ctx):
+    # apply_adjustments writes; work on a copy so later cases see the same data
+    copy = os.path.join(ctx['tmp'], "apply.db")
+    shutil.copyfile(ctx['db'], copy)
+    get_db().reopen(copy)
+
+
+# name -> (setup or None, case). setup runs before the measurement starts.
+CASES = {
+    'balances': (None, lambda ctx: accounting.compute_balances(include_adjustments=True)),
+    'trial': (None, lambda ctx: accounting.compute_trial_rows(include_adjustments=True)),
+    'statements': (None, lambda ctx: accounting.compute_financial_statements(include_adjustments=True)),
+    'balances_python': (None, lambda ctx: accounting._balances_cents(True, engine="python")),
+    'ledger_full': (None, lambda ctx: accounting.ledger_for_account(ctx['account'])),
+    'ledger_page': (None, lambda ctx: accounting.ledger_for_account(ctx['account'], limit=100)),
+    'refresh_cold': (None, lambda ctx: _refresh_headless()),
+    'refresh_warm': (lambda ctx: _refresh_headless(), lambda ctx: _refresh_headless()),
+    'export_journal': (None, _export(accounting.export_journal_to_excel, "jurnal.xlsx")),
+    'export_adjusting': (None, _export(accounting.export_adjusting_to_excel, "penyesuaian.xlsx")),
+    'export_trial': (None, _export(accounting.export_trial_to_excel, "neraca.xlsx", include_adjustments=True)),
+    'export_reports_xlsx': (None, _export(accounting.export_reports_to_excel, "laporan.xlsx")),
+    'export_reports_pdf': (None, _export(accounting.export_reports_to_pdf, "laporan.pdf")),
+    'apply_adjustments': (_apply_setup, _apply_adjustments),
+}
+
+
+def _peak_rss_kb():
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return rss // 1024 if sys.platform == "darwin" else rss
+
+def _count_statements(db):
+    """
+    One count per execute/executemany/executescript call on the helper's
+    connections, through DBHelper or on a raw connection alike. Repeated
+    statements count every time; trigger steps and executemany rows belong to
+    the call that ran them.
+    """
+    counter = {'n': 0}
+
+    def counted(method):
+        def call(self, *args, **kwargs):
+            counter['n'] += 1
+            return method(self, *args, **kwargs)
+        return call
+
+    class Cursor(sqlite3.Cursor):
+        execute = counted(sqlite3.Cursor.execute)
+        executemany = counted(sqlite3.Cursor.executemany)
+        executescript = counted(sqlite3.Cursor.executescript)
+
+    class Connection(sqlite3.Connection):
+        # Connection.execute does not go through cursor(), so both are counted
+        execute = counted(sqlite3.Connection.execute)
+        executemany = counted(sqlite3.Connection.executemany)
+        executescript = counted(sqlite3.Connection.executescript)
+
+        def cursor(self, factory=Cursor):
+            return super().cursor(factory)
+
+    # the pools open their connections through connect(), so everything after reopen() is counted
+    db.connection_factory = Connection
+    return counter
+
+def run_case(name, db_path, tmp):
+    db = get_db()
+    counter = _count_statements(db)
+    db.reopen(db_path)
+    ctx = {'db': db_path, 'tmp': tmp, 'account': _busiest_account(), 'note': ''}
+    setup, case = CASES[name]
+    if setup:
+        setup(ctx)
+    if name != 'refresh_warm':
+        accounting.clear_result_cache()
+    base = _peak_rss_kb()
+    counter['n'] = 0
+    t0 = time.perf_counter()
+    case(ctx)
+    wall = time.perf_counter() - t0
+    peak = _peak_rss_kb()
+    return {'case': name, 'wall_ms': wall * 1000, 'queries': counter['n'], 'note': ctx['note'],
+            'peak_rss_mb': None if peak is None else peak / 1024,
+            'rss_delta_mb': None if peak is None else (peak - base) / 1024}
+
+
+def _fmt(v, spec):
+    return "n/a" if v is None else format(v, spec)
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--sizes", type=int, nargs="+", default=[1000, 100000, 1000000])
+    ap.add_argument("--accounts", type=int, default=80)
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--cases", nargs="+", choices=list(CASES), default=list(CASES))
+    ap.add_argument("--inline", action="store_true", help="run cases in this process")
+    ap.add_argument("--json", help="also write all results to this file")
+    ap.add_argument("--keep", action="store_true", help="keep the generated databases")
+    # internal: one case in a child process
+    ap.add_argument("--case", help=argparse.SUPPRESS)
+    ap.add_argument("--db", help=argparse.SUPPRESS)
+    ap.add_argument("--tmp", help=argparse.SUPPRESS)
+    args = ap.parse_args(argv)
+
+    if args.case:
+        print(json.dumps(run_case(args.case, args.db, args.tmp)))
+        return 0
+
+    tmp = tempfile.mkdtemp(prefix="sia-suite-")
+    results = []
+    try:
+        for n in args.sizes:
+            path = os.path.join(tmp, f"ledger-{n}.db")
+            t0 = time.perf_counter()
+            generate(get_db().reopen(path), n, args.accounts, args.seed)
+            get_db().close()
+            print(f"\n{n:,} jurnal ({args.accounts} akun, seed {args.seed}) dibuat dalam {time.perf_counter() - t0:.1f} s")
+            print(f"{'case':<22}{'wall ms':>12}{'peak RSS MB':>14}{'dRSS MB':>10}{'queries':>10}  note")
+            for name in args.cases:
+                if args.inline:
+                    res = run_case(name, path, tmp)
+                else:
+                    out = subprocess.run([sys.executable, os.path.abspath(__file__), "--case", name, "--db", path, "--tmp", tmp],
+                                         capture_output=True, text=True)
+                    if out.returncode != 0:
+                        print(f"{name:<22}gagal: {out.stderr.strip().splitlines()[-1] if out.stderr.strip() else out.returncode}")
+                        continue
+                    res = json.loads(out.stdout.strip().splitlines()[-1])
+                res['rows'] = n
+                results.append(res)
+                print(f"{name:<22}{res['wall_ms']:>12.1f}{_fmt(res['peak_rss_mb'], '>14.1f')}"
+                      f"{_fmt(res['rss_delta_mb'], '>10.1f')}{res['queries']:>10}  {res['note']}")
+    finally:
+        get_db().close()
+        if args.keep:
+            print(f"\ndatabase disimpan di {tmp}")
+        else:
+            shutil.rmtree(tmp, ignore_errors=True)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,142 @@
+"""
+Deterministic synthetic ledger for benchmarks.
+
+    python bench/ledger_gen.py --rows 100000 [--accounts 80] [--seed 42] --out bench.db
+
+Same arguments -> same database. The data is shaped like a real small business
+book rather than uniform noise:
+  - chart of accounts split over the five types (1xx aset, 2xx kewajiban,
+    3xx ekuitas, 4xx pendapatan, 5xx beban);
+  - account usage is skewed (Zipf-like weights), so a few accounts such as Kas
+    carry most of the activity, like in the real books;
+  - transactions follow a few typical patterns (sales into cash/receivables,
+    expenses paid from cash, loan/capital movements) with log-normal amounts;
+  - dates cover `--days` days from `--start`, busier on weekdays and at month end;
+  - adjusting entries (~1% of rows) sit on month ends, all pending.
+"""
+import argparse
+import math
+import os
+import random
+import sys
+from datetime import date, timedelta
+from itertools import accumulate
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# core.db opens SIA_DB on import; the benchmarks reopen their own database, so
+# keep that first one in memory instead of creating akuntansi.db in the cwd
+os.environ["SIA_DB"] = ":memory:"
+
+from core.db import get_db  # noqa: E402
+
+TYPES = ("Asset", "Liability", "Equity", "Revenue", "Expense")
+# share of the chart per type
+TYPE_SHARE = {"Asset": 0.3, "Liability": 0.15, "Equity": 0.05, "Revenue": 0.15, "Expense": 0.35}
+TYPE_PREFIX = {"Asset": 1, "Liability": 2, "Equity": 3, "Revenue": 4, "Expense": 5}
+# (debit type, credit type, weight, median amount in rupiah)
+PATTERNS = [
+    ("Asset", "Revenue", 40, 750_000),      # penjualan
+    ("Expense", "Asset", 40, 350_000),      # beban dibayar
+    ("Asset", "Asset", 8, 2_000_000),       # transfer kas/bank, piutang tertagih
+    ("Expense", "Liability", 5, 1_000_000), # beban terutang
+    ("Liability", "Asset", 5, 1_500_000),   # pelunasan utang
+    ("Asset", "Equity", 2, 25_000_000),     # setoran modal
+]
+BATCH = 50000
+
+
+def chart_of_accounts(n):
+    """[(no_akun, nama, tipe)] with at least one account per type."""
+    accounts = []
+    for tipe in TYPES:
+        count = max(1, int(round(n * TYPE_SHARE[tipe])))
+        for i in range(count):
+            no = f"{TYPE_PREFIX[tipe]}{i + 1:02d}" if count < 100 else f"{TYPE_PREFIX[tipe]}{i + 1:03d}"
+            accounts.append((no, f"{tipe} {i + 1}", tipe))
+    return accounts
+
+
+def _zipf_weights(k, s=1.1):
+    return [1.0 / (i + 1) ** s for i in range(k)]
+
+
+def _dates(start, days):
+    # (iso dates, weights): weekdays x3, month end x4
+    out = []; weights = []
+    for i in range(days):
+        d = start + timedelta(days=i)
+        w = 3.0 if d.weekday() < 5 else 1.0
+        if (d + timedelta(days=1)).month != d.month:
+            w *= 4
+        out.append(d.isoformat()); weights.append(w)
+    return out, weights
+
+
+def generate(db, rows, accounts=80, seed=42, start="2023-01-01", days=730, adjusting_ratio=0.01):
+    """Fill an empty database; returns a dict of what was generated."""
+    rnd = random.Random(seed)
+    chart = chart_of_accounts(accounts)
+    by_type = {t: [no for no, _nm, tipe in chart if tipe == t] for t in TYPES}
+    # cumulative weights: random.choices() would re-sum plain weights on every call
+    weights = {t: list(accumulate(_zipf_weights(len(nos)))) for t, nos in by_type.items()}
+    dates, date_weights = _dates(date.fromisoformat(start), days)
+    date_weights = list(accumulate(date_weights))
+    patterns = [p[:2] + (p[3],) for p in PATTERNS]
+    pattern_weights = list(accumulate(p[2] for p in PATTERNS))
+
+    with db.connection(write=True) as conn:
+        conn.executemany("INSERT INTO akun (no_akun, nama_akun, tipe, starting_balance) VALUES (?, ?, ?, ?)",
+                         [(no, nm, tipe, rnd.randint(0, 50_000_000) * 100 if tipe in ("Asset", "Equity") else 0)
+                          for no, nm, tipe in chart])
+
+    def pick(tipe, avoid=None):
+        while True:
+            no = rnd.choices(by_type[tipe], cum_weights=weights[tipe])[0]
+            if no != avoid or len(by_type[tipe]) == 1:
+                return no
+
+    def entries(n, tanggal_pool, tanggal_weights, ket):
+        for _ in range(n):
+            dt, ct, median = rnd.choices(patterns, cum_weights=pattern_weights)[0]
+            ad = pick(dt); ak = pick(ct, avoid=ad)
+            sen = max(100, int(rnd.lognormvariate(math.log(median), 0.9)) * 100)
+            yield (rnd.choices(tanggal_pool, cum_weights=tanggal_weights)[0], ad, ak, sen, sen, ket)
+
+    for done in range(0, rows, BATCH):
+        with db.connection(write=True) as conn:
+            conn.executemany("""INSERT INTO jurnal (tanggal, akun_debit, akun_kredit, debit, kredit, keterangan)
+                                VALUES (?, ?, ?, ?, ?, ?)""",
+                             entries(min(BATCH, rows - done), dates, date_weights, "transaksi"))
+
+    month_ends = [d for d in dates if (date.fromisoformat(d) + timedelta(days=1)).day == 1] or dates[-1:]
+    n_adj = max(1, int(rows * adjusting_ratio))
+    with db.connection(write=True) as conn:
+        conn.executemany("""INSERT INTO adjusting (tanggal, akun_debit, akun_kredit, debit, kredit, keterangan, applied)
+                            VALUES (?, ?, ?, ?, ?, ?, 0)""",
+                         entries(n_adj, month_ends, None, "penyesuaian"))
+    # planner statistics refreshed the way the importer does after a bulk load
+    db.analyze()
+    return {'accounts': len(chart), 'jurnal': rows, 'adjusting': n_adj}
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Generate a synthetic ledger database")
+    ap.add_argument("--rows", type=int, default=100000)
+    ap.add_argument("--accounts", type=int, default=80)
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--start", default="2023-01-01")
+    ap.add_argument("--days", type=int, default=730)
+    ap.add_argument("--out", required=True)
+    args = ap.parse_args(argv)
+    if os.path.exists(args.out):
+        print(f"{args.out} sudah ada")
+        return 1
+    db = get_db().reopen(args.out)
+    info = generate(db, args.rows, args.accounts, args.seed, args.start, args.days)
+    print(f"{args.out}: {info['accounts']} akun, {info['jurnal']} jurnal, {info['adjusting']} penyesuaian")
+    db.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,328 @@
+"""
+Command line for batch reporting and maintenance, without Tk.
+
+    python -m project_refactor.cli [--db PATH] COMMAND [options]
+    python project_refactor/cli.py [--db PATH] COMMAND [options]
+
+    trial [--adjusted] [--format table|csv|json] [PERIODE]      neraca saldo
+    reports [--no-adjustments] [--format table|json] [PERIODE]  laba rugi, perubahan ekuitas, neraca
+    export-journal OUT.xlsx
+    export-adjusting OUT.xlsx
+    export-trial OUT.xlsx [--adjusted] [PERIODE]
+    export-reports OUT.xlsx|OUT.pdf [--no-adjustments] [PERIODE]
+
+PERIODE: --as-of YYYY-MM-DD (saldo per tanggal itu), or --from/--to YYYY-MM-DD
+(mutasi periode itu saja; reports: laba rugi periode, neraca per --to).
+    apply-adjustments
+    import-journal FILE.csv|FILE.xlsx [--errors REPORT.csv]
+    periods | close-period YYYY-MM-DD | reopen-period  periode akuntansi yang ditutup
+    verify-saldo | rebuild-saldo | check-indexes | check-journal
+
+Exit status: 0 ok, 1 the command found problems (saldo mismatch, query plan,
+rejected import rows, unbalanced entries, period snapshot mismatch), 2 usage
+error (bad option or date, --from after --to) or database not found, 3 the
+command failed (database error, optional library missing, unreadable file).
+"""
+import argparse
+import csv
+import json
+import os
+import sqlite3
+import sys
+import time
+from datetime import datetime
+
+# the modules import each other as core.*, ui.*, utils.*
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+EXIT_OK = 0
+EXIT_PROBLEMS = 1
+EXIT_USAGE = 2
+EXIT_FAILED = 3
+
+
+def _money(v):
+    return f"{v:,.2f}"
+
+def _print_table(header, rows, numeric=()):
+    rows = [[str(v) if i not in numeric else _money(v) for i, v in enumerate(r)] for r in rows]
+    widths = [max([len(h)] + [len(r[i]) for r in rows]) for i, h in enumerate(header)]
+    fmt = lambda r: "  ".join(v.rjust(w) if i in numeric else v.ljust(w) for i, (v, w) in enumerate(zip(r, widths)))
+    print(fmt(header))
+    print("  ".join("-" * w for w in widths))
+    for r in rows:
+        print(fmt(r))
+
+def _print_json(data):
+    # amounts are Decimal; keep them exact as strings
+    json.dump(data, sys.stdout, indent=2, default=str)
+    print()
+
+
+def _period(args):
+    # --as-of / --from / --to -> keyword arguments of the report functions
+    return {'as_of': args.as_of, 'date_from': args.date_from, 'date_to': args.date_to}
+
+def cmd_trial(args):
+    from core.accounting import compute_trial_rows
+    rows = compute_trial_rows(include_adjustments=args.adjusted, **_period(args))
+    if args.format == "json":
+        _print_json([{'no_akun': no, 'nama': nm, 'tipe': tipe, 'debit': d, 'kredit': c} for no, nm, tipe, d, c in rows])
+    elif args.format == "csv":
+        w = csv.writer(sys.stdout)
+        w.writerow(["no_akun", "nama", "tipe", "debit", "kredit"])
+        w.writerows(rows)
+    else:
+        total_d = sum(r[3] for r in rows); total_c = sum(r[4] for r in rows)
+        _print_table(["No Akun", "Nama Akun", "Tipe", "Debit", "Kredit"],
+                     list(rows) + [("", "Total", "", total_d, total_c)], numeric=(3, 4))
+    return EXIT_OK
+
+def cmd_reports(args):
+    from core.accounting import compute_financial_statements, prepare_balance_and_ratios, period_args, period_label
+    include_adj = not args.no_adjustments
+    date_from, end = period_args(**_period(args))
+    income, balance, eq_rec = compute_financial_statements(include_adjustments=include_adj, date_from=date_from, date_to=end)
+    ratios = prepare_balance_and_ratios(include_adjustments=include_adj, as_of=end)
+    if args.format == "json":
+        lines = lambda lst: [{'no_akun': no, 'nama': nm, 'jumlah': amt} for no, nm, amt in lst]
+        _print_json({
+            'laba_rugi': dict(income, revenues=lines(income['revenues']), expenses=lines(income['expenses'])),
+            'perubahan_ekuitas': [{'keterangan': label, 'jumlah': amt} for label, amt in eq_rec],
+            'neraca': dict(balance, assets=lines(balance['assets']), liabilities=lines(balance['liabilities']),
+                           equity=lines(balance['equity'])),
+            'rasio': ratios,
+        })
+        return EXIT_OK
+    if period_label(date_from, end):
+        print(period_label(date_from, end) + "\n")
+    print("LAPORAN LABA RUGI")
+    _print_table(["Jenis", "No Akun", "Nama Akun", "Jumlah"],
+                 [("Pendapatan", no, nm, amt) for no, nm, amt in income['revenues']]
+                 + [("", "", "Total Pendapatan", income['total_revenue'])]
+                 + [("Beban", no, nm, amt) for no, nm, amt in income['expenses']]
+                 + [("", "", "Total Beban", income['total_expense']), ("", "", "Laba (Rugi) Bersih", income['net_income'])],
+                 numeric=(3,))
+    print("\nPERUBAHAN EKUITAS")
+    _print_table(["Keterangan", "Jumlah"], eq_rec, numeric=(1,))
+    print("\nNERACA")
+    _print_table(["Sisi", "No Akun", "Nama Akun", "Jumlah"],
+                 [("Aset", no, nm, amt) for no, nm, amt in balance['assets']]
+                 + [("", "", "Total Aset", balance['total_assets'])]
+                 + [("Kewajiban", no, nm, amt) for no, nm, amt in balance['liabilities']]
+                 + [("Ekuitas", no, nm, amt) for no, nm, amt in balance['equity']]
+                 + [("", "", "Total Kewajiban + Ekuitas", balance['total_liabilities'] + balance['total_equity'])],
+                 numeric=(3,))
+    fmt_ratio = lambda r: "-" if r is None else f"{r:.2f}"
+    print(f"\nCurrent ratio: {fmt_ratio(ratios['current_ratio'])}  Debt to equity: {fmt_ratio(ratios['debt_to_equity'])}")
+    return EXIT_OK
+
+def _export(fn, path, **kwargs):
+    state = {'rows': 0}
+    def progress(rows, rate):
+        state['rows'] = rows
+    start = time.perf_counter()
+    fn(path, progress=progress, **kwargs)
+    rows = f"{state['rows']:,} baris, " if state['rows'] else ""
+    print(f"{path}: {rows}{time.perf_counter() - start:.1f} detik")
+    return EXIT_OK
+
+def cmd_export_journal(args):
+    from core.accounting import export_journal_to_excel
+    return _export(export_journal_to_excel, args.out)
+
+def cmd_export_adjusting(args):
+    from core.accounting import export_adjusting_to_excel
+    return _export(export_adjusting_to_excel, args.out)
+
+def cmd_export_trial(args):
+    from core.accounting import export_trial_to_excel
+    from core.accounting import period_args
+    date_from, date_to = period_args(**_period(args))
+    return _export(export_trial_to_excel, args.out, include_adjustments=args.adjusted,
+                   date_from=date_from, date_to=date_to)
+
+def cmd_export_reports(args):
+    from core.accounting import export_reports_to_pdf, export_reports_to_excel
+    from core.accounting import period_args
+    fn = export_reports_to_pdf if args.out.lower().endswith(".pdf") else export_reports_to_excel
+    date_from, date_to = period_args(**_period(args))
+    return _export(fn, args.out, include_adjustments=not args.no_adjustments,
+                   date_from=date_from, date_to=date_to)
+
+def cmd_apply_adjustments(args):
+    from core.accounting import apply_adjustments
+    print(apply_adjustments().summary())
+    return EXIT_OK
+
+def cmd_import_journal(args):
+    from core.importer import import_journal, write_error_report
+    result = import_journal(args.file)
+    print(result.summary())
+    if result.errors and args.errors:
+        write_error_report(args.errors, result)
+        print(f"Baris gagal ditulis ke {args.errors}")
+    return EXIT_PROBLEMS if result.errors else EXIT_OK
+
+def cmd_verify_saldo(args):
+    from core.accounting import verify_saldo, verify_period_snapshots
+    mismatches = verify_saldo()
+    for include_adj, no, field, fast, full in mismatches:
+        print(f"[{'adj' if include_adj else 'base'}] {no} {field}: saldo_akun={fast} hitung ulang={full}")
+    snapshots = verify_period_snapshots()
+    for date_to, no, field, snap, full in snapshots:
+        print(f"[periode s.d. {date_to}] {no} {field}: snapshot={snap} hitung ulang={full}")
+    mismatches += snapshots
+    print("OK: saldo_akun dan snapshot periode cocok." if not mismatches else f"{len(mismatches)} selisih ditemukan.")
+    return EXIT_PROBLEMS if mismatches else EXIT_OK
+
+def cmd_rebuild_saldo(args):
+    from core.accounting import rebuild_saldo
+    rebuild_saldo()
+    print("saldo_akun dibangun ulang.")
+    return cmd_verify_saldo(args)
+
+def cmd_check_indexes(args):
+    from core.accounting import check_query_plans
+    problems = check_query_plans()
+    for name, detail in problems:
+        print(f"{name}: {detail}")
+    print("OK: semua query memakai index." if not problems else f"{len(problems)} masalah query plan.")
+    return EXIT_PROBLEMS if problems else EXIT_OK
+
+def cmd_periods(args):
+    from core.accounting import list_periods
+    rows = list_periods()
+    if rows:
+        _print_table(["ID", "Dari", "Sampai", "Ditutup"], rows)
+    else:
+        print("Belum ada periode yang ditutup.")
+    return EXIT_OK
+
+def cmd_close_period(args):
+    from core.accounting import close_period
+    close_period(args.date)
+    print(f"Periode sampai {args.date} ditutup.")
+    return EXIT_OK
+
+def cmd_reopen_period(args):
+    from core.accounting import reopen_last_period
+    date_to = reopen_last_period()
+    print(f"Periode sampai {date_to} dibuka kembali." if date_to else "Belum ada periode yang ditutup.")
+    return EXIT_OK
+
+def cmd_check_journal(args):
+    from core.accounting import unbalanced_entries
+    rows = unbalanced_entries()
+    if rows:
+        _print_table(["ID", "Tanggal", "Debit", "Kredit", "Keterangan"], rows, numeric=(2, 3))
+    print("OK: semua jurnal seimbang." if not rows else f"{len(rows)} jurnal tidak seimbang.")
+    return EXIT_PROBLEMS if rows else EXIT_OK
+
+
+def _date(value):
+    # argparse type: a bad date is a usage error (exit 2), not a failed command
+    try:
+        datetime.strptime(value, "%Y-%m-%d")
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"tanggal tidak valid (format YYYY-MM-DD): {value}")
+    return value
+
+def _add_period_args(p):
+    end = p.add_mutually_exclusive_group()
+    end.add_argument("--as-of", type=_date, metavar="YYYY-MM-DD", help="saldo per tanggal ini")
+    end.add_argument("--to", dest="date_to", type=_date, metavar="YYYY-MM-DD", help="akhir periode")
+    p.add_argument("--from", dest="date_from", type=_date, metavar="YYYY-MM-DD", help="awal periode (mutasi saja)")
+
+def _check_period(ap, args):
+    # the order rule of period_args(), checked here so it exits as a usage error too
+    date_from = getattr(args, "date_from", None)
+    end = getattr(args, "as_of", None) or getattr(args, "date_to", None)
+    if date_from and end and date_from > end:
+        ap.error(f"--from {date_from} setelah tanggal akhir {end}")
+
+def build_parser():
+    ap = argparse.ArgumentParser(prog="sia", description="SIA tanpa GUI: laporan, export dan pemeliharaan database")
+    ap.add_argument("--db", help="file database (default: SIA_DB atau akuntansi.db)")
+    sub = ap.add_subparsers(dest="command", metavar="COMMAND")
+    sub.required = True
+
+    p = sub.add_parser("trial", help="neraca saldo")
+    p.add_argument("--adjusted", action="store_true", help="termasuk penyesuaian yang belum diterapkan")
+    p.add_argument("--format", choices=("table", "csv", "json"), default="table")
+    _add_period_args(p)
+    p.set_defaults(func=cmd_trial)
+
+    p = sub.add_parser("reports", help="laporan keuangan")
+    p.add_argument("--no-adjustments", action="store_true")
+    p.add_argument("--format", choices=("table", "json"), default="table")
+    _add_period_args(p)
+    p.set_defaults(func=cmd_reports)
+
+    for name, func, help_text in (("export-journal", cmd_export_journal, "jurnal ke Excel"),
+                                  ("export-adjusting", cmd_export_adjusting, "penyesuaian ke Excel")):
+        p = sub.add_parser(name, help=help_text)
+        p.add_argument("out")
+        p.set_defaults(func=func)
+
+    p = sub.add_parser("export-trial", help="neraca saldo ke Excel")
+    p.add_argument("out")
+    p.add_argument("--adjusted", action="store_true")
+    _add_period_args(p)
+    p.set_defaults(func=cmd_export_trial)
+
+    p = sub.add_parser("export-reports", help="laporan keuangan ke Excel atau PDF (dari ekstensi)")
+    p.add_argument("out")
+    p.add_argument("--no-adjustments", action="store_true")
+    _add_period_args(p)
+    p.set_defaults(func=cmd_export_reports)
+
+    p = sub.add_parser("apply-adjustments", help="terapkan penyesuaian ke jurnal")
+    p.set_defaults(func=cmd_apply_adjustments)
+
+    p = sub.add_parser("import-journal", help="impor jurnal dari CSV/XLSX")
+    p.add_argument("file")
+    p.add_argument("--errors", help="tulis baris yang gagal ke CSV ini")
+    p.set_defaults(func=cmd_import_journal)
+
+    p = sub.add_parser("close-period", help="tutup buku sampai tanggal ini (snapshot saldo, jurnal terkunci)")
+    p.add_argument("date", type=_date, metavar="YYYY-MM-DD")
+    p.set_defaults(func=cmd_close_period)
+
+    for name, func, help_text in (("periods", cmd_periods, "daftar periode yang ditutup"),
+                                  ("reopen-period", cmd_reopen_period, "buka kembali periode terakhir"),
+                                  ("verify-saldo", cmd_verify_saldo, "saldo_akun (dan snapshot periode) vs. hitung ulang penuh"),
+                                  ("rebuild-saldo", cmd_rebuild_saldo, "hitung ulang saldo_akun"),
+                                  ("check-indexes", cmd_check_indexes, "EXPLAIN QUERY PLAN query utama"),
+                                  ("check-journal", cmd_check_journal, "jurnal yang debit dan kreditnya tidak sama")):
+        p = sub.add_parser(name, help=help_text)
+        p.set_defaults(func=func)
+    return ap
+
+
+def main(argv=None):
+    ap = build_parser()
+    try:
+        args = ap.parse_args(argv)
+        _check_period(ap, args)
+    except SystemExit as e:
+        return e.code
+    # set before core.db is imported: it opens the database at import time
+    if args.db:
+        os.environ["SIA_DB"] = args.db
+    from core.config import DB_FILENAME
+    path = args.db or DB_FILENAME
+    if not os.path.exists(path):
+        print(f"error: database tidak ditemukan: {path}", file=sys.stderr)
+        return EXIT_USAGE
+    try:
+        if args.db and "core.db" in sys.modules:
+            sys.modules["core.db"].get_db().reopen(args.db)
+        return args.func(args)
+    except (sqlite3.Error, RuntimeError, OSError, ValueError) as e:
+        print(f"error: {e}", file=sys.stderr)
+        return EXIT_FAILED
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,197 +1,735 @@
+import sqlite3
+import time
+from datetime import datetime, timedelta
+
+from core.db import get_db
+from core.cache import VersionedLRUCache
+from core.config import (DB_MAX_RETRIES, DB_RETRY_BACKOFF, BALANCE_ENGINE, RESULT_CACHE_SIZE,
+                         EXPORT_PROGRESS_EVERY)
+from core.migrations import rebuild_saldo_akun
+from utils.helpers import to_decimal, to_cents, from_cents, SEN_PER_UNIT
+# openpyxl / reportlab are imported when an export runs, not at startup
+from utils.lazy import optional
+
+db = get_db()
+
+# compute_* results keyed by db.data_version(); any write invalidates them
+_results = VersionedLRUCache(RESULT_CACHE_SIZE)
+
+def _cached(key, compute):
+    # version is read before computing: a write racing the computation only
+    # makes the stored entry stale, never makes a stale entry look current
+    return _results.get_or_compute(key, db.data_version(), compute)
+
+def clear_result_cache():
+    _results.clear()
+
+def result_cache_info():
+    return _results.info()
+
+
 def list_accounts():
-    # returns list of tuples (no_akun, nama_akun, tipe, starting_balance)
+    # returns list of tuples (no_akun, nama_akun, tipe, starting_balance); amounts are stored as sen
     rows = db.fetchall("SELECT no_akun, nama_akun, tipe, IFNULL(starting_balance,0) FROM akun ORDER BY no_akun")
-    return rows
+    return [(no, nama, tipe, from_cents(sb)) for no, nama, tipe, sb in rows]
 
 def add_account_db(no, nama, tipe, starting_balance=0):
     db.execute("INSERT INTO akun (no_akun, nama_akun, tipe, starting_balance) VALUES (?, ?, ?, ?)",
-               (no, nama, tipe, float(starting_balance)), commit=True)
+               (no, nama, tipe, to_cents(starting_balance)), commit=True)
 
 def edit_account_db(no, nama, tipe, starting_balance=0):
     db.execute("UPDATE akun SET nama_akun=?, tipe=?, starting_balance=? WHERE no_akun=?",
-               (nama, tipe, float(starting_balance), no), commit=True)
+               (nama, tipe, to_cents(starting_balance), no), commit=True)
+
+# Hot queries, kept as constants so check_query_plans() can EXPLAIN exactly what runs
+# The hot paths name their index (INDEXED BY) so the plan does not depend on the
+# planner statistics, which can be stale, e.g. taken while the book was nearly empty.
+SQL_ACCOUNT_IN_USE = "SELECT EXISTS(SELECT 1 FROM journal_line INDEXED BY idx_line_akun WHERE no_akun=?)"
+SQL_JOURNAL_COLUMNS = "SELECT id, tanggal, akun_debit, akun_kredit, debit, kredit, keterangan FROM journal_header INDEXED BY idx_header_tanggal"
+SQL_LIST_JOURNAL = SQL_JOURNAL_COLUMNS + " ORDER BY tanggal, id"
+SQL_LIST_ADJUSTING = "SELECT id, tanggal, akun_debit, akun_kredit, debit, kredit, keterangan, applied FROM adjusting ORDER BY tanggal, id"
+SQL_LIST_ADJUSTING_PENDING = "SELECT id, tanggal, akun_debit, akun_kredit, debit, kredit, keterangan, applied FROM adjusting WHERE applied=0 ORDER BY tanggal, id"
+SQL_ENTRY_LINES = "SELECT line_no, no_akun, debit, kredit FROM journal_line INDEXED BY idx_line_header WHERE header_id=? ORDER BY line_no"
+SQL_UNBALANCED_ENTRIES = "SELECT id, tanggal, debit, kredit, keterangan FROM journal_header WHERE debit <> kredit ORDER BY tanggal, id"
 
 def delete_account_db(no):
-    cnt = db.fetchone("SELECT COUNT(*) FROM jurnal WHERE akun_debit=? OR akun_kredit=?", (no, no))[0]
-    if cnt > 0:
+    # one probe into idx_line_akun
+    in_use = db.fetchone(SQL_ACCOUNT_IN_USE, (no,))[0]
+    if in_use:
         raise ValueError("Tidak dapat menghapus akun yang memiliki transaksi.")
     db.execute("DELETE FROM akun WHERE no_akun=?", (no,), commit=True)
 
 def add_journal_db(tanggal, akun_debit, akun_kredit, debit, kredit, keterangan):
-    if float(debit) < 0 or float(kredit) < 0:
+    """Two-line entry (one debit account, one credit account). Returns the entry id."""
+    debit = to_cents(debit); kredit = to_cents(kredit)
+    if debit < 0 or kredit < 0:
         raise ValueError("Debit/Kredit tidak boleh negatif.")
-    if float(debit) == 0 and float(kredit) == 0:
+    if debit == 0 and kredit == 0:
         raise ValueError("Isi debit atau kredit minimal satu.")
-    # ensure accounts exist
-    cnt = db.fetchone("SELECT COUNT(*) FROM akun WHERE no_akun=?", (akun_debit,))[0]
-    if cnt == 0:
-        raise ValueError(f"Akun debit {akun_debit} tidak ditemukan")
-    cnt = db.fetchone("SELECT COUNT(*) FROM akun WHERE no_akun=?", (akun_kredit,))[0]
-    if cnt == 0:
-        raise ValueError(f"Akun kredit {akun_kredit} tidak ditemukan")
-    db.execute("""INSERT INTO jurnal (tanggal, akun_debit, akun_kredit, debit, kredit, keterangan)
-                  VALUES (?, ?, ?, ?, ?, ?)""", (tanggal, akun_debit, akun_kredit, float(debit), float(kredit), keterangan), commit=True)
+    # one amount is enough: the other side gets the same
+    debit = debit or kredit; kredit = kredit or debit
+    return _post_entry(tanggal, keterangan, [(akun_debit, debit, 0), (akun_kredit, 0, kredit)])
+
+SQL_INSERT_HEADER = """INSERT INTO journal_header (tanggal, keterangan, akun_debit, akun_kredit, debit, kredit)
+                       VALUES (?, ?, ?, ?, ?, ?)"""
+SQL_INSERT_LINE = """INSERT INTO journal_line (header_id, line_no, tanggal, no_akun, debit, kredit)
+                     VALUES (?, ?, ?, ?, ?, ?)"""
+
+def post_journal_entry(tanggal, keterangan, lines):
+    """
+    Post one compound entry. `lines` is a sequence of (no_akun, debit, kredit) in
+    rupiah with exactly one side filled per line; total debit must equal total
+    kredit. Header and lines are written in a single transaction. Returns the entry id.
+    """
+    rows = []
+    for no, debit, kredit in lines:
+        debit = to_cents(debit or 0); kredit = to_cents(kredit or 0)
+        if debit < 0 or kredit < 0:
+            raise ValueError("Debit/Kredit tidak boleh negatif.")
+        if (debit == 0) == (kredit == 0):
+            raise ValueError(f"Baris akun {no}: isi debit atau kredit, salah satu saja.")
+        rows.append((str(no).strip(), debit, kredit))
+    return _post_entry(tanggal, keterangan, rows)
+
+def _post_entry(tanggal, keterangan, rows):
+    # rows: [(no_akun, debit sen, kredit sen)]
+    try:
+        datetime.strptime(tanggal, "%Y-%m-%d")
+    except (TypeError, ValueError):
+        raise ValueError(f"Tanggal tidak valid (format YYYY-MM-DD): {tanggal}")
+    _check_open(tanggal)
+    if len(rows) < 2:
+        raise ValueError("Jurnal minimal terdiri dari dua baris.")
+    total_d = sum(r[1] for r in rows); total_k = sum(r[2] for r in rows)
+    if total_d != total_k:
+        raise ValueError(f"Jurnal tidak seimbang: debit {from_cents(total_d):,.2f}, kredit {from_cents(total_k):,.2f}")
+    accounts = sorted({r[0] for r in rows})
+    found = {no for (no,) in db.fetchall(
+        f"SELECT no_akun FROM akun WHERE no_akun IN ({', '.join('?' * len(accounts))})", accounts)}
+    missing = [no for no in accounts if no not in found]
+    if missing:
+        raise ValueError(f"Akun {', '.join(missing)} tidak ditemukan")
+    # listing summary: the accounts on each side in line order
+    side = lambda i: ", ".join(dict.fromkeys(r[0] for r in rows if r[i]))
+    # header and lines commit together (or not at all) when connection() exits
+    with db.connection(write=True) as conn:
+        header_id = conn.execute(SQL_INSERT_HEADER, (tanggal, keterangan, side(1), side(2),
+                                                     total_d, total_k)).lastrowid
+        conn.executemany(SQL_INSERT_LINE, [(header_id, n, tanggal, no, d, k)
+                                           for n, (no, d, k) in enumerate(rows, start=1)])
+    return header_id
+
+def journal_entry_lines(header_id):
+    """Lines of one entry: [(line_no, no_akun, debit, kredit)] with Decimal amounts."""
+    return [(n, no, from_cents(d), from_cents(k)) for n, no, d, k in db.fetchall(SQL_ENTRY_LINES, (header_id,))]
+
+def unbalanced_entries():
+    """Entries whose debit and kredit totals differ (only possible for rows migrated from the old jurnal table)."""
+    return [(_id, tgl, from_cents(d), from_cents(k), ket) for _id, tgl, d, k, ket in db.fetchall(SQL_UNBALANCED_ENTRIES)]
+
+def _entry_rows(rows):
+    # (id, tanggal, debit akun, kredit akun, debit sen, kredit sen, ...) -> amounts as Decimal rupiah
+    return [(r[0], r[1], r[2], r[3], from_cents(r[4]), from_cents(r[5])) + tuple(r[6:]) for r in rows]
 
 def list_journal_entries():
-    return db.fetchall("SELECT id, tanggal, akun_debit, akun_kredit, debit, kredit, keterangan FROM jurnal ORDER BY tanggal, id")
+    with db.iterfetch(SQL_LIST_JOURNAL) as rows:
+        return _entry_rows(rows)
+
+def _ledger_sql(date_from=None, date_to=None, limit=None):
+    # the account's lines are one (no_akun, tanggal, ...) range of idx_line_akun;
+    # the header only supplies keterangan, one rowid lookup per line
+    where = ""
+    if date_from:
+        where += " AND l.tanggal >= :date_from"
+    if date_to:
+        where += " AND l.tanggal <= :date_to"
+    sql = f"""
+        SELECT l.tanggal, l.header_id, (SELECT keterangan FROM journal_header WHERE id = l.header_id),
+               CASE WHEN l.kredit > 0 THEN NULL ELSE l.debit END,
+               CASE WHEN l.kredit > 0 THEN l.kredit END,
+               :awal + SUM(l.debit - l.kredit) OVER (ORDER BY l.tanggal, l.header_id, l.id ROWS UNBOUNDED PRECEDING)
+        FROM journal_line l INDEXED BY idx_line_akun
+        WHERE l.no_akun = :no{where}
+        ORDER BY l.tanggal, l.header_id, l.id"""
+    if limit is not None:
+        sql += " LIMIT :limit OFFSET :offset"
+    return sql
+
+# the account's balance before date_from: nearest closed-period snapshot plus the lines after it
+SQL_LEDGER_BEFORE = """
+    WITH snap AS (SELECT id, date_to FROM fiscal_period WHERE date_to < :date_from ORDER BY date_to DESC LIMIT 1)
+    SELECT IFNULL((SELECT debit - kredit FROM period_snapshot
+                    WHERE period_id = (SELECT id FROM snap) AND no_akun = :no), 0)
+         + (SELECT IFNULL(SUM(debit - kredit), 0) FROM journal_line INDEXED BY idx_line_akun
+             WHERE no_akun = :no AND tanggal > IFNULL((SELECT date_to FROM snap), '') AND tanggal < :date_from)
+"""
+
+def _ledger_opening(no, date_from=None):
+    # starting_balance signed by the account's normal side, plus everything before date_from (sen)
+    row = db.fetchone("SELECT tipe, IFNULL(starting_balance,0) FROM akun WHERE no_akun=?", (no,))
+    awal = 0
+    if row:
+        awal = row[1] if _is_debit_normal(row[0]) else -row[1]
+    if date_from:
+        awal += db.fetchone(SQL_LEDGER_BEFORE, {'no': no, 'date_from': date_from})[0]
+    return awal
+
+def ledger_for_account(no, date_from=None, date_to=None, limit=None, offset=0):
+    """
+    Buku besar for one account, optionally restricted to [date_from, date_to] and paged.
+    Returns one row per journal line on the account, (tanggal, entry id, keterangan,
+    debit, kredit, saldo) ordered by (tanggal, id); debit/kredit is None on the side
+    the line is not on. The running balance is
+    computed in SQL and seeded with the balance just before the first row, so it is
+    correct for any page. Cost is proportional to the account's own activity.
+    """
+    awal = _ledger_opening(no, date_from)
+    params = {'no': no, 'date_from': date_from, 'date_to': date_to, 'awal': awal,
+              'limit': limit, 'offset': offset or 0}
+    with db.iterfetch(_ledger_sql(date_from, date_to, limit), params) as rows:
+        return [(tgl, _id, ket, None if d is None else from_cents(d), None if k is None else from_cents(k), from_cents(bal))
+                for tgl, _id, ket, d, k, bal in rows]
 
 def delete_journal_db(_id):
-    db.execute("DELETE FROM jurnal WHERE id=?", (_id,), commit=True)
+    # the entry's lines go with it (trg_header_delete)
+    try:
+        db.execute("DELETE FROM journal_header WHERE id=?", (_id,), commit=True)
+    except sqlite3.IntegrityError as e:
+        # raised by the closed-period triggers
+        raise ValueError(f"{e}: jurnal {_id} tidak dapat dihapus.")
+
+# Journal paging (keyset on (tanggal, id) of the entries, served by idx_header_tanggal)
+SQL_JOURNAL_FIRST = SQL_LIST_JOURNAL + " LIMIT ?"
+SQL_JOURNAL_AFTER = (SQL_JOURNAL_COLUMNS +
+                     " WHERE (tanggal, id) > (?, ?) ORDER BY tanggal, id LIMIT ?")
+SQL_JOURNAL_BEFORE = (SQL_JOURNAL_COLUMNS +
+                      " WHERE (tanggal, id) < (?, ?) ORDER BY tanggal DESC, id DESC LIMIT ?")
+SQL_JOURNAL_KEY_AT = "SELECT tanggal, id FROM journal_header INDEXED BY idx_header_tanggal ORDER BY tanggal, id LIMIT 1 OFFSET ?"
+
+def journal_page(after=None, before=None, limit=200):
+    """
+    One window of the journal in (tanggal, id) order: the `limit` rows right after
+    the key `after`, right before the key `before`, or from the start. Keys are
+    (tanggal, id) tuples, e.g. taken from the first/last row of a neighbouring page.
+    """
+    if after is not None:
+        rows = db.fetchall(SQL_JOURNAL_AFTER, (after[0], after[1], limit))
+    elif before is not None:
+        rows = db.fetchall(SQL_JOURNAL_BEFORE, (before[0], before[1], limit))
+        rows.reverse()
+    else:
+        rows = db.fetchall(SQL_JOURNAL_FIRST, (limit,))
+    return _entry_rows(rows)
+
+def journal_key_at(offset):
+    """(tanggal, id) of the row at `offset` (walks the covering index; for jumps only)."""
+    row = db.fetchone(SQL_JOURNAL_KEY_AT, (offset,))
+    return tuple(row) if row else None
+
+def count_journal_entries():
+    return _cached(('journal_count',), lambda: db.fetchone("SELECT COUNT(*) FROM jurnal")[0])
 
 # Adjusting CRUD
 def add_adjusting_db(tanggal, akun_debit, akun_kredit, debit, kredit, keterangan):
     db.execute("""INSERT INTO adjusting (tanggal, akun_debit, akun_kredit, debit, kredit, keterangan, applied)
-                  VALUES (?, ?, ?, ?, ?, ?, 0)""", (tanggal, akun_debit, akun_kredit, float(debit), float(kredit), keterangan), commit=True)
+                  VALUES (?, ?, ?, ?, ?, ?, 0)""", (tanggal, akun_debit, akun_kredit, to_cents(debit), to_cents(kredit), keterangan), commit=True)
 
 def list_adjusting_entries(include_applied=False):
     if include_applied:
-        return db.fetchall("SELECT id, tanggal, akun_debit, akun_kredit, debit, kredit, keterangan, applied FROM adjusting ORDER BY tanggal, id")
+        sql = SQL_LIST_ADJUSTING
     else:
-        return db.fetchall("SELECT id, tanggal, akun_debit, akun_kredit, debit, kredit, keterangan, applied FROM adjusting WHERE applied=0 ORDER BY tanggal, id")
+        sql = SQL_LIST_ADJUSTING_PENDING
+    with db.iterfetch(sql) as rows:
+        return _entry_rows(rows)
 
 def delete_adjusting_db(_id):
     db.execute("DELETE FROM adjusting WHERE id=?", (_id,), commit=True)
 
+def explain_query_plan(sql, params=()):
+    return [row[3] for row in db.fetchall("EXPLAIN QUERY PLAN " + sql, params)]
+
+def check_query_plans():
+    """
+    Assert that the hot queries are served by the indexes from migrations 2, 4 and 5:
+    each must use the expected index and must not fall back to a full table
+    scan or a temp sort. Returns a list of (name, detail) problems; empty is OK.
+    """
+    expected = [
+        ('delete_account_guard', SQL_ACCOUNT_IN_USE, ('x',), ['idx_line_akun']),
+        ('list_journal_entries', SQL_LIST_JOURNAL, (), ['idx_header_tanggal']),
+        ('journal_page_after', SQL_JOURNAL_AFTER, ('2000-01-01', 1, 1), ['idx_header_tanggal']),
+        ('journal_page_before', SQL_JOURNAL_BEFORE, ('2000-01-01', 1, 1), ['idx_header_tanggal']),
+        ('journal_entry_lines', SQL_ENTRY_LINES, (1,), ['idx_line_header']),
+        ('pending_adjustments', SQL_LIST_ADJUSTING_PENDING, (), ['idx_adjusting_pending']),
+        # the ledger sorts only the account's own rows for the window, so a temp sort is fine
+        ('ledger_for_account', _ledger_sql('2000-01-01', '2000-12-31', 1),
+         {'no': 'x', 'date_from': '2000-01-01', 'date_to': '2000-12-31', 'awal': 0, 'limit': 1, 'offset': 0},
+         ['idx_line_akun']),
+        # lines after the nearest snapshot, by date or (skip-scan, few accounts) by account;
+        # the GROUP BY sorts per-account sums only
+        ('balances_as_of', SQL_BALANCES_AS_OF, {'as_of': '2000-01-01', 'adj': 0},
+         [('idx_line_tanggal', 'idx_line_akun')]),
+        # a period's movements only, e.g. a month's rows: one idx_line_tanggal range,
+        # or the same date range within each account (skip-scan)
+        ('balances_range', SQL_BALANCES_RANGE, {'date_from': '2000-01-01', 'as_of': '2000-01-31', 'adj': 0},
+         [('idx_line_tanggal', 'idx_line_akun')]),
+    ]
+    problems = []
+    for name, sql, params, indexes in expected:
+        plan = explain_query_plan(sql, params)
+        text = " | ".join(plan)
+        # a tuple lists indexes that are equally good
+        for idx in indexes:
+            options = idx if isinstance(idx, tuple) else (idx,)
+            if not any(o in text for o in options):
+                problems.append((name, f"{' / '.join(options)} tidak dipakai: {text}"))
+        for detail in plan:
+            words = detail.split()
+            if words[0] == "SCAN" and words[1] in ('journal_header', 'journal_line', 'adjusting', 'akun', 'l') and "INDEX" not in detail:
+                problems.append((name, f"full scan: {detail}"))
+            if "TEMP B-TREE" in detail and name not in ('ledger_for_account', 'balances_as_of', 'balances_range'):
+                problems.append((name, f"sort tanpa index: {detail}"))
+    return problems
+
+# pending adjusting entries -> journal entries dated today, keterangan noting the original date
+SQL_POST_ADJUSTMENTS = """
+    INSERT INTO journal_header (tanggal, akun_debit, akun_kredit, debit, kredit, keterangan)
+    SELECT ?, akun_debit, akun_kredit, debit, kredit,
+           CASE WHEN keterangan IS NULL OR keterangan = '' THEN 'Penyesuaian from ' || tanggal
+                ELSE keterangan || ' (Penyesuaian from ' || tanggal || ')' END
+    FROM adjusting WHERE applied=0 ORDER BY tanggal, id
+"""
+# a debit and a credit line for every header above the id high-water mark taken before
+SQL_POST_ADJUSTMENT_LINES = """
+    INSERT INTO journal_line (header_id, line_no, tanggal, no_akun, debit, kredit)
+    SELECT id, 1, tanggal, akun_debit, debit, 0 FROM journal_header WHERE id > :after
+    UNION ALL
+    SELECT id, 2, tanggal, akun_kredit, 0, kredit FROM journal_header WHERE id > :after
+    ORDER BY 1, 2
+"""
+SQL_MARK_ADJUSTMENTS_APPLIED = "UPDATE adjusting SET applied=1 WHERE applied=0"
+
+
+class AdjustmentResult:
+    def __init__(self, posted=0, marked=0, elapsed=0.0, retries=0):
+        self.posted = posted        # journal entries created
+        self.marked = marked        # adjusting rows flagged applied
+        self.elapsed = elapsed
+        self.retries = retries      # attempts repeated because the database was locked
+
+    def summary(self):
+        s = f"{self.posted} penyesuaian diterapkan ke jurnal ({self.elapsed * 1000:.0f} ms)"
+        if self.retries:
+            s += f", {self.retries}x diulang karena database terkunci"
+        return s
+
+
 def apply_adjustments():
     """
-    Apply adjusting entries that are not yet applied, copy them into jurnal with today's date,
-    and mark them as applied. Use transaction (single connection) for atomicity.
+    Post every pending adjusting entry as a two-line journal entry with today's
+    date and mark it applied. Set-based: INSERT ... SELECT for the headers and
+    for their lines and one UPDATE inside a single BEGIN IMMEDIATE transaction
+    (the write lock is taken up front, so nothing can add a pending row or an
+    entry between the statements). Retried when the database is locked.
+    Returns an AdjustmentResult.
     """
+    start = time.perf_counter()
     backoff = DB_RETRY_BACKOFF
     for attempt in range(1, DB_MAX_RETRIES + 1):
         try:
-            conn = db.connect()
-            cur = conn.cursor()
-            cur.execute("BEGIN")
-            cur.execute("SELECT id, tanggal, akun_debit, akun_kredit, debit, kredit, keterangan FROM adjusting WHERE applied=0")
-            rows = cur.fetchall()
-            if not rows:
-                cur.execute("COMMIT")
-                conn.close()
-                return 0
-            today = datetime.now().strftime("%Y-%m-%d")
-            applied = 0
-            for _id, tanggal, ad, ak, d, k, ket in rows:
-                note = f"{ket} (Penyesuaian from {tanggal})" if ket else f"Penyesuaian from {tanggal}"
-                cur.execute("""INSERT INTO jurnal (tanggal, akun_debit, akun_kredit, debit, kredit, keterangan)
-                               VALUES (?, ?, ?, ?, ?, ?)""", (today, ad, ak, float(d), float(k), note))
-                cur.execute("UPDATE adjusting SET applied=1 WHERE id=?", (_id,))
-                applied += 1
-            cur.execute("COMMIT")
-            conn.close()
-            return applied
+            # pooled connection; rolled back by db.connection() if anything below fails
+            with db.connection(write=True) as conn:
+                # inside a caller's write transaction the rows simply join it
+                own = not conn.in_transaction
+                if own:
+                    conn.execute("BEGIN IMMEDIATE")
+                after = conn.execute("SELECT IFNULL(MAX(id), 0) FROM journal_header").fetchone()[0]
+                posted = conn.execute(SQL_POST_ADJUSTMENTS, (datetime.now().strftime("%Y-%m-%d"),)).rowcount
+                lines = conn.execute(SQL_POST_ADJUSTMENT_LINES, {'after': after}).rowcount
+                marked = conn.execute(SQL_MARK_ADJUSTMENTS_APPLIED).rowcount
+                if posted != marked or lines != 2 * posted:
+                    raise sqlite3.DatabaseError(f"Penyesuaian tidak konsisten: {posted} diposting, {marked} ditandai")
+                if own:
+                    conn.execute("COMMIT")
+            break
         except sqlite3.OperationalError as e:
-            try:
-                conn.rollback()
-            except Exception:
-                pass
-            try:
-                conn.close()
-            except Exception:
-                pass
             if "locked" in str(e).lower() and attempt < DB_MAX_RETRIES:
                 time.sleep(backoff)
                 backoff *= 1.8
                 continue
             raise
-    return 0
+    result = AdjustmentResult(posted, marked, time.perf_counter() - start, attempt - 1)
+    if posted:
+        # rows added in bulk: refresh the journal's planner statistics
+        db.analyze("journal_header", "journal_line")
+    return result
+
 
 
 
+def _is_debit_normal(tipe):
+    return (tipe or "").lower() in ('asset', 'aset', 'expense', 'beban', 'cost')
 
-def compute_balances(include_adjustments=False):
+def _balances_cents(include_adjustments=False, engine=None, as_of=None, date_from=None):
     """
+    Per-account totals in integer sen: {no_akun: {'nama', 'tipe', 'debit', 'kredit'}}.
     include_adjustments: if True, include adjusting entries amounts (without applying).
     starting_balance from akun is taken into account:
       - for Asset/Expense: starting_balance treated as initial debit
       - for Liability/Equity/Revenue: starting_balance treated as initial credit
+    engine: "saldo", "sql" or "python" (default BALANCE_ENGINE); all give the same result.
+    as_of: only rows dated on or before it; starts from the nearest closed-period
+    snapshot and adds the lines after it (the "python" engine re-sums everything).
+    date_from: only the movements dated from it through as_of (one idx_line_tanggal
+    range), without starting balances.
+    """
+    engine = engine or BALANCE_ENGINE
+    if engine == "python":
+        return _compute_balances_full(include_adjustments, as_of, date_from)
+    params = {'adj': 1 if include_adjustments else 0, 'as_of': as_of, 'date_from': date_from}
+    if date_from is not None:
+        params['as_of'] = as_of or "9999-12-31"
+        sql = SQL_BALANCES_RANGE_ADJ if include_adjustments else SQL_BALANCES_RANGE
+    elif as_of is not None:
+        sql = SQL_BALANCES_AS_OF_ADJ if include_adjustments else SQL_BALANCES_AS_OF
+    elif engine == "saldo":
+        sql = SQL_BALANCES_SALDO
+    elif engine == "sql":
+        sql = SQL_BALANCES_GROUP_BY_ADJ if include_adjustments else SQL_BALANCES_GROUP_BY
+    else:
+        raise ValueError(f"Balance engine tidak dikenal: {engine}")
+    accs = {}
+    with db.iterfetch(sql, params) as rows:
+        for no, nama, tipe, sb, d, k, active, _unknown in rows:
+            # accounts missing from akun only show up when they have activity, like the full scan
+            if not active:
+                continue
+            if _is_debit_normal(tipe):
+                d += sb
+            else:
+                k += sb
+            accs[no] = {'nama': nama, 'tipe': tipe, 'debit': d, 'kredit': k}
+    return accs
+
+# Both engines return (no_akun, nama, tipe, starting_balance, debit, kredit, active, unknown);
+# known accounts first in no_akun order, as list_accounts() does.
+SQL_BALANCES_SALDO = """
+    SELECT a.no_akun, a.nama_akun, a.tipe, IFNULL(a.starting_balance,0),
+           IFNULL(s.debit,0) + :adj * IFNULL(s.adj_debit,0), IFNULL(s.kredit,0) + :adj * IFNULL(s.adj_kredit,0), 1, 0
+    FROM akun a LEFT JOIN saldo_akun s ON s.no_akun = a.no_akun
+    UNION ALL
+    SELECT s.no_akun, s.no_akun, 'Unknown', 0, s.debit + :adj * s.adj_debit, s.kredit + :adj * s.adj_kredit,
+           s.n_jurnal + :adj * s.n_adj > 0, 1
+    FROM saldo_akun s WHERE NOT EXISTS (SELECT 1 FROM akun a WHERE a.no_akun = s.no_akun)
+    ORDER BY 8, 1
+"""
+
+def _per_account_sql(sides, ctes="", opening="IFNULL(a.starting_balance,0)"):
+    # (no_akun, d, k) movement selects -> the rows _balances_cents() reads
+    return f"""
+        WITH {ctes}mutasi AS ({" UNION ALL ".join(sides)}),
+        per_akun AS (SELECT no_akun, SUM(d) AS d, SUM(k) AS k FROM mutasi GROUP BY no_akun)
+        SELECT a.no_akun, a.nama_akun, a.tipe, {opening}, IFNULL(p.d,0), IFNULL(p.k,0), 1, 0
+        FROM akun a LEFT JOIN per_akun p ON p.no_akun = a.no_akun
+        UNION ALL
+        SELECT p.no_akun, p.no_akun, 'Unknown', 0, p.d, p.k, 1, 1
+        FROM per_akun p WHERE NOT EXISTS (SELECT 1 FROM akun a WHERE a.no_akun = p.no_akun)
+        ORDER BY 8, 1
+    """
+
+def _adjusting_sides(where=""):
+    return [f"SELECT akun_debit, SUM(debit), 0 FROM adjusting{where} GROUP BY akun_debit",
+            f"SELECT akun_kredit, 0, SUM(kredit) FROM adjusting{where} GROUP BY akun_kredit"]
+
+def _group_by_balances_sql(include_adjustments):
+    # journal lines grouped in idx_line_akun order (the index covers the amounts)
+    sides = ["SELECT no_akun, SUM(debit) AS d, SUM(kredit) AS k FROM journal_line GROUP BY no_akun"]
+    if include_adjustments:
+        sides += _adjusting_sides()
+    return _per_account_sql(sides)
+
+def _as_of_balances_sql(include_adjustments):
+    # nearest snapshot on or before :as_of + the lines after it (an idx_line_tanggal range)
+    snap = "snap AS (SELECT id, date_to FROM fiscal_period WHERE date_to <= :as_of ORDER BY date_to DESC LIMIT 1), "
+    sides = ["SELECT no_akun, debit AS d, kredit AS k FROM period_snapshot WHERE period_id = (SELECT id FROM snap)",
+             "SELECT no_akun, SUM(debit), SUM(kredit) FROM journal_line"
+             " WHERE tanggal > IFNULL((SELECT date_to FROM snap), '') AND tanggal <= :as_of GROUP BY no_akun"]
+    if include_adjustments:
+        sides += _adjusting_sides(" WHERE tanggal <= :as_of")
+    return _per_account_sql(sides, snap)
+
+def _range_balances_sql(include_adjustments):
+    # movements dated in [:date_from, :as_of] only: the period's rows of idx_line_tanggal
+    where = " WHERE tanggal >= :date_from AND tanggal <= :as_of"
+    sides = [f"SELECT no_akun, SUM(debit) AS d, SUM(kredit) AS k FROM journal_line{where} GROUP BY no_akun"]
+    if include_adjustments:
+        sides += _adjusting_sides(where)
+    return _per_account_sql(sides, opening="0")
+
+SQL_BALANCES_GROUP_BY = _group_by_balances_sql(False)
+SQL_BALANCES_GROUP_BY_ADJ = _group_by_balances_sql(True)
+SQL_BALANCES_AS_OF = _as_of_balances_sql(False)
+SQL_BALANCES_AS_OF_ADJ = _as_of_balances_sql(True)
+SQL_BALANCES_RANGE = _range_balances_sql(False)
+SQL_BALANCES_RANGE_ADJ = _range_balances_sql(True)
+
+def period_args(as_of=None, date_from=None, date_to=None):
+    """
+    (date_from, end) from the public date arguments: as_of is the same as date_to
+    without a date_from. Dates are 'YYYY-MM-DD'; None or '' means unbounded.
+    """
+    if as_of and date_to:
+        raise ValueError("Isi as_of atau date_to, tidak keduanya.")
+    end = as_of or date_to or None
+    date_from = date_from or None
+    for d in (date_from, end):
+        if d is not None:
+            try:
+                datetime.strptime(d, "%Y-%m-%d")
+            except (TypeError, ValueError):
+                raise ValueError(f"Tanggal tidak valid (format YYYY-MM-DD): {d}")
+    if date_from and end and date_from > end:
+        raise ValueError(f"Tanggal awal {date_from} setelah tanggal akhir {end}.")
+    return date_from, end
+
+def compute_balances(include_adjustments=False, engine=None, as_of=None, date_from=None, date_to=None):
+    """Same as _balances_cents() with debit/kredit as Decimal rupiah (cached, read-only)."""
+    date_from, end = period_args(as_of, date_from, date_to)
+    return _cached(('balances', bool(include_adjustments), engine or BALANCE_ENGINE, date_from, end), lambda: {
+        no: {'nama': info['nama'], 'tipe': info['tipe'],
+             'debit': from_cents(info['debit']), 'kredit': from_cents(info['kredit'])}
+        for no, info in _balances_cents(include_adjustments, engine, end, date_from).items()})
+
+def rebuild_saldo():
+    """Recompute saldo_akun from scratch (e.g. after editing the database outside the app)."""
+    with db.connection(write=True) as conn:
+        cur = conn.cursor()
+        cur.execute("BEGIN IMMEDIATE")
+        rebuild_saldo_akun(cur)
+        cur.execute("COMMIT")
+
+def verify_saldo():
+    """
+    Compare the materialized balances with a full recomputation, with and without
+    adjustments. Returns a list of (include_adjustments, no_akun, field, saldo, full)
+    in sen; empty means the table is consistent.
+    """
+    mismatches = []
+    for include_adjustments in (False, True):
+        fast = _balances_cents(include_adjustments, engine="saldo")
+        full = _compute_balances_full(include_adjustments)
+        for no in sorted(set(fast) | set(full)):
+            a = fast.get(no); b = full.get(no)
+            if a is None or b is None:
+                mismatches.append((include_adjustments, no, 'akun', a is not None, b is not None))
+                continue
+            for field in ('debit', 'kredit'):
+                if a[field] != b[field]:
+                    mismatches.append((include_adjustments, no, field, a[field], b[field]))
+    return mismatches
+
+def _compute_balances_full(include_adjustments=False, as_of=None, date_from=None):
+    """
+    Reference implementation ("python" engine): re-sums every journal line and
+    adjusting row in Python (integer sen). verify_saldo() checks saldo_akun against it.
     """
     accs = {}
     # load accounts + starting balance
-    for no, nama, tipe, sb in list_accounts():
-        sb_dec = to_decimal(sb)
-        debit = to_decimal('0'); kredit = to_decimal('0')
-        t = (tipe or "").lower()
-        if t in ('asset', 'aset', 'expense', 'beban', 'cost'):
-            debit += sb_dec
+    for no, nama, tipe, sb in db.fetchall("SELECT no_akun, nama_akun, tipe, IFNULL(starting_balance,0) FROM akun ORDER BY no_akun"):
+        if date_from is not None:
+            sb = 0   # movements of a period only
+        if _is_debit_normal(tipe):
+            accs[no] = {'nama': nama, 'tipe': tipe, 'debit': sb, 'kredit': 0}
         else:
-            kredit += sb_dec
-        accs[no] = {'nama': nama, 'tipe': tipe, 'debit': debit, 'kredit': kredit}
-    # base jurnal
-    for _id, tanggal, ad, ak, d, k, ket in list_journal_entries():
-        d = to_decimal(d); k = to_decimal(k)
-        if ad not in accs:
-            accs[ad] = {'nama': ad, 'tipe': 'Unknown', 'debit': to_decimal('0'), 'kredit': to_decimal('0')}
-        if ak not in accs:
-            accs[ak] = {'nama': ak, 'tipe': 'Unknown', 'debit': to_decimal('0'), 'kredit': to_decimal('0')}
-        accs[ad]['debit'] += d
-        accs[ak]['kredit'] += k
+            accs[no] = {'nama': nama, 'tipe': tipe, 'debit': 0, 'kredit': sb}
+    def account(no):
+        if no not in accs:
+            accs[no] = {'nama': no, 'tipe': 'Unknown', 'debit': 0, 'kredit': 0}
+        return accs[no]
+    # streamed: memory stays at one fetch batch however long the history is
+    conds = []; params = []
+    if date_from is not None:
+        conds.append("tanggal >= ?"); params.append(date_from)
+    if as_of is not None:
+        conds.append("tanggal <= ?"); params.append(as_of)
+    where = " WHERE " + " AND ".join(conds) if conds else ""
+    with db.iterfetch("SELECT no_akun, debit, kredit FROM journal_line" + where, params) as rows:
+        for no, d, k in rows:
+            acc = account(no)
+            acc['debit'] += d
+            acc['kredit'] += k
     if include_adjustments:
-        adj_rows = db.fetchall("SELECT id, tanggal, akun_debit, akun_kredit, debit, kredit, keterangan FROM adjusting")
-        for _id, tanggal, ad, ak, d, k, ket in adj_rows:
-            d = to_decimal(d); k = to_decimal(k)
-            if ad not in accs:
-                accs[ad] = {'nama': ad, 'tipe': 'Unknown', 'debit': to_decimal('0'), 'kredit': to_decimal('0')}
-            if ak not in accs:
-                accs[ak] = {'nama': ak, 'tipe': 'Unknown', 'debit': to_decimal('0'), 'kredit': to_decimal('0')}
-            accs[ad]['debit'] += d
-            accs[ak]['kredit'] += k
+        with db.iterfetch("SELECT akun_debit, akun_kredit, debit, kredit FROM adjusting" + where, params) as rows:
+            for ad, ak, d, k in rows:
+                account(ad)['debit'] += d
+                account(ak)['kredit'] += k
     return accs
 
-def compute_trial_rows(include_adjustments=False):
-    bal = compute_balances(include_adjustments=include_adjustments)
+# ---------------- fiscal periods ----------------
+SQL_LAST_PERIOD = "SELECT id, date_from, date_to FROM fiscal_period ORDER BY date_to DESC LIMIT 1"
+# cumulative totals through :date_to = previous snapshot + the lines of the period
+SQL_SNAPSHOT_PERIOD = """
+    INSERT INTO period_snapshot (period_id, no_akun, debit, kredit)
+    SELECT :pid, no_akun, SUM(d), SUM(k) FROM (
+        SELECT no_akun, debit AS d, kredit AS k FROM period_snapshot WHERE period_id = :prev
+        UNION ALL
+        SELECT no_akun, debit, kredit FROM journal_line WHERE tanggal > :after AND tanggal <= :date_to
+    ) GROUP BY no_akun
+"""
+
+def closed_through():
+    """Last day of the last closed period ('YYYY-MM-DD'), or None when no period is closed."""
+    return db.fetchone("SELECT MAX(date_to) FROM fiscal_period")[0]
+
+def _check_open(tanggal):
+    closed = closed_through()
+    if closed and tanggal <= closed:
+        raise ValueError(f"Periode sampai {closed} sudah ditutup; jurnal tanggal {tanggal} tidak dapat diubah.")
+
+def list_periods():
+    """Closed periods: [(id, date_from, date_to, closed_at)] oldest first."""
+    return db.fetchall("SELECT id, date_from, date_to, closed_at FROM fiscal_period ORDER BY date_to")
+
+def close_period(date_to):
+    """
+    Close the books through `date_to` (YYYY-MM-DD, before today): the period runs
+    from the day after the previous close (or the first entry) to `date_to`.
+    Every account's cumulative journal totals are stored in period_snapshot,
+    computed from the previous snapshot plus this period's lines, and entries
+    dated on or before `date_to` can no longer be added, changed or deleted.
+    Returns the period id.
+    """
+    try:
+        end = datetime.strptime(date_to, "%Y-%m-%d")
+    except (TypeError, ValueError):
+        raise ValueError(f"Tanggal tidak valid (format YYYY-MM-DD): {date_to}")
+    if date_to >= datetime.now().strftime("%Y-%m-%d"):
+        raise ValueError("Periode hanya dapat ditutup sampai tanggal kemarin.")
+    with db.connection(write=True) as conn:
+        own = not conn.in_transaction
+        if own:
+            conn.execute("BEGIN IMMEDIATE")
+        last = conn.execute(SQL_LAST_PERIOD).fetchone()
+        if last and date_to <= last[2]:
+            raise ValueError(f"Periode sampai {last[2]} sudah ditutup.")
+        if last:
+            date_from = (datetime.strptime(last[2], "%Y-%m-%d") + timedelta(days=1)).strftime("%Y-%m-%d")
+        else:
+            first = conn.execute("SELECT MIN(tanggal) FROM journal_header").fetchone()[0]
+            date_from = min(first or date_to, date_to)
+        pid = conn.execute("INSERT INTO fiscal_period (date_from, date_to, closed_at) VALUES (?, ?, ?)",
+                           (date_from, end.strftime("%Y-%m-%d"), datetime.now().strftime("%Y-%m-%d %H:%M:%S"))).lastrowid
+        conn.execute(SQL_SNAPSHOT_PERIOD, {'pid': pid, 'prev': last[0] if last else None,
+                                           'after': last[2] if last else '', 'date_to': date_to})
+        if own:
+            conn.execute("COMMIT")
+    return pid
+
+def reopen_last_period():
+    """Reopen the most recently closed period (its snapshot is dropped). Returns its date_to, or None."""
+    with db.connection(write=True) as conn:
+        last = conn.execute(SQL_LAST_PERIOD).fetchone()
+        if not last:
+            return None
+        conn.execute("DELETE FROM period_snapshot WHERE period_id=?", (last[0],))
+        conn.execute("DELETE FROM fiscal_period WHERE id=?", (last[0],))
+    return last[2]
+
+def verify_period_snapshots():
+    """
+    Compare every period snapshot with the journal lines through its last day.
+    Returns [(date_to, no_akun, field, snapshot, recomputed)] in sen; empty is OK.
+    """
+    mismatches = []
+    for pid, _date_from, date_to, _closed_at in list_periods():
+        snap = {no: (d, k) for no, d, k in db.fetchall(
+            "SELECT no_akun, debit, kredit FROM period_snapshot WHERE period_id=?", (pid,))}
+        full = {no: (d, k) for no, d, k in db.fetchall(
+            "SELECT no_akun, SUM(debit), SUM(kredit) FROM journal_line WHERE tanggal <= ? GROUP BY no_akun", (date_to,))}
+        for no in sorted(set(snap) | set(full)):
+            a = snap.get(no, (0, 0)); b = full.get(no, (0, 0))
+            for i, field in enumerate(('debit', 'kredit')):
+                if a[i] != b[i]:
+                    mismatches.append((date_to, no, field, a[i], b[i]))
+    return mismatches
+
+def _trial_rows_cents(bal):
     rows = []
     for no in sorted(bal.keys()):
         d = bal[no]['debit']; c = bal[no]['kredit']
         if d >= c:
-            debit_bal = d - c; credit_bal = to_decimal('0')
+            debit_bal = d - c; credit_bal = 0
         else:
-            debit_bal = to_decimal('0'); credit_bal = c - d
+            debit_bal = 0; credit_bal = c - d
         rows.append((no, bal[no]['nama'], bal[no]['tipe'], debit_bal, credit_bal))
     return rows
 
-def prepare_balance_and_ratios(include_adjustments=False):
-    rows = compute_trial_rows(include_adjustments=include_adjustments)
-    assets = to_decimal('0'); liabilities = to_decimal('0'); equity = to_decimal('0')
+def compute_trial_rows(include_adjustments=False, as_of=None, date_from=None, date_to=None):
+    """
+    Neraca saldo rows (no_akun, nama, tipe, debit, kredit). With as_of (or only
+    date_to) the balances on that date; with date_from the movements of the
+    period [date_from, date_to] alone, without starting balances.
+    """
+    date_from, end = period_args(as_of, date_from, date_to)
+    def _compute():
+        rows = _trial_rows_cents(_balances_cents(include_adjustments, as_of=end, date_from=date_from))
+        return [(no, nm, tipe, from_cents(d), from_cents(c)) for no, nm, tipe, d, c in rows]
+    return _cached(('trial_rows', bool(include_adjustments), date_from, end), _compute)
+
+def prepare_balance_and_ratios(include_adjustments=False, as_of=None):
+    _date_from, end = period_args(as_of)
+    return _cached(('ratios', bool(include_adjustments), end), lambda: _ratios_from_trial_cents(
+        _trial_rows_cents(_balances_cents(include_adjustments, as_of=end))))
+
+def _ratios_from_trial_cents(rows):
+    assets = 0; liabilities = 0; equity = 0
     for no, nm, tipe, d, c in rows:
         bal = d - c
         t = (tipe or "").lower()
         if t in ('asset', 'aset'):
-            assets += max(bal, to_decimal('0'))
+            assets += max(bal, 0)
         elif t in ('liability', 'kewajiban', 'liab'):
-            liabilities += max(-bal, to_decimal('0'))
+            liabilities += max(-bal, 0)
         elif t in ('equity', 'ekuitas'):
-            equity += max(-bal, to_decimal('0'))
+            equity += max(-bal, 0)
+    # ratios of two sen amounts are the same as of the rupiah amounts
     current_ratio = None; debt_to_equity = None
-    try:
-        if liabilities != to_decimal('0'):
-            current_ratio = assets / liabilities
-    except Exception:
-        current_ratio = None
-    try:
-        if equity != to_decimal('0'):
-            debt_to_equity = liabilities / equity
-    except Exception:
-        debt_to_equity = None
-    return {'assets': assets, 'liabilities': liabilities, 'equity': equity,
+    if liabilities != 0:
+        current_ratio = to_decimal(assets) / to_decimal(liabilities)
+    if equity != 0:
+        debt_to_equity = to_decimal(liabilities) / to_decimal(equity)
+    return {'assets': from_cents(assets), 'liabilities': from_cents(liabilities), 'equity': from_cents(equity),
             'current_ratio': current_ratio, 'debt_to_equity': debt_to_equity}
 
 
-def compute_financial_statements(include_adjustments=False):
-    balances = compute_balances(include_adjustments=include_adjustments)
+def compute_financial_statements(include_adjustments=False, as_of=None, date_from=None, date_to=None):
+    """
+    (income statement, balance sheet, equity reconciliation). The balance sheet is
+    as of as_of/date_to (default: everything); with date_from the income statement
+    covers only the period [date_from, date_to].
+    """
+    date_from, end = period_args(as_of, date_from, date_to)
+    def _compute():
+        closing = _balances_cents(include_adjustments, as_of=end)
+        period = _balances_cents(include_adjustments, as_of=end, date_from=date_from) if date_from else None
+        return _statements_from_balances_cents(closing, period)
+    return _cached(('statements', bool(include_adjustments), date_from, end), _compute)
+
+def _statements_from_balances_cents(balances, period_balances=None):
+    # revenue/expense from the period's movements when given, the balance sheet from `balances`
     revenues = []; expenses = []
-    for no, info in balances.items():
+    for no, info in (balances if period_balances is None else period_balances).items():
         t = (info['tipe'] or "").lower()
         d = info['debit']; c = info['kredit']
         bal = d - c
         if t in ('revenue','pendapatan','income'):
-            rev_amt = max(to_decimal('0'), -bal)
+            rev_amt = max(0, -bal)
             if rev_amt != 0: revenues.append((no, info['nama'], rev_amt))
         elif t in ('expense','beban','cost'):
-            exp_amt = max(to_decimal('0'), bal)
+            exp_amt = max(0, bal)
             if exp_amt != 0: expenses.append((no, info['nama'], exp_amt))
-    total_revenue = sum((r[2] for r in revenues), to_decimal('0'))
-    total_expense = sum((e[2] for e in expenses), to_decimal('0'))
+    total_revenue = sum(r[2] for r in revenues)
+    total_expense = sum(e[2] for e in expenses)
     net_income = total_revenue - total_expense
 
     assets = []; liabilities = []; equity_lst = []
@@ -200,65 +738,178 @@ def compute_financial_statements(include_adjustments=False):
         d = info['debit']; c = info['kredit']
         bal = d - c
         if t in ('asset','aset'):
-            amt = max(bal, to_decimal('0'))
+            amt = max(bal, 0)
             if amt != 0: assets.append((no, info['nama'], amt))
         elif t in ('liability','kewajiban','liab'):
-            amt = max(-bal, to_decimal('0'))
+            amt = max(-bal, 0)
             if amt != 0: liabilities.append((no, info['nama'], amt))
         elif t in ('equity','ekuitas'):
-            amt = max(-bal, to_decimal('0'))
+            amt = max(-bal, 0)
             if amt != 0: equity_lst.append((no, info['nama'], amt))
 
-    total_equity_end = sum((e[2] for e in equity_lst), to_decimal('0'))
+    total_equity_end = sum(e[2] for e in equity_lst)
     total_equity_begin = total_equity_end - net_income
+    # everything above is integer sen; convert once for presentation
+    dec = lambda lst: [(no, nm, from_cents(amt)) for no, nm, amt in lst]
     equity_reconciliation = [
-        ("Beginning Equity (approx)", total_equity_begin),
-        ("Net Income (Laba/Rugi)", net_income),
-        ("Ending Equity", total_equity_end)
+        ("Beginning Equity (approx)", from_cents(total_equity_begin)),
+        ("Net Income (Laba/Rugi)", from_cents(net_income)),
+        ("Ending Equity", from_cents(total_equity_end))
     ]
-    income_statement = {'revenues': revenues, 'expenses': expenses, 'total_revenue': total_revenue, 'total_expense': total_expense, 'net_income': net_income}
-    balance_sheet = {'assets': assets, 'liabilities': liabilities, 'equity': equity_lst, 'total_assets': sum((a[2] for a in assets), to_decimal('0')), 'total_liabilities': sum((l[2] for l in liabilities), to_decimal('0')), 'total_equity': total_equity_end}
+    income_statement = {'revenues': dec(revenues), 'expenses': dec(expenses), 'total_revenue': from_cents(total_revenue), 'total_expense': from_cents(total_expense), 'net_income': from_cents(net_income)}
+    balance_sheet = {'assets': dec(assets), 'liabilities': dec(liabilities), 'equity': dec(equity_lst), 'total_assets': from_cents(sum(a[2] for a in assets)), 'total_liabilities': from_cents(sum(l[2] for l in liabilities)), 'total_equity': from_cents(total_equity_end)}
     return income_statement, balance_sheet, equity_reconciliation
 
 
-def export_trial_to_excel(path, include_adjustments=False):
-    if Workbook is None:
-        raise RuntimeError("openpyxl tidak terpasang")
-    rows = compute_trial_rows(include_adjustments)
-    wb = Workbook(); ws = wb.active; ws.title = "Neraca Saldo"
-    ws.append(["No Akun","Nama","Tipe","Debit","Kredit"])
-    for r in rows:
-        ws.append([r[0], r[1], r[2], float(r[3]), float(r[4])])
+class LedgerView:
+    """
+    Everything the UI and exporters derive from one set of balances (with or
+    without adjustments), computed once. Amounts are Decimal like the compute_*
+    functions return; treat the contents as read-only.
+    """
+    __slots__ = ('include_adjustments', 'date_from', 'date_to', 'balances', 'trial_rows', 'income_statement',
+                 'balance_sheet', 'equity_reconciliation', 'ratios')
+
+    def __init__(self, balances_cents, include_adjustments, period_cents=None, date_from=None, date_to=None):
+        # balances_cents: as of date_to; period_cents: movements from date_from (trial rows, income)
+        self.include_adjustments = include_adjustments
+        self.date_from = date_from
+        self.date_to = date_to
+        trial_cents = _trial_rows_cents(balances_cents)
+        self.balances = {no: {'nama': info['nama'], 'tipe': info['tipe'],
+                              'debit': from_cents(info['debit']), 'kredit': from_cents(info['kredit'])}
+                         for no, info in balances_cents.items()}
+        shown = trial_cents if period_cents is None else _trial_rows_cents(period_cents)
+        self.trial_rows = [(no, nm, tipe, from_cents(d), from_cents(c)) for no, nm, tipe, d, c in shown]
+        self.income_statement, self.balance_sheet, self.equity_reconciliation = \
+            _statements_from_balances_cents(balances_cents, period_cents)
+        self.ratios = _ratios_from_trial_cents(trial_cents)
+
+    def statements(self):
+        # same tuple compute_financial_statements() returns
+        return self.income_statement, self.balance_sheet, self.equity_reconciliation
+
+
+class LedgerSnapshot:
+    """
+    One consistent picture of the books for a refresh: the unadjusted view (trial
+    balance, dashboard) and the adjusted view (adjusted trial, reports), each built
+    from a single balance query. Consumers read from it instead of re-aggregating.
+    """
+    def __init__(self, base, adjusted, data_version=None, date_from=None, date_to=None):
+        self.base = base
+        self.adjusted = adjusted
+        self.data_version = data_version
+        self.date_from = date_from
+        self.date_to = date_to
+
+    def view(self, include_adjustments=False):
+        return self.adjusted if include_adjustments else self.base
+
+
+def _ledger_view(snapshot, include_adjustments, date_from=None, date_to=None):
+    # exporters called without a snapshot reuse the cached one for this data version and period
+    return (snapshot or build_snapshot(date_from=date_from, date_to=date_to)).view(include_adjustments)
+
+def build_snapshot(engine=None, as_of=None, date_from=None, date_to=None):
+    """
+    Snapshot of the books at the current data version, as of as_of/date_to and,
+    with date_from, with trial rows and income statement for that period only
+    (see compute_trial_rows). Unchanged data returns the same (cached) snapshot,
+    so repeated refreshes and exports are free.
+    """
+    date_from, end = period_args(as_of, date_from, date_to)
+    version = db.data_version()
+    def _view(adj):
+        period = _balances_cents(adj, engine, end, date_from) if date_from else None
+        return LedgerView(_balances_cents(adj, engine, end), adj, period, date_from, end)
+    def _compute():
+        return LedgerSnapshot(_view(False), _view(True), version, date_from, end)
+    return _results.get_or_compute(('snapshot', engine or BALANCE_ENGINE, date_from, end), version, _compute)
+
+def period_label(date_from=None, date_to=None):
+    """Report subtitle for a period: 'Periode A s.d. B', 'Per B', or '' for everything."""
+    if date_from:
+        return f"Periode {date_from} s.d. {date_to or datetime.now().strftime('%Y-%m-%d')}"
+    return f"Per {date_to}" if date_to else ""
+
+
+class ExportCancelled(Exception):
+    """Raised by an exporter when its cancelled() callback returned True; nothing is saved."""
+
+
+def _write_rows(ws, rows, progress=None, cancelled=None):
+    """
+    Append rows to a write-only sheet, calling progress(rows_written, rows_per_second)
+    every EXPORT_PROGRESS_EVERY rows and at the end, and checking cancelled() as often.
+    """
+    start = time.perf_counter()
+    n = 0
+    for n, row in enumerate(rows, start=1):
+        ws.append(row)
+        if n % EXPORT_PROGRESS_EVERY == 0:
+            if cancelled and cancelled():
+                raise ExportCancelled()
+            if progress:
+                progress(n, n / max(time.perf_counter() - start, 1e-6))
+    if progress:
+        progress(n, n / max(time.perf_counter() - start, 1e-6))
+    return n
+
+def _new_workbook():
+    Workbook = optional("openpyxl").Workbook
+    # write-only: rows are streamed to disk, memory stays flat however big the sheet
+    return Workbook(write_only=True)
+
+def _save_workbook(wb, path, cancelled=None):
+    if cancelled and cancelled():
+        raise ExportCancelled()
     wb.save(path)
 
-def export_journal_to_excel(path):
-    if Workbook is None:
-        raise RuntimeError("openpyxl tidak terpasang")
-    rows = list_journal_entries()
-    wb = Workbook(); ws = wb.active; ws.title = "Jurnal"
+def export_trial_to_excel(path, include_adjustments=False, snapshot=None, progress=None, cancelled=None,
+                          date_from=None, date_to=None):
+    wb = _new_workbook()
+    rows = _ledger_view(snapshot, include_adjustments, date_from, date_to).trial_rows
+    ws = wb.create_sheet("Neraca Saldo")
+    ws.append(["No Akun","Nama","Tipe","Debit","Kredit"])
+    _write_rows(ws, ([r[0], r[1], r[2], float(r[3]), float(r[4])] for r in rows), progress, cancelled)
+    _save_workbook(wb, path, cancelled)
+
+def export_journal_to_excel(path, progress=None, cancelled=None):
+    wb = _new_workbook()
+    ws = wb.create_sheet("Jurnal")
     ws.append(["ID","Tanggal","Akun Debit","Akun Kredit","Debit","Kredit","Keterangan"])
-    for r in rows:
-        ws.append([r[0], r[1], r[2], r[3], float(r[4]), float(r[5]), r[6]])
-    wb.save(path)
+    # streamed straight from the cursor; sen / 100 is the same float as float(Decimal rupiah)
+    with db.iterfetch(SQL_LIST_JOURNAL) as rows:
+        _write_rows(ws, ([_id, tgl, ad, ak, d / SEN_PER_UNIT, k / SEN_PER_UNIT, ket]
+                         for _id, tgl, ad, ak, d, k, ket in rows), progress, cancelled)
+    _save_workbook(wb, path, cancelled)
 
-def export_adjusting_to_excel(path):
-    if Workbook is None:
-        raise RuntimeError("openpyxl tidak terpasang")
-    rows = db.fetchall("SELECT id, tanggal, akun_debit, akun_kredit, debit, kredit, keterangan, applied FROM adjusting ORDER BY tanggal, id")
-    wb = Workbook(); ws = wb.active; ws.title = "Penyesuaian"
+def export_adjusting_to_excel(path, progress=None, cancelled=None):
+    wb = _new_workbook()
+    ws = wb.create_sheet("Penyesuaian")
     ws.append(["ID","Tanggal","Akun Debit","Akun Kredit","Debit","Kredit","Keterangan","Applied"])
-    for r in rows:
-        ws.append([r[0], r[1], r[2], r[3], float(r[4]), float(r[5]), r[6], r[7]])
-    wb.save(path)
+    with db.iterfetch(SQL_LIST_ADJUSTING) as rows:
+        _write_rows(ws, ([_id, tgl, ad, ak, d / SEN_PER_UNIT, k / SEN_PER_UNIT, ket, ap]
+                         for _id, tgl, ad, ak, d, k, ket, ap in rows), progress, cancelled)
+    _save_workbook(wb, path, cancelled)
 
-def export_reports_to_pdf(path, include_adjustments=True):
-    if SimpleDocTemplate is None:
-        raise RuntimeError("reportlab tidak terpasang")
-    income, balance, eq_rec = compute_financial_statements(include_adjustments=include_adjustments)
+def export_reports_to_pdf(path, include_adjustments=True, snapshot=None, progress=None, cancelled=None,
+                          date_from=None, date_to=None):
+    optional("reportlab")
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
+    from reportlab.lib.pagesizes import landscape, letter
+    from reportlab.lib import colors
+    from reportlab.lib.styles import getSampleStyleSheet
+    view = _ledger_view(snapshot, include_adjustments, date_from, date_to)
+    income, balance, eq_rec = view.statements()
     doc = SimpleDocTemplate(path, pagesize=landscape(letter))
     styles = getSampleStyleSheet()
     story = []
-    story.append(Paragraph("Laporan Keuangan", styles['Title'])); story.append(Spacer(1,12))
+    story.append(Paragraph("Laporan Keuangan", styles['Title']))
+    if period_label(view.date_from, view.date_to):
+        story.append(Paragraph(period_label(view.date_from, view.date_to), styles['Normal']))
+    story.append(Spacer(1,12))
     # Laporan Laba Rugi
     story.append(Paragraph("Laporan Laba Rugi", styles['Heading2']))
     data = [["Jenis", "No Akun", "Nama Akun", "Jumlah"]]
@@ -294,14 +945,15 @@ def export_reports_to_pdf(path, include_adjustments=True):
     t3 = Table(data, colWidths=[80,80,220,100])
     t3.setStyle(TableStyle([('GRID',(0,0),(-1,-1),0.5,colors.grey), ('BACKGROUND',(0,0),(-1,0),colors.lightblue), ('ALIGN',(-1,0),(-1,-1),'RIGHT')]))
     story.append(t3)
+    if cancelled and cancelled():
+        raise ExportCancelled()
     doc.build(story)
 
-def export_reports_to_excel(path, include_adjustments=True):
-    if Workbook is None:
-        raise RuntimeError("openpyxl tidak terpasang")
-    income, balance, eq_rec = compute_financial_statements(include_adjustments=include_adjustments)
-    wb = Workbook()
-    ws1 = wb.active; ws1.title = "Laba Rugi"
+def export_reports_to_excel(path, include_adjustments=True, snapshot=None, progress=None, cancelled=None,
+                           date_from=None, date_to=None):
+    wb = _new_workbook()
+    income, balance, eq_rec = _ledger_view(snapshot, include_adjustments, date_from, date_to).statements()
+    ws1 = wb.create_sheet("Laba Rugi")
     ws1.append(["Jenis","No Akun","Nama Akun","Jumlah"])
     for no,nm,amt in income['revenues']:
         ws1.append(["Pendapatan", no, nm, float(amt)])
@@ -322,6 +974,4 @@ def export_reports_to_excel(path, include_adjustments=True):
     for no,nm,amt in balance['equity']:
         ws3.append(["Ekuitas", no, nm, float(amt)])
     ws3.append(["","", "Total Kewajiban + Ekuitas", float(balance['total_liabilities'] + balance['total_equity'])])
-    wb.save(path)
-
-
+    _save_workbook(wb, path, cancelled)
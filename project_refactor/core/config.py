@@ -1,37 +1,8 @@
 import os
-import sqlite3
-import hashlib
-import smtplib
-import random
-import threading
-import time
-from email.mime.text import MIMEText
-from datetime import datetime, timedelta
-from decimal import Decimal, getcontext
-
-import tkinter as tk
-from tkinter import ttk, messagebox, filedialog, simpledialog
-
-import pandas as pd
-import matplotlib
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-import matplotlib.pyplot as plt
-
-from openpyxl import Workbook
-
-from reportlab.platypus import (
-    SimpleDocTemplate,
-    Paragraph,
-    Spacer,
-    Table,
-    TableStyle
-)
-from reportlab.lib.pagesizes import landscape, letter
-from reportlab.lib import colors
-from reportlab.lib.styles import getSampleStyleSheet
-
-
-DB_FILENAME = "akuntansi.db"
+
+
+# SIA_DB points the app / CLI at another database file
+DB_FILENAME = os.environ.get("SIA_DB") or "akuntansi.db"
 APP_TITLE = "SAM POO KONG xlim go" 
 
 WINDOW_BG = "#FFF0F0"         # Background putih-kemerahan
@@ -51,3 +22,54 @@ OTP_TTL_SECONDS = 600
 # DB retry
 DB_MAX_RETRIES = 5
 DB_RETRY_BACKOFF = 0.12
+
+# DB connection pool
+DB_POOL_SIZE = 4  # reader connections; writes always go through a single writer connection
+DB_POOL_TIMEOUT = 30
+DB_POOL_HEALTHCHECK_INTERVAL = 60  # seconds idle before a pooled connection is re-checked
+DB_BUSY_TIMEOUT = 30  # seconds SQLite waits on a locked database before raising
+DB_FETCH_ARRAYSIZE = 1000  # rows per fetchmany() when streaming a query
+# planner statistics: PRAGMA optimize when a connection closes, ANALYZE after bulk writes;
+# rows sampled per index, so refreshing stays cheap on large books
+DB_ANALYSIS_LIMIT = 1000
+
+# Query statistics (diagnostics panel, Ctrl+Shift+D). Off by default; SIA_QUERY_STATS=1 enables them at start
+DB_QUERY_STATS = os.environ.get("SIA_QUERY_STATS") == "1"
+DB_SLOW_QUERY_MS = 250  # statements at least this slow go to the slow-query log
+DB_SLOW_QUERY_LOG = "slow_queries.log"
+DB_SLOW_QUERY_LOG_BYTES = 1_000_000
+DB_SLOW_QUERY_LOG_BACKUPS = 3
+
+# DB storage profile: PRAGMAs applied to every connection when it is opened
+DB_STORAGE_PROFILE = "wal"
+DB_STORAGE_PROFILES = {
+    # SQLite defaults (rollback journal)
+    "default": {},
+    # readers never block the writer and vice versa
+    "wal": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "cache_size": -16000,      # negative = KiB, ~16 MB per connection
+        "mmap_size": 268435456,    # 256 MB
+        "temp_store": "MEMORY",
+    },
+}
+
+# Balance aggregation engine for compute_balances & friends:
+#   "saldo"  - read the trigger-maintained saldo_akun table, O(#accounts)
+#   "sql"    - GROUP BY over journal_line/adjusting inside SQLite
+#   "python" - stream every row into Python (reference implementation)
+BALANCE_ENGINE = "saldo"
+
+# Results of compute_* / build_snapshot kept per data version (LRU, entries)
+RESULT_CACHE_SIZE = 32
+
+# Journal tab: rows fetched per page and pages kept in memory
+JOURNAL_PAGE_SIZE = 200
+JOURNAL_PAGE_CACHE = 8
+
+# Journal import: rows per transaction
+IMPORT_CHUNK_SIZE = 2000
+
+# Exports: report progress every N rows
+EXPORT_PROGRESS_EVERY = 5000
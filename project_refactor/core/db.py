@@ -1,20 +1,309 @@
 import sqlite3
 import os
 import time
+import queue
+import atexit
+import threading
+from contextlib import contextmanager
 
 # Import konfigurasi DB
-from core.config import DB_FILENAME, DB_RETRY_BACKOFF, DB_MAX_RETRIES
+from core.config import (DB_FILENAME, DB_RETRY_BACKOFF, DB_MAX_RETRIES,
+                         DB_POOL_SIZE, DB_POOL_TIMEOUT, DB_POOL_HEALTHCHECK_INTERVAL,
+                         DB_BUSY_TIMEOUT, DB_ANALYSIS_LIMIT, DB_STORAGE_PROFILE, DB_STORAGE_PROFILES, DB_FETCH_ARRAYSIZE,
+                         DB_QUERY_STATS, DB_SLOW_QUERY_MS, DB_SLOW_QUERY_LOG,
+                         DB_SLOW_QUERY_LOG_BYTES, DB_SLOW_QUERY_LOG_BACKUPS)
+from core.migrations import apply_migrations
+from core.query_stats import QueryStats, call_site, setup_slow_log
+
+# skipped when looking for the code that issued a query
+_THIS_FILE = (os.path.normcase(os.path.abspath(__file__)),)
+
+
+class ConnectionPool:
+    """
+    Pool of long-lived sqlite3 connections.
+    A thread that already holds a connection gets the same one back, so nested
+    helper calls share one connection (and one transaction). Otherwise the most
+    recently used idle connection is reused, or a new one is opened while the
+    pool is below `size`; beyond that callers wait up to `timeout` seconds.
+    """
+    def __init__(self, factory, size=DB_POOL_SIZE, timeout=DB_POOL_TIMEOUT,
+                 healthcheck_interval=DB_POOL_HEALTHCHECK_INTERVAL, on_close=None):
+        self.factory = factory
+        self.on_close = on_close  # called with each connection right before it is closed
+        self.size = max(1, int(size))
+        self.timeout = timeout
+        self.healthcheck_interval = healthcheck_interval
+        self._idle = queue.LifoQueue()
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._opened = 0
+        self._closed = False
+
+    def acquire(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            self._local.depth += 1
+            return conn
+        conn = self._checkout()
+        self._local.conn = conn
+        self._local.depth = 1
+        return conn
+
+    def release(self, conn):
+        if getattr(self._local, 'conn', None) is not conn:
+            raise RuntimeError("Koneksi tidak dipegang oleh thread ini")
+        self._local.depth -= 1
+        if self._local.depth > 0:
+            return
+        self._local.conn = None
+        if self._closed:
+            self._discard(conn)
+        else:
+            self._idle.put((conn, time.monotonic()))
+
+    def depth(self):
+        # how many nested acquire() calls the current thread has open
+        return getattr(self._local, 'depth', 0) if getattr(self._local, 'conn', None) is not None else 0
+
+    def close(self):
+        # close idle connections now; connections still in use are closed on release
+        self._closed = True
+        while True:
+            try:
+                conn, _ = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(conn)
+
+    def _checkout(self):
+        deadline = time.monotonic() + self.timeout
+        while True:
+            if self._closed:
+                raise RuntimeError("Connection pool sudah ditutup")
+            try:
+                conn, last_used = self._idle.get_nowait()
+            except queue.Empty:
+                conn = self._open_if_room()
+                if conn is not None:
+                    return conn
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise sqlite3.OperationalError("Semua koneksi database sedang dipakai (pool habis)")
+                try:
+                    conn, last_used = self._idle.get(timeout=remaining)
+                except queue.Empty:
+                    continue
+            if time.monotonic() - last_used > self.healthcheck_interval and not self._healthy(conn):
+                self._discard(conn)
+                continue
+            return conn
+
+    def _open_if_room(self):
+        with self._lock:
+            if self._opened >= self.size:
+                return None
+            self._opened += 1
+        try:
+            return self.factory()
+        except Exception:
+            with self._lock:
+                self._opened -= 1
+            raise
+
+    def _healthy(self, conn):
+        try:
+            conn.execute("SELECT 1").fetchone()
+            return not conn.in_transaction
+        except sqlite3.Error:
+            return False
+
+    def _discard(self, conn):
+        with self._lock:
+            self._opened -= 1
+        try:
+            if self.on_close is not None:
+                self.on_close(conn)
+            conn.close()
+        except Exception:
+            pass
+
+
+class RowStream:
+    """Iterator over a streamed query that also closes it as a context manager."""
+    def __init__(self, gen):
+        self._gen = gen
+
+    def __iter__(self):
+        return self._gen
+
+    def __next__(self):
+        return next(self._gen)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self._gen.close()
 
 
 class DBHelper:
-    def __init__(self, filename=DB_FILENAME):
+    # sqlite3.Connection subclass used for every pooled connection
+    connection_factory = sqlite3.Connection
+
+    def __init__(self, filename=DB_FILENAME, pool_size=DB_POOL_SIZE, profile=DB_STORAGE_PROFILE,
+                 busy_timeout=DB_BUSY_TIMEOUT):
+        if profile not in DB_STORAGE_PROFILES:
+            raise ValueError(f"Storage profile tidak dikenal: {profile}")
         self.filename = filename
+        self.profile = profile
+        self.busy_timeout = busy_timeout
+        self.lock_retries = 0
+        # data version: bumped by every write through this helper, combined with
+        # PRAGMA data_version on a probe connection for commits made elsewhere
+        self.writes = 0
+        self.generation = 0
+        self._probe = None
+        self._probe_lock = threading.Lock()
+        # per-statement timings, None while disabled (see enable_stats)
+        self.stats = None
+        self._local = threading.local()
+        # reads are spread over a pool of readers; writes are serialized on one writer
+        self.pool = ConnectionPool(self.connect, size=pool_size, on_close=self._optimize)
+        self.writer = ConnectionPool(self.connect, size=1, on_close=self._optimize)
         # Ensure DB file exists + schema
         self.init_db_if_needed()
+        atexit.register(self.close)
+        if DB_QUERY_STATS:
+            self.enable_stats()
 
     def connect(self):
-        # each operation creates its own connection; superior for multi-threading
-        return sqlite3.connect(self.filename, timeout=30, check_same_thread=False)
+        # raw connection factory used by the pools; timeout gives SQLite time to unlock
+        conn = sqlite3.connect(self.filename, timeout=self.busy_timeout, check_same_thread=False,
+                               factory=self.connection_factory)
+        for name, value in DB_STORAGE_PROFILES[self.profile].items():
+            conn.execute(f"PRAGMA {name}={value}")
+        return conn
+
+    @contextmanager
+    def connection(self, write=False):
+        """
+        Borrow a pooled connection: the writer when `write` is set, otherwise a
+        reader (or the writer, if this thread is already inside a write so it
+        sees its own uncommitted rows). The outermost holder on a thread commits
+        on success and rolls back on error (same as the old `with connect()`
+        blocks); nested holders leave that to the outermost one.
+        """
+        pool = self.writer if write or self.writer.depth() else self.pool
+        conn = pool.acquire()
+        outermost = pool.depth() == 1
+        try:
+            yield conn
+            if outermost and conn.in_transaction:
+                conn.commit()
+        except BaseException:
+            if outermost and conn.in_transaction:
+                conn.rollback()
+            raise
+        finally:
+            if pool is self.writer and outermost:
+                self.writes += 1
+            pool.release(conn)
+
+    def data_version(self):
+        """
+        Opaque token that changes whenever the database may have changed: after any
+        write through this helper, after a commit by another process (PRAGMA
+        data_version, read on a connection that never writes) and after reopen().
+        Equal tokens mean cached results are still valid.
+        """
+        with self._probe_lock:
+            if self._probe is None:
+                self._probe = sqlite3.connect(self.filename, timeout=self.busy_timeout, check_same_thread=False)
+            external = self._probe.execute("PRAGMA data_version").fetchone()[0]
+        return (self.generation, self.writes, external)
+
+    def close(self):
+        self.pool.close()
+        self.writer.close()
+        with self._probe_lock:
+            if self._probe is not None:
+                self._probe.close()
+                self._probe = None
+
+    def reopen(self, filename=None, profile=None):
+        """
+        Point this helper at another database file (CLI --db, benchmarks). Every
+        module shares the instance from get_db(), so they all follow.
+        """
+        self.close()
+        self.filename = filename or self.filename
+        if profile is not None:
+            if profile not in DB_STORAGE_PROFILES:
+                raise ValueError(f"Storage profile tidak dikenal: {profile}")
+            self.profile = profile
+        self.generation += 1
+        self.pool = ConnectionPool(self.connect, size=self.pool.size, on_close=self._optimize)
+        self.writer = ConnectionPool(self.connect, size=1, on_close=self._optimize)
+        self.init_db_if_needed()
+        return self
+
+    @staticmethod
+    def _optimize(conn):
+        # SQLite's advice for long-lived connections: PRAGMA optimize before closing
+        # re-analyzes the tables this connection's queries used whose statistics are
+        # stale (e.g. taken when the book was almost empty). Never blocks or fails a close.
+        try:
+            if not conn.in_transaction:
+                conn.execute("PRAGMA busy_timeout=0")
+                conn.execute(f"PRAGMA analysis_limit={DB_ANALYSIS_LIMIT}")
+                conn.execute("PRAGMA optimize")
+        except sqlite3.Error:
+            pass
+
+    def analyze(self, *tables):
+        """
+        Refresh the planner statistics of `tables` (all tables when none are given)
+        after a bulk write, sampling at most DB_ANALYSIS_LIMIT rows per index.
+        """
+        with self.connection(write=True) as conn:
+            conn.execute(f"PRAGMA analysis_limit={DB_ANALYSIS_LIMIT}")
+            for table in tables or ("",):
+                conn.execute(f"ANALYZE {table}".strip())
+
+    def enable_stats(self, slow_ms=DB_SLOW_QUERY_MS, slow_log=DB_SLOW_QUERY_LOG):
+        """
+        Start recording every statement run through the helpers (fetchall,
+        fetchone, execute, executemany, iterfetch): normalized SQL, duration,
+        rows, lock retries and calling site. Statements of at least `slow_ms`
+        are also written to the rotating `slow_log` file (None: no log).
+        """
+        if slow_log:
+            setup_slow_log(slow_log, DB_SLOW_QUERY_LOG_BYTES, DB_SLOW_QUERY_LOG_BACKUPS)
+        self.stats = QueryStats(slow_ms=slow_ms if slow_log else None)
+        return self.stats
+
+    def disable_stats(self):
+        self.stats = None
+
+    def query_stats(self):
+        """Aggregated stats per statement (count, total/p50/p95/p99 ms, ...); [] when disabled."""
+        stats = self.stats
+        return stats.summary() if stats is not None else []
+
+    def _measured(self, sql, func, count_rows):
+        stats = self.stats
+        if stats is None:
+            return self._retry_execute(func)
+        self._local.retries = 0
+        start = time.perf_counter()
+        result = self._retry_execute(func)
+        stats.record(sql, time.perf_counter() - start, count_rows(result), self._local.retries,
+                     call_site(_THIS_FILE))
+        return result
 
     def _retry_execute(self, func, *args, **kwargs):
         backoff = DB_RETRY_BACKOFF
@@ -23,6 +312,8 @@ class DBHelper:
                 return func(*args, **kwargs)
             except sqlite3.OperationalError as e:
                 if "locked" in str(e).lower() and attempt < DB_MAX_RETRIES:
+                    self.lock_retries += 1
+                    self._local.retries = getattr(self._local, 'retries', 0) + 1
                     time.sleep(backoff)
                     backoff *= 1.8
                     continue
@@ -31,7 +322,7 @@ class DBHelper:
     def init_db_if_needed(self):
         need_init = not os.path.exists(self.filename)
 
-        with self.connect() as conn:
+        with self.connection(write=True) as conn:
             cur = conn.cursor()
 
             # users
@@ -86,37 +377,90 @@ class DBHelper:
 
             conn.commit()
 
+            # derived tables, triggers, indexes, ...
+            apply_migrations(conn)
+
         return need_init
 
     # Generic helpers
     def execute(self, sql, params=(), commit=False):
         def _do():
-            with self.connect() as conn:
+            with self.connection(write=True) as conn:
                 cur = conn.cursor()
                 cur.execute(sql, params)
                 if commit:
                     conn.commit()
                 return cur
 
-        return self._retry_execute(_do)
+        return self._measured(sql, _do, lambda cur: max(cur.rowcount, 0))
+
+    def executemany(self, sql, seq_of_params):
+        # one transaction for the whole batch (committed by connection())
+        def _do():
+            with self.connection(write=True) as conn:
+                cur = conn.cursor()
+                cur.executemany(sql, seq_of_params)
+                return cur.rowcount
+
+        return self._measured(sql, _do, lambda n: max(n, 0))
+
+    def iterfetch(self, sql, params=(), arraysize=DB_FETCH_ARRAYSIZE):
+        """
+        Stream a query instead of materializing it: rows are fetched `arraysize`
+        at a time from one held reader connection, so memory is bounded by the
+        batch, not the result. Use as a context manager so the connection goes
+        back to the pool even if the loop stops early:
+
+            with db.iterfetch(sql, params) as rows:
+                for row in rows: ...
+
+        Iterate and close on the same thread (pooled connections are per thread).
+        """
+        return RowStream(self._stream(sql, params, arraysize))
+
+    def _stream(self, sql, params, arraysize):
+        stats = self.stats
+        site = call_site(_THIS_FILE) if stats is not None else None
+        # only time spent in SQLite is counted, not the consumer's loop body
+        clock = time.perf_counter
+        spent = 0.0
+        count = 0
+        self._local.retries = 0
+        with self.connection() as conn:
+            start = clock()
+            cur = self._retry_execute(conn.execute, sql, params)
+            spent += clock() - start
+            try:
+                while True:
+                    start = clock()
+                    rows = cur.fetchmany(arraysize)
+                    spent += clock() - start
+                    if not rows:
+                        break
+                    count += len(rows)
+                    yield from rows
+            finally:
+                cur.close()
+                if stats is not None:
+                    stats.record(sql, spent, count, self._local.retries, site)
 
     def fetchall(self, sql, params=()):
         def _do():
-            with self.connect() as conn:
+            with self.connection() as conn:
                 cur = conn.cursor()
                 cur.execute(sql, params)
                 return cur.fetchall()
 
-        return self._retry_execute(_do)
+        return self._measured(sql, _do, len)
 
     def fetchone(self, sql, params=()):
         def _do():
-            with self.connect() as conn:
+            with self.connection() as conn:
                 cur = conn.cursor()
                 cur.execute(sql, params)
                 return cur.fetchone()
 
-        return self._retry_execute(_do)
+        return self._measured(sql, _do, lambda row: 0 if row is None else 1)
 
 
 # Global DB instance
@@ -0,0 +1,184 @@
+import csv
+import os
+import time
+from datetime import datetime, date
+
+from core.db import get_db
+from core.config import IMPORT_CHUNK_SIZE
+from utils.helpers import to_cents
+from utils.lazy import optional
+
+db = get_db()
+
+# through the jurnal view: every row becomes a two-line entry (trg_jurnal_insert)
+SQL_INSERT_JOURNAL = """INSERT INTO jurnal (tanggal, akun_debit, akun_kredit, debit, kredit, keterangan)
+                        VALUES (?, ?, ?, ?, ?, ?)"""
+
+FIELDS = ('tanggal', 'akun_debit', 'akun_kredit', 'debit', 'kredit', 'keterangan')
+# header names accepted in the first row (lowercase); without a header the columns are taken in FIELDS order
+HEADER_ALIASES = {
+    'tanggal': 'tanggal', 'date': 'tanggal', 'tgl': 'tanggal',
+    'akun_debit': 'akun_debit', 'akun debit': 'akun_debit', 'debit account': 'akun_debit',
+    'akun_kredit': 'akun_kredit', 'akun kredit': 'akun_kredit', 'credit account': 'akun_kredit',
+    'debit': 'debit', 'kredit': 'kredit', 'credit': 'kredit',
+    'keterangan': 'keterangan', 'memo': 'keterangan', 'description': 'keterangan',
+}
+
+
+class ImportResult:
+    def __init__(self):
+        self.rows_read = 0
+        self.inserted = 0
+        self.errors = []        # (line, message, raw values)
+        self.cancelled = False
+        self.elapsed = 0.0
+
+    def summary(self):
+        s = f"{self.inserted} jurnal diimpor, {len(self.errors)} baris gagal ({self.elapsed:.1f} detik)"
+        if self.cancelled:
+            s += " - dibatalkan, baris yang sudah disimpan tetap tersimpan"
+        return s
+
+
+def read_csv_rows(path):
+    """Yield (line number, values) from a CSV file without loading it whole."""
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        sample = f.read(4096); f.seek(0)
+        try:
+            dialect = csv.Sniffer().sniff(sample, delimiters=",;\t")
+        except csv.Error:
+            dialect = csv.excel
+        for line, values in enumerate(csv.reader(f, dialect), start=1):
+            yield line, values
+
+def read_xlsx_rows(path):
+    """Yield (row number, values) from the first sheet, openpyxl read-only (streaming)."""
+    wb = optional("openpyxl").load_workbook(path, read_only=True, data_only=True)
+    try:
+        ws = wb.worksheets[0]
+        for line, values in enumerate(ws.iter_rows(values_only=True), start=1):
+            yield line, list(values)
+    finally:
+        wb.close()
+
+def read_rows(path):
+    ext = os.path.splitext(path)[1].lower()
+    if ext in ('.xlsx', '.xlsm'):
+        return read_xlsx_rows(path)
+    if ext in ('.csv', '.txt'):
+        return read_csv_rows(path)
+    raise ValueError(f"Format file tidak didukung: {ext}")
+
+
+def _header_map(values):
+    # column index per field if the row looks like a header, else None
+    names = [str(v).strip().lower() if v is not None else '' for v in values]
+    found = {HEADER_ALIASES[n]: i for i, n in enumerate(names) if n in HEADER_ALIASES}
+    if 'tanggal' in found and 'akun_debit' in found and 'akun_kredit' in found:
+        return found
+    return None
+
+def _tanggal(v):
+    if isinstance(v, (datetime, date)):
+        return v.strftime("%Y-%m-%d")
+    s = str(v or '').strip()
+    datetime.strptime(s, "%Y-%m-%d")
+    return s
+
+def _account(v):
+    # spreadsheets hand account numbers back as 101 or 101.0
+    if isinstance(v, float) and v.is_integer():
+        v = int(v)
+    return str(v if v is not None else '').strip()
+
+def validate_row(values, columns, accounts, closed_through=None):
+    """
+    Turn one parsed row into the jurnal insert tuple (amounts in sen), applying
+    the same rules as add_journal_db(). `closed_through` is the last day of the
+    last closed period, if any. Raises ValueError with the reason.
+    """
+    get = lambda f: values[columns[f]] if f in columns and columns[f] < len(values) else None
+    try:
+        tanggal = _tanggal(get('tanggal'))
+    except ValueError:
+        raise ValueError(f"Tanggal tidak valid (format YYYY-MM-DD): {get('tanggal')}")
+    if closed_through and tanggal <= closed_through:
+        raise ValueError(f"Periode sampai {closed_through} sudah ditutup: {tanggal}")
+    ad = _account(get('akun_debit'))
+    ak = _account(get('akun_kredit'))
+    if ad not in accounts:
+        raise ValueError(f"Akun debit {ad} tidak ditemukan")
+    if ak not in accounts:
+        raise ValueError(f"Akun kredit {ak} tidak ditemukan")
+    debit = to_cents(get('debit')); kredit = to_cents(get('kredit'))
+    if debit < 0 or kredit < 0:
+        raise ValueError("Debit/Kredit tidak boleh negatif.")
+    if debit == 0 and kredit == 0:
+        raise ValueError("Isi debit atau kredit minimal satu.")
+    # one amount is enough: the other side gets the same
+    debit = debit or kredit; kredit = kredit or debit
+    if debit != kredit:
+        raise ValueError(f"Jurnal tidak seimbang: debit {get('debit')}, kredit {get('kredit')}")
+    ket = get('keterangan')
+    return (tanggal, ad, ak, debit, kredit, '' if ket is None else str(ket))
+
+
+def import_journal(path, chunk_size=IMPORT_CHUNK_SIZE, progress=None, cancelled=None):
+    """
+    Stream a CSV/XLSX file into jurnal. Rows are validated against the account
+    list loaded once, then inserted with executemany, one transaction per
+    `chunk_size` rows. Bad rows are skipped and reported; good rows are kept.
+    progress(result) is called after every chunk; cancelled() is checked between
+    chunks. Returns an ImportResult.
+    """
+    result = ImportResult()
+    start = time.perf_counter()
+    with db.iterfetch("SELECT no_akun FROM akun") as rows:
+        accounts = {no for (no,) in rows}
+    closed_through = db.fetchone("SELECT MAX(date_to) FROM fiscal_period")[0]
+    columns = None
+    batch = []
+
+    def flush():
+        if batch:
+            db.executemany(SQL_INSERT_JOURNAL, batch)
+            result.inserted += len(batch)
+            batch.clear()
+        result.elapsed = time.perf_counter() - start
+        if progress:
+            progress(result)
+
+    for line, values in read_rows(path):
+        if not any(v not in (None, '') for v in values):
+            continue
+        if columns is None:
+            columns = _header_map(values)
+            if columns is not None:
+                continue
+            columns = {f: i for i, f in enumerate(FIELDS)}
+        result.rows_read += 1
+        try:
+            batch.append(validate_row(values, columns, accounts, closed_through))
+        except ValueError as e:
+            result.errors.append((line, str(e), values))
+        if len(batch) >= chunk_size:
+            flush()
+        if cancelled and result.rows_read % chunk_size == 0 and cancelled():
+            # rows not yet flushed are dropped; committed chunks stay
+            result.cancelled = True
+            break
+    if not result.cancelled:
+        flush()
+    if result.inserted:
+        # rows added in bulk: refresh the journal's planner statistics
+        db.analyze("journal_header", "journal_line")
+    result.elapsed = time.perf_counter() - start
+    return result
+
+def write_error_report(path, result):
+    """CSV with line number, reason and the original values of every rejected row."""
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        w = csv.writer(f)
+        w.writerow(['baris', 'alasan'] + list(FIELDS))
+        for line, msg, values in result.errors:
+            w.writerow([line, msg] + ['' if v is None else v for v in values])
@@ -0,0 +1,376 @@
+"""
+Schema migrations applied on top of the base tables from DBHelper.init_db_if_needed.
+PRAGMA user_version records the last migration applied; each migration runs in
+its own BEGIN IMMEDIATE transaction so concurrent starts cannot apply it twice.
+"""
+from utils.helpers import to_cents
+
+
+def apply_migrations(conn):
+    cur = conn.cursor()
+    version = cur.execute("PRAGMA user_version").fetchone()[0]
+    for target, migrate in MIGRATIONS:
+        if version >= target:
+            continue
+        cur.execute("BEGIN IMMEDIATE")
+        try:
+            version = cur.execute("PRAGMA user_version").fetchone()[0]
+            if version < target:
+                migrate(cur)
+                cur.execute(f"PRAGMA user_version={int(target)}")
+                version = target
+            cur.execute("COMMIT")
+        except Exception:
+            conn.rollback()
+            raise
+    return version
+
+
+# ---------------- saldo_akun (materialized balances) ----------------
+# Per-account running totals of jurnal and adjusting, kept in step by triggers so
+# every insert/update/delete (add_journal_db, delete_journal_db, apply_adjustments,
+# ...) updates the balances in the same transaction. n_jurnal/n_adj count the
+# rows touching the account so callers know whether it has any activity at all.
+SALDO_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS saldo_akun (
+        no_akun TEXT PRIMARY KEY,
+        debit REAL NOT NULL DEFAULT 0,
+        kredit REAL NOT NULL DEFAULT 0,
+        adj_debit REAL NOT NULL DEFAULT 0,
+        adj_kredit REAL NOT NULL DEFAULT 0,
+        n_jurnal INTEGER NOT NULL DEFAULT 0,
+        n_adj INTEGER NOT NULL DEFAULT 0
+    )
+"""
+
+
+def _saldo_trigger_sql(table, debit_col, kredit_col, count_col):
+    add = f"""
+        INSERT INTO saldo_akun (no_akun, {debit_col}, {count_col}) VALUES (NEW.akun_debit, IFNULL(NEW.debit,0), 1)
+            ON CONFLICT(no_akun) DO UPDATE SET {debit_col} = {debit_col} + excluded.{debit_col}, {count_col} = {count_col} + 1;
+        INSERT INTO saldo_akun (no_akun, {kredit_col}, {count_col}) VALUES (NEW.akun_kredit, IFNULL(NEW.kredit,0), 1)
+            ON CONFLICT(no_akun) DO UPDATE SET {kredit_col} = {kredit_col} + excluded.{kredit_col}, {count_col} = {count_col} + 1;
+    """
+    remove = f"""
+        UPDATE saldo_akun SET {debit_col} = {debit_col} - IFNULL(OLD.debit,0), {count_col} = {count_col} - 1
+            WHERE no_akun = OLD.akun_debit;
+        UPDATE saldo_akun SET {kredit_col} = {kredit_col} - IFNULL(OLD.kredit,0), {count_col} = {count_col} - 1
+            WHERE no_akun = OLD.akun_kredit;
+    """
+    return [
+        f"CREATE TRIGGER IF NOT EXISTS trg_{table}_saldo_ins AFTER INSERT ON {table} BEGIN {add} END",
+        f"CREATE TRIGGER IF NOT EXISTS trg_{table}_saldo_del AFTER DELETE ON {table} BEGIN {remove} END",
+        f"""CREATE TRIGGER IF NOT EXISTS trg_{table}_saldo_upd
+                AFTER UPDATE OF akun_debit, akun_kredit, debit, kredit ON {table} BEGIN {remove} {add} END""",
+    ]
+
+
+SALDO_TRIGGERS_SQL = (_saldo_trigger_sql("jurnal", "debit", "kredit", "n_jurnal")
+                      + _saldo_trigger_sql("adjusting", "adj_debit", "adj_kredit", "n_adj"))
+
+
+def _rebuild_saldo_akun_v1(cur):
+    # full recomputation from the two-column jurnal table (migrations 1 and 3)
+    cur.execute("DELETE FROM saldo_akun")
+    cur.execute("""
+        INSERT INTO saldo_akun (no_akun, debit, kredit, adj_debit, adj_kredit, n_jurnal, n_adj)
+        SELECT no_akun, SUM(d), SUM(k), SUM(ad), SUM(ak), SUM(nj), SUM(na) FROM (
+            SELECT akun_debit AS no_akun, IFNULL(debit,0) AS d, 0 AS k, 0 AS ad, 0 AS ak, 1 AS nj, 0 AS na FROM jurnal
+            UNION ALL SELECT akun_kredit, 0, IFNULL(kredit,0), 0, 0, 1, 0 FROM jurnal
+            UNION ALL SELECT akun_debit, 0, 0, IFNULL(debit,0), 0, 0, 1 FROM adjusting
+            UNION ALL SELECT akun_kredit, 0, 0, 0, IFNULL(kredit,0), 0, 1 FROM adjusting
+        ) GROUP BY no_akun
+    """)
+
+
+def _m001_saldo_akun(cur):
+    cur.execute(SALDO_TABLE_SQL)
+    for sql in SALDO_TRIGGERS_SQL:
+        cur.execute(sql)
+    _rebuild_saldo_akun_v1(cur)
+
+
+# ---------------- indexes ----------------
+# (akun, tanggal, id) serve the per-account ledger and the delete-account guard,
+# (tanggal, id) serves the journal listing order, and the partial index keeps the
+# pending-adjustment lookup proportional to the pending rows only.
+INDEXES_V2 = [
+    "CREATE INDEX IF NOT EXISTS idx_jurnal_debit ON jurnal (akun_debit, tanggal, id)",
+    "CREATE INDEX IF NOT EXISTS idx_jurnal_kredit ON jurnal (akun_kredit, tanggal, id)",
+    "CREATE INDEX IF NOT EXISTS idx_jurnal_tanggal ON jurnal (tanggal, id)",
+    "CREATE INDEX IF NOT EXISTS idx_adjusting_pending ON adjusting (tanggal, id) WHERE applied=0",
+]
+
+
+def _m002_indexes(cur):
+    for sql in INDEXES_V2:
+        cur.execute(sql)
+
+
+# ---------------- integer sen money columns ----------------
+# SQLite cannot change a column type, so akun/jurnal/adjusting are rebuilt with
+# INTEGER amounts. Values go through to_cents() (registered as sql function
+# to_sen) so 0.285 becomes 29 sen exactly as Decimal(str(0.285)) would round,
+# instead of ROUND(0.285*100) = 28. Dropping the tables drops their triggers and
+# indexes; those are recreated against the rebuilt tables.
+SALDO_TABLE_SQL_V3 = """
+    CREATE TABLE IF NOT EXISTS saldo_akun (
+        no_akun TEXT PRIMARY KEY,
+        debit INTEGER NOT NULL DEFAULT 0,
+        kredit INTEGER NOT NULL DEFAULT 0,
+        adj_debit INTEGER NOT NULL DEFAULT 0,
+        adj_kredit INTEGER NOT NULL DEFAULT 0,
+        n_jurnal INTEGER NOT NULL DEFAULT 0,
+        n_adj INTEGER NOT NULL DEFAULT 0
+    )
+"""
+
+MONEY_TABLES_V3 = {
+    'akun': ("""
+        CREATE TABLE akun_v3 (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            no_akun TEXT UNIQUE NOT NULL,
+            nama_akun TEXT NOT NULL,
+            tipe TEXT NOT NULL,
+            starting_balance INTEGER NOT NULL DEFAULT 0
+        )""", "id, no_akun, nama_akun, tipe, to_sen(starting_balance)",
+        "id, no_akun, nama_akun, tipe, starting_balance"),
+    'jurnal': ("""
+        CREATE TABLE jurnal_v3 (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            tanggal TEXT NOT NULL,
+            akun_debit TEXT NOT NULL,
+            akun_kredit TEXT NOT NULL,
+            debit INTEGER NOT NULL DEFAULT 0,
+            kredit INTEGER NOT NULL DEFAULT 0,
+            keterangan TEXT
+        )""", "id, tanggal, akun_debit, akun_kredit, to_sen(debit), to_sen(kredit), keterangan",
+        "id, tanggal, akun_debit, akun_kredit, debit, kredit, keterangan"),
+    'adjusting': ("""
+        CREATE TABLE adjusting_v3 (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            tanggal TEXT NOT NULL,
+            akun_debit TEXT NOT NULL,
+            akun_kredit TEXT NOT NULL,
+            debit INTEGER NOT NULL DEFAULT 0,
+            kredit INTEGER NOT NULL DEFAULT 0,
+            keterangan TEXT,
+            applied INTEGER DEFAULT 0
+        )""", "id, tanggal, akun_debit, akun_kredit, to_sen(debit), to_sen(kredit), keterangan, IFNULL(applied,0)",
+        "id, tanggal, akun_debit, akun_kredit, debit, kredit, keterangan, applied"),
+}
+
+
+def _unconvertible_amounts(cur):
+    # amounts to_cents() rejects (text such as "1.000.000" or "abc", infinities);
+    # NULL stays 0 and every finite REAL converts, so only the rest is checked
+    bad = []
+    for table, cols in (('akun', ('starting_balance',)), ('jurnal', ('debit', 'kredit')),
+                        ('adjusting', ('debit', 'kredit'))):
+        for col in cols:
+            for _id, value in cur.execute(f"""SELECT id, {col} FROM {table}
+                                               WHERE typeof({col}) NOT IN ('integer', 'real', 'null')
+                                                  OR abs({col}) > 9e15"""):
+                try:
+                    to_cents(value)
+                except ValueError:
+                    bad.append(f"{table} id {_id} {col}={value!r}")
+    return bad
+
+
+def _m003_money_cents(cur):
+    # refuse (the migration rolls back) rather than store an unreadable amount as 0
+    bad = _unconvertible_amounts(cur)
+    if bad:
+        more = f" (+{len(bad) - 20} lagi)" if len(bad) > 20 else ""
+        raise ValueError("Migrasi nominal ke sen dibatalkan, perbaiki dulu nilai berikut: "
+                         + ", ".join(bad[:20]) + more)
+    cur.connection.create_function("to_sen", 1, to_cents, deterministic=True)
+    for table, (create_sql, select_cols, insert_cols) in MONEY_TABLES_V3.items():
+        cur.execute(create_sql)
+        cur.execute(f"INSERT INTO {table}_v3 ({insert_cols}) SELECT {select_cols} FROM {table}")
+        # keep the AUTOINCREMENT high-water mark so deleted ids are never reused
+        seq = cur.execute("SELECT seq FROM sqlite_sequence WHERE name=?", (table,)).fetchone()
+        cur.execute(f"DROP TABLE {table}")
+        cur.execute(f"ALTER TABLE {table}_v3 RENAME TO {table}")
+        if seq:
+            cur.execute("UPDATE sqlite_sequence SET seq=MAX(seq, ?) WHERE name=?", (seq[0], table))
+            if cur.rowcount == 0:
+                cur.execute("INSERT INTO sqlite_sequence (name, seq) VALUES (?, ?)", (table, seq[0]))
+    cur.execute("DROP TABLE IF EXISTS saldo_akun")
+    cur.execute(SALDO_TABLE_SQL_V3)
+    for sql in SALDO_TRIGGERS_SQL + INDEXES_V2:
+        cur.execute(sql)
+    _rebuild_saldo_akun_v1(cur)
+
+
+# ---------------- compound journal entries ----------------
+# An entry (journal_header) has any number of lines (journal_line), each posting
+# a debit or a credit to one account. Balances and ledgers read the lines; the
+# header keeps the date, the memo and a listing summary (the account, or the
+# comma-separated accounts of a compound entry, on each side plus the totals)
+# written once when the entry is posted, so the journal list needs no join.
+# `jurnal` becomes a view over the headers with the old columns; inserting into
+# it posts a two-line entry, so older callers and tools keep working.
+# journal_line.tanggal is a copy of the header's: per-account date ranges then
+# come from one index, which also covers the amounts.
+JOURNAL_TABLES_V4 = [
+    """CREATE TABLE journal_header (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        tanggal TEXT NOT NULL,
+        keterangan TEXT,
+        akun_debit TEXT NOT NULL,
+        akun_kredit TEXT NOT NULL,
+        debit INTEGER NOT NULL DEFAULT 0,
+        kredit INTEGER NOT NULL DEFAULT 0
+    )""",
+    """CREATE TABLE journal_line (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        header_id INTEGER NOT NULL REFERENCES journal_header(id) ON DELETE CASCADE,
+        line_no INTEGER NOT NULL,
+        tanggal TEXT NOT NULL,
+        no_akun TEXT NOT NULL,
+        debit INTEGER NOT NULL DEFAULT 0,
+        kredit INTEGER NOT NULL DEFAULT 0,
+        CHECK (debit >= 0 AND kredit >= 0)
+    )""",
+]
+
+INDEXES_V4 = [
+    "CREATE INDEX IF NOT EXISTS idx_header_tanggal ON journal_header (tanggal, id)",
+    "CREATE INDEX IF NOT EXISTS idx_line_header ON journal_line (header_id, line_no)",
+    "CREATE INDEX IF NOT EXISTS idx_line_akun ON journal_line (no_akun, tanggal, header_id, debit, kredit)",
+]
+
+JOURNAL_VIEW_V4 = [
+    """CREATE VIEW jurnal AS
+        SELECT id, tanggal, akun_debit, akun_kredit, debit, kredit, keterangan FROM journal_header""",
+    # last_insert_rowid() is the header for line 1, then line 1 (hence the lookup) for line 2
+    """CREATE TRIGGER trg_jurnal_insert INSTEAD OF INSERT ON jurnal BEGIN
+        INSERT INTO journal_header (id, tanggal, keterangan, akun_debit, akun_kredit, debit, kredit)
+            VALUES (NEW.id, NEW.tanggal, NEW.keterangan, NEW.akun_debit, NEW.akun_kredit,
+                    IFNULL(NEW.debit,0), IFNULL(NEW.kredit,0));
+        INSERT INTO journal_line (header_id, line_no, tanggal, no_akun, debit, kredit)
+            VALUES (last_insert_rowid(), 1, NEW.tanggal, NEW.akun_debit, IFNULL(NEW.debit,0), 0);
+        INSERT INTO journal_line (header_id, line_no, tanggal, no_akun, debit, kredit)
+            VALUES ((SELECT header_id FROM journal_line WHERE id = last_insert_rowid()), 2,
+                    NEW.tanggal, NEW.akun_kredit, 0, IFNULL(NEW.kredit,0));
+    END""",
+    "CREATE TRIGGER trg_jurnal_delete INSTEAD OF DELETE ON jurnal BEGIN DELETE FROM journal_header WHERE id = OLD.id; END",
+    # PRAGMA foreign_keys is off, so the cascade is done here
+    "CREATE TRIGGER trg_header_delete AFTER DELETE ON journal_header BEGIN DELETE FROM journal_line WHERE header_id = OLD.id; END",
+    """CREATE TRIGGER trg_header_tanggal AFTER UPDATE OF tanggal ON journal_header BEGIN
+        UPDATE journal_line SET tanggal = NEW.tanggal WHERE header_id = NEW.id;
+    END""",
+]
+
+# saldo_akun per line: n_jurnal now counts the lines touching the account
+_LINE_SALDO_ADD = """
+    INSERT INTO saldo_akun (no_akun, debit, kredit, n_jurnal) VALUES (NEW.no_akun, NEW.debit, NEW.kredit, 1)
+        ON CONFLICT(no_akun) DO UPDATE SET debit = debit + excluded.debit, kredit = kredit + excluded.kredit,
+                                           n_jurnal = n_jurnal + 1;
+"""
+_LINE_SALDO_REMOVE = """
+    UPDATE saldo_akun SET debit = debit - OLD.debit, kredit = kredit - OLD.kredit, n_jurnal = n_jurnal - 1
+        WHERE no_akun = OLD.no_akun;
+"""
+LINE_SALDO_TRIGGERS_SQL = [
+    f"CREATE TRIGGER IF NOT EXISTS trg_line_saldo_ins AFTER INSERT ON journal_line BEGIN {_LINE_SALDO_ADD} END",
+    f"CREATE TRIGGER IF NOT EXISTS trg_line_saldo_del AFTER DELETE ON journal_line BEGIN {_LINE_SALDO_REMOVE} END",
+    f"""CREATE TRIGGER IF NOT EXISTS trg_line_saldo_upd
+            AFTER UPDATE OF no_akun, debit, kredit ON journal_line BEGIN {_LINE_SALDO_REMOVE} {_LINE_SALDO_ADD} END""",
+]
+
+
+def rebuild_saldo_akun(cur):
+    # full recomputation from journal_line + adjusting; used by the migration and by rebuild_saldo()
+    cur.execute("DELETE FROM saldo_akun")
+    cur.execute("""
+        INSERT INTO saldo_akun (no_akun, debit, kredit, adj_debit, adj_kredit, n_jurnal, n_adj)
+        SELECT no_akun, SUM(d), SUM(k), SUM(ad), SUM(ak), SUM(nj), SUM(na) FROM (
+            SELECT no_akun, SUM(debit) AS d, SUM(kredit) AS k, 0 AS ad, 0 AS ak, COUNT(*) AS nj, 0 AS na
+              FROM journal_line GROUP BY no_akun
+            UNION ALL SELECT akun_debit, 0, 0, IFNULL(debit,0), 0, 0, 1 FROM adjusting
+            UNION ALL SELECT akun_kredit, 0, 0, 0, IFNULL(kredit,0), 0, 1 FROM adjusting
+        ) GROUP BY no_akun
+    """)
+
+
+def _m004_journal_lines(cur):
+    for sql in JOURNAL_TABLES_V4:
+        cur.execute(sql)
+    # headers keep the jurnal ids; each row becomes a debit line and a credit line.
+    # Rows whose debit and kredit differ are kept as they are (unbalanced_entries() lists them).
+    cur.execute("""INSERT INTO journal_header (id, tanggal, keterangan, akun_debit, akun_kredit, debit, kredit)
+                   SELECT id, tanggal, keterangan, akun_debit, akun_kredit, IFNULL(debit,0), IFNULL(kredit,0)
+                   FROM jurnal ORDER BY id""")
+    cur.execute("""INSERT INTO journal_line (header_id, line_no, tanggal, no_akun, debit, kredit)
+                   SELECT id, 1, tanggal, akun_debit, IFNULL(debit,0), 0 FROM jurnal
+                   UNION ALL
+                   SELECT id, 2, tanggal, akun_kredit, 0, IFNULL(kredit,0) FROM jurnal
+                   ORDER BY 1, 2""")
+    seq = cur.execute("SELECT seq FROM sqlite_sequence WHERE name='jurnal'").fetchone()
+    if seq:
+        cur.execute("UPDATE sqlite_sequence SET seq=MAX(seq, ?) WHERE name='journal_header'", (seq[0],))
+        if cur.rowcount == 0:
+            cur.execute("INSERT INTO sqlite_sequence (name, seq) VALUES ('journal_header', ?)", (seq[0],))
+    cur.execute("DROP TABLE jurnal")
+    for sql in INDEXES_V4 + JOURNAL_VIEW_V4 + LINE_SALDO_TRIGGERS_SQL:
+        cur.execute(sql)
+    rebuild_saldo_akun(cur)
+
+
+# ---------------- fiscal periods ----------------
+# Closing a period (close_period) stores every account's cumulative journal
+# totals through its last day in period_snapshot. A balance as of a later date
+# is then that snapshot plus the lines after it, read from idx_line_tanggal.
+# Periods are contiguous and closed in order; the triggers refuse any write to
+# an entry dated on or before the last closed day, so snapshots stay valid.
+PERIOD_TABLES_V5 = [
+    """CREATE TABLE IF NOT EXISTS fiscal_period (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        date_from TEXT NOT NULL,
+        date_to TEXT NOT NULL UNIQUE,
+        closed_at TEXT NOT NULL
+    )""",
+    """CREATE TABLE IF NOT EXISTS period_snapshot (
+        period_id INTEGER NOT NULL REFERENCES fiscal_period(id) ON DELETE CASCADE,
+        no_akun TEXT NOT NULL,
+        debit INTEGER NOT NULL DEFAULT 0,
+        kredit INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (period_id, no_akun)
+    ) WITHOUT ROWID""",
+    # all accounts' lines in a date range (deltas after a snapshot, period reports)
+    "CREATE INDEX IF NOT EXISTS idx_line_tanggal ON journal_line (tanggal, no_akun, debit, kredit)",
+]
+
+PERIOD_CLOSED_MESSAGE = "Periode akuntansi sudah ditutup"
+_CLOSED = "(SELECT MAX(date_to) FROM fiscal_period)"
+
+
+def _period_lock_sql(table, event, condition):
+    return f"""CREATE TRIGGER IF NOT EXISTS trg_{table}_closed_{event.lower()} BEFORE {event} ON {table}
+                   WHEN {condition} BEGIN SELECT RAISE(ABORT, '{PERIOD_CLOSED_MESSAGE}'); END"""
+
+
+PERIOD_LOCK_TRIGGERS_SQL = [
+    _period_lock_sql(table, event, condition)
+    for table in ("journal_header", "journal_line")
+    for event, condition in (("INSERT", f"NEW.tanggal <= {_CLOSED}"),
+                             ("DELETE", f"OLD.tanggal <= {_CLOSED}"),
+                             ("UPDATE", f"OLD.tanggal <= {_CLOSED} OR NEW.tanggal <= {_CLOSED}"))
+]
+
+
+def _m005_fiscal_periods(cur):
+    for sql in PERIOD_TABLES_V5 + PERIOD_LOCK_TRIGGERS_SQL:
+        cur.execute(sql)
+
+
+MIGRATIONS = [
+    (1, _m001_saldo_akun),
+    (2, _m002_indexes),
+    (3, _m003_money_cents),
+    (4, _m004_journal_lines),
+    (5, _m005_fiscal_periods),
+]
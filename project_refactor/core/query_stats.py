@@ -0,0 +1,129 @@
+import logging
+import logging.handlers
+import math
+import os
+import re
+import sys
+import threading
+from collections import Counter, deque
+
+_THIS_FILE = os.path.normcase(os.path.abspath(__file__))
+
+_WS = re.compile(r"\s+")
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+
+
+def normalize_sql(sql):
+    """One line, literals replaced by ?, IN (?, ?, ...) collapsed: the aggregation key."""
+    s = _WS.sub(" ", sql).strip()
+    s = _STRING.sub("?", s)
+    s = _NUMBER.sub("?", s)
+    return _IN_LIST.sub("(?, ...)", s)
+
+
+def call_site(skip=()):
+    """'file.py:line function' of the first frame outside this module, contextlib and `skip` (normcased paths)."""
+    f = sys._getframe(1)
+    while f is not None:
+        path = os.path.normcase(os.path.abspath(f.f_code.co_filename))
+        if path != _THIS_FILE and path not in skip and not path.endswith("contextlib.py"):
+            return f"{os.path.basename(path)}:{f.f_lineno} {f.f_code.co_name}"
+        f = f.f_back
+    return "?"
+
+
+def _percentile(sorted_values, p):
+    # nearest rank
+    if not sorted_values:
+        return 0.0
+    return sorted_values[max(0, math.ceil(p / 100.0 * len(sorted_values)) - 1)]
+
+
+class QueryStats:
+    """
+    Per-statement timings collected by DBHelper when stats are enabled.
+    Statements are grouped by normalize_sql(); each group keeps count, totals and
+    the last `samples` durations for percentiles. Statements slower than
+    `slow_ms` also go to the slow-query logger.
+    """
+    def __init__(self, slow_ms=None, samples=1000, recent=500):
+        self.slow_ms = slow_ms
+        self.samples = samples
+        self._groups = {}
+        self._recent = deque(maxlen=recent)
+        self._all = deque(maxlen=samples * 10)
+        self._lock = threading.Lock()
+
+    def record(self, sql, seconds, rows=0, retries=0, site=None):
+        key = normalize_sql(sql)
+        ms = seconds * 1000.0
+        with self._lock:
+            g = self._groups.get(key)
+            if g is None:
+                g = self._groups[key] = {'count': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'rows': 0, 'retries': 0,
+                                         'durations': deque(maxlen=self.samples), 'sites': Counter()}
+            g['count'] += 1
+            g['total_ms'] += ms
+            g['max_ms'] = max(g['max_ms'], ms)
+            g['rows'] += rows
+            g['retries'] += retries
+            g['durations'].append(ms)
+            g['sites'][site] += 1
+            self._all.append(ms)
+            self._recent.append((key, ms, rows, retries, site))
+        if self.slow_ms is not None and ms >= self.slow_ms:
+            slow_log.warning("%.1f ms rows=%d retries=%d site=%s sql=%s", ms, rows, retries, site, key)
+
+    def summary(self):
+        """One dict per statement, most expensive (total time) first."""
+        with self._lock:
+            groups = [(k, dict(g, durations=sorted(g['durations']), sites=g['sites'].most_common(3)))
+                      for k, g in self._groups.items()]
+        out = []
+        for sql, g in groups:
+            d = g.pop('durations')
+            g.update(sql=sql, p50_ms=_percentile(d, 50), p95_ms=_percentile(d, 95), p99_ms=_percentile(d, 99))
+            out.append(g)
+        out.sort(key=lambda g: g['total_ms'], reverse=True)
+        return out
+
+    def totals(self):
+        with self._lock:
+            d = sorted(self._all)
+            count = sum(g['count'] for g in self._groups.values())
+            total = sum(g['total_ms'] for g in self._groups.values())
+            statements = len(self._groups)
+        return {'count': count, 'total_ms': total, 'statements': statements,
+                'p50_ms': _percentile(d, 50), 'p95_ms': _percentile(d, 95), 'p99_ms': _percentile(d, 99)}
+
+    def recent(self):
+        """Latest individual records: (sql, ms, rows, retries, site), oldest first."""
+        with self._lock:
+            return list(self._recent)
+
+    def reset(self):
+        with self._lock:
+            self._groups.clear()
+            self._recent.clear()
+            self._all.clear()
+
+
+slow_log = logging.getLogger("sia.db.slow")
+slow_log.propagate = False
+_slow_handler = None
+
+def setup_slow_log(path, max_bytes, backups):
+    """Send the slow-query logger to a rotating file (once; later calls move it)."""
+    global _slow_handler
+    if _slow_handler is not None:
+        if _slow_handler.baseFilename == os.path.abspath(path):
+            return
+        slow_log.removeHandler(_slow_handler)
+        _slow_handler.close()
+    _slow_handler = logging.handlers.RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backups,
+                                                         encoding="utf-8", delay=True)
+    _slow_handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+    slow_log.addHandler(_slow_handler)
+    slow_log.setLevel(logging.WARNING)
@@ -0,0 +1,25 @@
+"""
+Maintenance commands for the accounting database (same as the cli.py commands).
+
+    python maintenance.py verify-saldo    # saldo_akun vs. full recomputation
+    python maintenance.py rebuild-saldo   # recompute saldo_akun from journal lines/adjusting
+    python maintenance.py check-indexes   # EXPLAIN QUERY PLAN of the hot queries
+    python maintenance.py check-journal   # entries whose debit and kredit totals differ
+"""
+import sys
+
+import cli
+
+COMMANDS = ("verify-saldo", "rebuild-saldo", "check-indexes", "check-journal")
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv or argv[0] not in COMMANDS:
+        print(__doc__.strip())
+        return cli.EXIT_USAGE
+    return cli.main(argv)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
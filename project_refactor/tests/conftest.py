@@ -0,0 +1,7 @@
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# core.db opens SIA_DB when it is first used: never the akuntansi.db in the working tree
+os.environ["SIA_DB"] = os.path.join(tempfile.mkdtemp(prefix="sia-test-"), "akuntansi.db")
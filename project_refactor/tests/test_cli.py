@@ -0,0 +1,31 @@
+import os
+
+import pytest
+
+import cli
+from core.db import get_db
+
+
+@pytest.fixture
+def book(tmp_path, monkeypatch):
+    path = str(tmp_path / "book.db")
+    get_db().reopen(path)
+    # cli.main points SIA_DB at --db; keep that out of the other tests
+    monkeypatch.setenv("SIA_DB", os.environ["SIA_DB"])
+    yield path
+    get_db().close()
+
+
+@pytest.mark.parametrize("args", [
+    ["trial", "--as-of", "2024-13-01"],
+    ["reports", "--from", "kemarin"],
+    ["trial", "--from", "2024-02-01", "--to", "2024-01-31"],
+    ["trial", "--as-of", "2024-01-31", "--to", "2024-01-31"],
+    ["close-period", "2024-02-30"],
+])
+def test_bad_period_is_a_usage_error(book, args):
+    assert cli.main(["--db", book] + args) == cli.EXIT_USAGE
+
+
+def test_period_report(book, capsys):
+    assert cli.main(["--db", book, "trial", "--from", "2024-01-01", "--to", "2024-01-31"]) == cli.EXIT_OK
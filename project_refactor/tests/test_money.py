@@ -0,0 +1,46 @@
+import sqlite3
+
+import pytest
+
+import core.migrations as migrations
+from core.db import get_db
+from utils.helpers import to_cents
+
+
+@pytest.mark.parametrize("value, sen", [
+    (None, 0), ("", 0), (" ", 0), (0, 0), (12, 1200), ("12.5", 1250), (" 7 ", 700),
+    (0.285, 29), ("-3.005", -301),
+])
+def test_to_cents(value, sen):
+    assert to_cents(value) == sen
+
+
+@pytest.mark.parametrize("value", ["1.000.000", "1,5", "1,000", "abc", "nan", "inf", float("inf"), True])
+def test_to_cents_rejects_unreadable_amounts(value):
+    with pytest.raises(ValueError, match="Nominal tidak valid"):
+        to_cents(value)
+
+
+def test_money_migration_reports_unconvertible_rows(tmp_path, monkeypatch):
+    path = str(tmp_path / "v2.db")
+    with monkeypatch.context() as m:
+        m.setattr(migrations, "MIGRATIONS", migrations.MIGRATIONS[:2])
+        db = get_db().reopen(path)
+        db.execute("INSERT INTO akun (no_akun, nama_akun, tipe, starting_balance) VALUES "
+                   "('101', 'Kas', 'Asset', '1.000.000'), ('401', 'Penjualan', 'Revenue', 5.285)", commit=True)
+        db.execute("INSERT INTO jurnal (tanggal, akun_debit, akun_kredit, debit, kredit) "
+                   "VALUES ('2024-01-01', '101', '401', 'abc', 5)", commit=True)
+        db.close()
+    conn = sqlite3.connect(path)
+    with pytest.raises(ValueError) as e:
+        migrations.apply_migrations(conn)
+    assert "akun id 1 starting_balance='1.000.000'" in str(e.value)
+    assert "jurnal id 1 debit='abc'" in str(e.value)
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == 2
+    conn.execute("UPDATE akun SET starting_balance = 1000000 WHERE no_akun = '101'")
+    conn.execute("UPDATE jurnal SET debit = 5")
+    conn.commit()
+    migrations.apply_migrations(conn)
+    assert conn.execute("SELECT starting_balance FROM akun ORDER BY no_akun").fetchall() == [(100000000,), (529,)]
+    conn.close()
+    get_db().close()
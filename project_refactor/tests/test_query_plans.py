@@ -0,0 +1,93 @@
+"""
+The hot queries must be served by their indexes whatever the planner
+statistics say. The database is migrated while it holds a single entry and
+then grows without ANALYZE, the way a real book does.
+"""
+import sqlite3
+
+import pytest
+
+import core.accounting as acc
+import core.migrations as migrations
+from core.db import get_db
+
+ROWS = 5000
+# statistics as ANALYZE leaves them on a one-entry book
+STALE_STATS = [
+    ('journal_header', 'idx_header_tanggal', '1 1 1'),
+    ('journal_line', 'idx_line_tanggal', '2 2 1 1 1'),
+    ('journal_line', 'idx_line_akun', '2 1 1 1 1 1'),
+    ('journal_line', 'idx_line_header', '2 2 1'),
+]
+
+
+@pytest.fixture
+def book(tmp_path, monkeypatch):
+    path = str(tmp_path / "book.db")
+    # the base tables as the first release created them, with one entry in rupiah
+    with monkeypatch.context() as m:
+        m.setattr(migrations, "MIGRATIONS", [])
+        db = get_db().reopen(path)
+        db.execute("INSERT INTO akun (no_akun, nama_akun, tipe, starting_balance) VALUES "
+                   "('101', 'Kas', 'Asset', 0), ('401', 'Penjualan', 'Revenue', 0)", commit=True)
+        db.execute("INSERT INTO jurnal (tanggal, akun_debit, akun_kredit, debit, kredit, keterangan) "
+                   "VALUES ('2022-12-31', '101', '401', 1000.0, 1000.0, 'awal')", commit=True)
+        db.close()
+    conn = sqlite3.connect(path)
+    assert migrations.apply_migrations(conn) == migrations.MIGRATIONS[-1][0]
+    conn.executemany("INSERT INTO akun (no_akun, nama_akun, tipe, starting_balance) VALUES (?, ?, ?, 0)",
+                     [(f"5{i:02d}", f"Beban {i}", "Expense") for i in range(40)])
+    conn.executemany("INSERT INTO jurnal (tanggal, akun_debit, akun_kredit, debit, kredit, keterangan) "
+                     "VALUES (?, ?, '101', ?, ?, 'x')",
+                     [(f"2023-{i % 12 + 1:02d}-{i % 28 + 1:02d}", f"5{i % 40:02d}", 100 * i, 100 * i)
+                      for i in range(1, ROWS)])
+    conn.commit()
+    conn.close()
+    yield get_db().reopen(path)
+    get_db().close()
+
+
+def _plan(sql, params):
+    return " | ".join(acc.explain_query_plan(sql, params))
+
+
+def _assert_hot_plans():
+    assert acc.check_query_plans() == []
+    for sql, params in ((acc.SQL_JOURNAL_FIRST, (200,)),
+                        (acc.SQL_JOURNAL_AFTER, ('2023-06-01', 0, 200)),
+                        (acc.SQL_JOURNAL_BEFORE, ('2023-06-01', 0, 200))):
+        plan = _plan(sql, params)
+        assert "idx_header_tanggal" in plan and "TEMP B-TREE" not in plan, plan
+    ledger = {'no': '101', 'date_from': '2023-06-01', 'date_to': None, 'awal': 0, 'limit': 200, 'offset': 0}
+    plan = _plan(acc._ledger_sql('2023-06-01', None, 200), ledger)
+    assert "SEARCH l USING COVERING INDEX idx_line_akun" in plan and "SCAN journal_header" not in plan, plan
+    plan = _plan(acc.SQL_LEDGER_BEFORE, {'no': '101', 'date_from': '2023-06-01'})
+    assert "idx_line_akun" in plan, plan
+
+
+def test_plans_after_migration_without_analyze(book):
+    _assert_hot_plans()
+
+
+def test_plans_with_stale_statistics(book):
+    with book.connection(write=True) as conn:
+        conn.execute("ANALYZE sqlite_schema")  # creates sqlite_stat1 if missing
+        conn.execute("DELETE FROM sqlite_stat1")
+        conn.executemany("INSERT INTO sqlite_stat1 (tbl, idx, stat) VALUES (?, ?, ?)", STALE_STATS)
+    book.reopen()
+    _assert_hot_plans()
+
+
+def test_close_refreshes_stale_statistics(book):
+    with book.connection(write=True) as conn:
+        conn.execute("ANALYZE sqlite_schema")
+        conn.execute("DELETE FROM sqlite_stat1")
+        conn.executemany("INSERT INTO sqlite_stat1 (tbl, idx, stat) VALUES (?, ?, ?)", STALE_STATS)
+    book.reopen()
+    acc.journal_page(after=('2023-06-01', 0))
+    acc.ledger_for_account('101', date_from='2023-06-01', limit=200)
+    book.close()
+    conn = sqlite3.connect(book.filename)
+    stats = dict(((tbl, idx), int(stat.split()[0])) for tbl, idx, stat in conn.execute("SELECT * FROM sqlite_stat1"))
+    conn.close()
+    assert stats[('journal_line', 'idx_line_akun')] > ROWS
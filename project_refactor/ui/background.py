@@ -0,0 +1,102 @@
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class Cancelled(Exception):
+    """Raised inside a job that noticed it was superseded or cancelled."""
+
+
+class Job:
+    def __init__(self, key=None):
+        self.key = key
+        self.cancelled = threading.Event()
+
+    def cancel(self):
+        self.cancelled.set()
+
+    def check(self):
+        # call between steps of a long job to stop early
+        if self.cancelled.is_set():
+            raise Cancelled()
+
+
+class BackgroundRunner:
+    """
+    Runs slow work (SQL, aggregation, exports) on a small thread pool and hands
+    the results back on the Tk thread. Workers never touch widgets: they put the
+    result on a queue which `widget.after()` polls, and the callbacks run there.
+
+    Jobs submitted with the same `key` supersede each other: the older one is
+    cancelled (if it hasn't started it never runs; if it has, job.check() raises
+    Cancelled) and its result is dropped even if it finishes.
+    """
+    def __init__(self, widget, workers=2, poll_ms=50):
+        self.widget = widget
+        self.poll_ms = poll_ms
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bg")
+        self._results = queue.Queue()
+        self._latest = {}
+        self._closed = False
+        self.widget.after(self.poll_ms, self._poll)
+
+    def submit(self, fn, *args, key=None, on_done=None, on_error=None, pass_job=False):
+        """
+        Run fn(*args) (or fn(job, *args) with pass_job=True) in the background.
+        on_done(result) / on_error(exc) are called on the Tk thread.
+        """
+        job = Job(key)
+        if key is not None:
+            old = self._latest.get(key)
+            if old is not None:
+                old.cancel()
+            self._latest[key] = job
+
+        def run():
+            if job.cancelled.is_set():
+                return
+            try:
+                result = fn(job, *args) if pass_job else fn(*args)
+            except Cancelled:
+                return
+            except Exception as e:
+                self._results.put((job, on_error, e))
+                return
+            self._results.put((job, on_done, result))
+
+        self._executor.submit(run)
+        return job
+
+    def post(self, callback, *args):
+        """Thread-safe: run callback(*args) on the Tk thread (progress updates etc.)."""
+        self._results.put((None, callback, args))
+
+    def _poll(self):
+        if self._closed:
+            return
+        try:
+            while True:
+                job, callback, value = self._results.get_nowait()
+                if job is None:
+                    callback(*value)
+                    continue
+                if job.cancelled.is_set():
+                    continue
+                if job.key is not None and self._latest.get(job.key) is job:
+                    del self._latest[job.key]
+                if callback is not None:
+                    callback(value)
+                elif isinstance(value, Exception):
+                    print("Error background job:", value)
+        except queue.Empty:
+            pass
+        except Exception as e:
+            # a failing callback must not stop the polling loop
+            print("Error background callback:", e)
+        self.widget.after(self.poll_ms, self._poll)
+
+    def close(self):
+        self._closed = True
+        for job in self._latest.values():
+            job.cancel()
+        self._executor.shutdown(wait=False, cancel_futures=True)
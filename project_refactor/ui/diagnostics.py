@@ -0,0 +1,78 @@
+import os
+import tkinter as tk
+from tkinter import ttk
+
+from core.config import WINDOW_BG, DB_SLOW_QUERY_LOG, DB_SLOW_QUERY_MS
+from core.db import get_db
+from core.accounting import result_cache_info
+from ui.tree_sync import sync_tree
+
+COLUMNS = (('count', "Jumlah", 70), ('total', "Total ms", 90), ('p50', "p50", 70), ('p95', "p95", 70),
+           ('p99', "p99", 70), ('max', "Maks", 70), ('rows', "Baris", 90), ('retries', "Retry", 60),
+           ('site', "Dipanggil dari", 220), ('sql', "SQL", 600))
+
+
+class DiagnosticsWindow(tk.Toplevel):
+    """Query statistics from DBHelper (hidden panel, Ctrl+Shift+D); refreshes itself while open."""
+    REFRESH_MS = 1000
+
+    def __init__(self, parent):
+        super().__init__(parent)
+        self.db = get_db()
+        self.title("Diagnostik Query"); self.geometry("1200x520"); self.configure(bg=WINDOW_BG)
+        top = ttk.Frame(self, padding=8); top.pack(fill='x')
+        self.var_enabled = tk.BooleanVar(value=self.db.stats is not None)
+        ttk.Checkbutton(top, text="Catat statistik query", variable=self.var_enabled, command=self.toggle).pack(side='left')
+        ttk.Button(top, text="Reset", command=self.reset).pack(side='left', padx=6)
+        ttk.Button(top, text="Tutup", command=self.destroy).pack(side='right')
+        self.lbl_totals = ttk.Label(self, padding=(8, 0)); self.lbl_totals.pack(fill='x')
+        self.lbl_info = ttk.Label(self, padding=(8, 0)); self.lbl_info.pack(fill='x')
+        frm = ttk.Frame(self, padding=8); frm.pack(fill='both', expand=True)
+        self.tree = ttk.Treeview(frm, columns=[c[0] for c in COLUMNS], show='headings')
+        for col, text, width in COLUMNS:
+            self.tree.heading(col, text=text)
+            self.tree.column(col, width=width, anchor='w' if col in ('site', 'sql') else 'e', stretch=col == 'sql')
+        sb = ttk.Scrollbar(frm, orient='vertical', command=self.tree.yview); self.tree.configure(yscrollcommand=sb.set)
+        self.tree.pack(side='left', fill='both', expand=True); sb.pack(side='right', fill='y')
+        self._timer = None
+        self.refresh()
+
+    def toggle(self):
+        if self.var_enabled.get():
+            self.db.enable_stats()
+        else:
+            self.db.disable_stats()
+        self.refresh()
+
+    def reset(self):
+        if self.db.stats is not None:
+            self.db.stats.reset()
+        self.refresh()
+
+    def refresh(self):
+        if self._timer is not None:
+            self.after_cancel(self._timer)
+        stats = self.db.stats
+        if stats is None:
+            self.lbl_totals.config(text="Statistik query tidak aktif")
+            rows = []
+        else:
+            t = stats.totals()
+            self.lbl_totals.config(text=f"{t['count']:,} query, {t['statements']} statement berbeda, total {t['total_ms']:,.1f} ms"
+                                        f" - p50 {t['p50_ms']:.2f} / p95 {t['p95_ms']:.2f} / p99 {t['p99_ms']:.2f} ms")
+            rows = [(g['sql'], (g['count'], f"{g['total_ms']:,.1f}", f"{g['p50_ms']:.2f}", f"{g['p95_ms']:.2f}",
+                                f"{g['p99_ms']:.2f}", f"{g['max_ms']:.2f}", g['rows'], g['retries'],
+                                g['sites'][0][0] if g['sites'] else '', g['sql']))
+                    for g in stats.summary()]
+        cache = result_cache_info()
+        self.lbl_info.config(text=f"Cache hasil: {cache['hits']} hit / {cache['misses']} miss ({cache['size']}/{cache['maxsize']})"
+                                  f" - lock retry: {self.db.lock_retries}"
+                                  f" - slow log: {os.path.abspath(DB_SLOW_QUERY_LOG)} (>= {DB_SLOW_QUERY_MS} ms)")
+        sync_tree(self.tree, rows)
+        self._timer = self.after(self.REFRESH_MS, self.refresh)
+
+    def destroy(self):
+        if self._timer is not None:
+            self.after_cancel(self._timer)
+            self._timer = None
+        super().destroy()
@@ -0,0 +1,134 @@
+import os
+import shutil
+import threading
+
+from core.db import get_db
+from core.accounting import ExportCancelled
+from ui.background import BackgroundRunner
+
+
+class ExportJob:
+    def __init__(self, title, path, signature, version):
+        self.title = title
+        self.path = path
+        self.signature = signature
+        self.version = version
+        self.cancelled = threading.Event()
+        self.rows = 0
+        self.rate = 0.0
+        # other destinations asked for while this job was running
+        self.copies = []
+
+
+class ExportManager:
+    """
+    Runs exporters on their own worker pool (so refreshes aren't queued behind a
+    big export) and reports through on_status(text, busy) on the Tk thread.
+
+    Jobs are identified by exporter + options. Asking for the same export again
+    at the same data version does not run it twice: while it is running the new
+    destination is attached to it, and once it has finished the last produced
+    file is copied (as long as it is still on disk and unmodified).
+    """
+    def __init__(self, widget, on_status, on_done, on_error, workers=2):
+        self.runner = BackgroundRunner(widget, workers=workers)
+        self.on_status = on_status
+        self.on_done = on_done
+        self.on_error = on_error
+        self._running = []
+        self._produced = {}
+
+    def submit(self, title, export, path, **kwargs):
+        signature = (export.__module__, export.__name__, tuple(sorted(kwargs.items())))
+        version = get_db().data_version()
+        for running in self._running:
+            if running.signature == signature and running.version == version and not running.cancelled.is_set():
+                if path != running.path and path not in running.copies:
+                    running.copies.append(path)
+                self._status()
+                return running
+        produced = self._produced.get(signature)
+        if produced is not None and produced[0] == version and self._unchanged(produced):
+            # same data, same options: reuse the file from last time
+            self.runner.submit(self._copy, produced[1], [path], on_done=lambda _: self.on_done(title, path, True),
+                               on_error=lambda e: self.on_error(title, e))
+            return None
+
+        job = ExportJob(title, path, signature, version)
+        self._running.append(job)
+
+        def progress(rows, rate):
+            # worker thread -> Tk thread
+            job.rows = rows; job.rate = rate
+            self.runner.post(self._status)
+
+        def work():
+            export(path, progress=progress, cancelled=job.cancelled.is_set, **kwargs)
+
+        def done(_):
+            self._finish(job)
+            st = os.stat(path)
+            self._produced[signature] = (version, path, st.st_size, st.st_mtime)
+            self.on_done(title, path, False)
+            # destinations attached while running (both lists only change on the Tk thread)
+            copies = list(job.copies)
+            if copies:
+                self.runner.submit(self._copy, path, copies,
+                                   on_done=lambda _: [self.on_done(title, p, True) for p in copies],
+                                   on_error=lambda e: self.on_error(title, e))
+
+        def failed(e):
+            self._finish(job)
+            if isinstance(e, ExportCancelled):
+                self.on_status(f"{title} dibatalkan", False)
+            else:
+                self.on_error(title, e)
+
+        self.runner.submit(work, on_done=done, on_error=failed)
+        self._status()
+        return job
+
+    def cancel_all(self):
+        for job in self._running:
+            job.cancelled.set()
+        self._status()
+
+    def close(self):
+        self.cancel_all()
+        self.runner.close()
+
+    def busy(self):
+        return bool(self._running)
+
+    @staticmethod
+    def _copy(src, targets):
+        for target in targets:
+            if os.path.abspath(target) != os.path.abspath(src):
+                shutil.copyfile(src, target)
+
+    @staticmethod
+    def _unchanged(produced):
+        _version, path, size, mtime = produced
+        try:
+            st = os.stat(path)
+        except OSError:
+            return False
+        return st.st_size == size and st.st_mtime == mtime
+
+    def _finish(self, job):
+        if job in self._running:
+            self._running.remove(job)
+        self._status()
+
+    def _status(self):
+        jobs = list(self._running)
+        if not jobs:
+            self.on_status("Siap", False)
+        elif len(jobs) == 1:
+            job = jobs[0]
+            text = f"{job.title}: {job.rows:,} baris ({job.rate:,.0f} baris/detik)"
+            if job.cancelled.is_set():
+                text += " - membatalkan..."
+            self.on_status(text, True)
+        else:
+            self.on_status(f"{len(jobs)} export berjalan: " + ", ".join(j.title for j in jobs), True)
@@ -0,0 +1,130 @@
+from collections import OrderedDict
+from tkinter import ttk
+
+from core.config import JOURNAL_PAGE_SIZE, JOURNAL_PAGE_CACHE
+from core.db import get_db
+from core.accounting import journal_page, journal_key_at, count_journal_entries
+from ui.tree_sync import sync_tree
+
+
+class JournalGrid(ttk.Frame):
+    """
+    Virtual-scrolling journal: the Treeview only ever holds the rows that fit on
+    screen. Rows are fetched a page at a time with keyset pagination on
+    (tanggal, id); at most `max_pages` pages stay in memory (LRU) and the page
+    after the visible window is prefetched when the UI is idle. Memory and render
+    time do not depend on the size of the journal.
+    """
+    def __init__(self, parent, columns, height=18, page_size=JOURNAL_PAGE_SIZE, max_pages=JOURNAL_PAGE_CACHE):
+        super().__init__(parent)
+        self.page_size = page_size
+        self.max_pages = max(2, max_pages)
+        self.total = 0
+        self.top = 0
+        self.visible = height
+        self._pages = OrderedDict()
+        self._version = None
+        self._prefetch_job = None
+
+        self.tree = ttk.Treeview(self, columns=columns, show='headings', height=height)
+        self.scrollbar = ttk.Scrollbar(self, orient='vertical', command=self._on_scrollbar)
+        self.tree.pack(side='left', fill='both', expand=True)
+        self.scrollbar.pack(side='right', fill='y')
+
+        self.tree.bind("<MouseWheel>", self._on_wheel)
+        self.tree.bind("<Button-4>", lambda e: self.scroll_by(-3))
+        self.tree.bind("<Button-5>", lambda e: self.scroll_by(3))
+        self.tree.bind("<Prior>", lambda e: self.scroll_by(-self.visible))
+        self.tree.bind("<Next>", lambda e: self.scroll_by(self.visible))
+        self.tree.bind("<Configure>", self._on_resize)
+
+    # data
+    def refresh(self):
+        """Re-read the journal if the database changed since the last call."""
+        version = get_db().data_version()
+        if version != self._version:
+            # keyset pages are chained off each other; drop them all on any change
+            self._pages.clear()
+            self.total = count_journal_entries()
+            self._version = version
+        self.scroll_to(self.top)
+
+    def _page(self, p):
+        rows = self._pages.get(p)
+        if rows is not None:
+            self._pages.move_to_end(p)
+            return rows
+        prev_rows = self._pages.get(p - 1)
+        next_rows = self._pages.get(p + 1)
+        if p == 0:
+            rows = journal_page(limit=self.page_size)
+        elif prev_rows:
+            rows = journal_page(after=(prev_rows[-1][1], prev_rows[-1][0]), limit=self.page_size)
+        elif next_rows:
+            rows = journal_page(before=(next_rows[0][1], next_rows[0][0]), limit=self.page_size)
+        else:
+            # jump (scrollbar drag): find the key just before the page once
+            key = journal_key_at(p * self.page_size - 1)
+            rows = journal_page(after=key, limit=self.page_size) if key else []
+        self._pages[p] = rows
+        while len(self._pages) > self.max_pages:
+            self._pages.popitem(last=False)
+        return rows
+
+    def _rows(self, start, count):
+        out = []
+        p = start // self.page_size
+        skip = start - p * self.page_size
+        while len(out) < count and p * self.page_size < self.total:
+            rows = self._page(p)
+            if not rows:
+                break
+            out.extend(rows[skip:skip + count - len(out)])
+            skip = 0
+            p += 1
+        return out
+
+    # view
+    def scroll_to(self, top):
+        self.top = max(0, min(int(top), self.total - self.visible))
+        rows = self._rows(self.top, self.visible)
+        sync_tree(self.tree, ((id_, (id_, tgl, ad, ak, f"{d:,.2f}", f"{k:,.2f}", ket))
+                              for id_, tgl, ad, ak, d, k, ket in rows))
+        if self.total:
+            self.scrollbar.set(self.top / self.total, min(1.0, (self.top + self.visible) / self.total))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+        self._schedule_prefetch()
+
+    def scroll_by(self, rows):
+        self.scroll_to(self.top + rows)
+        return "break"
+
+    def _on_scrollbar(self, *args):
+        if args[0] == 'moveto':
+            self.scroll_to(float(args[1]) * self.total)
+        elif args[0] == 'scroll':
+            n = int(args[1])
+            self.scroll_by(n * self.visible if args[2] == 'pages' else n)
+
+    def _on_wheel(self, event):
+        return self.scroll_by(-3 if event.delta > 0 else 3)
+
+    def _on_resize(self, event):
+        rowheight = ttk.Style().lookup('Treeview', 'rowheight') or 20
+        # minus the heading row
+        visible = max(1, int(event.height) // int(rowheight) - 1)
+        if visible != self.visible:
+            self.visible = visible
+            self.scroll_to(self.top)
+
+    def _schedule_prefetch(self):
+        if self._prefetch_job is not None:
+            self.after_cancel(self._prefetch_job)
+        self._prefetch_job = self.after_idle(self._prefetch)
+
+    def _prefetch(self):
+        self._prefetch_job = None
+        nxt = (self.top + self.visible - 1) // self.page_size + 1
+        if nxt * self.page_size < self.total:
+            self._page(nxt)
@@ -1,9 +1,24 @@
 import threading
 import tkinter as tk
+from datetime import datetime
 from tkinter import ttk, messagebox, filedialog, simpledialog
 from core.config import APP_TITLE, WINDOW_BG, COLOR_PRIMARY, COLOR_ACCENT, COLOR_TEXT, CARD_BG, FONT
 from core.db import get_db
-from utils.helpers import to_decimal, moneyfmt, hash_password
+from utils.helpers import to_cents, from_cents, moneyfmt, hash_password
+from utils.lazy import chart_backend
+from ui.tree_sync import sync_tree
+from ui.journal_grid import JournalGrid
+from ui.background import BackgroundRunner
+from ui.export_jobs import ExportManager
+from ui.diagnostics import DiagnosticsWindow
+from ui.tab_data import ALL_TABS, TAB_DEPENDENCIES, PERIOD_TABS, load_tab
+from core.importer import import_journal, write_error_report
+from core.accounting import (list_accounts, add_account_db, edit_account_db, delete_account_db,
+                             add_journal_db, post_journal_entry, delete_journal_db, ledger_for_account,
+                             add_adjusting_db, delete_adjusting_db, apply_adjustments,
+                             build_snapshot, close_period, reopen_last_period, closed_through, period_args,
+                             export_trial_to_excel, export_journal_to_excel, export_adjusting_to_excel,
+                             export_reports_to_pdf, export_reports_to_excel)
 
 class ActivationDialog(tk.Toplevel):
     def __init__(self, parent, email):
@@ -146,6 +161,72 @@ class JournalDialog(tk.Toplevel):
         except Exception as e:
             messagebox.showerror("Error", str(e))
 
+class CompoundJournalDialog(tk.Toplevel):
+    """Jurnal majemuk: any number of debit/credit lines, returned only when balanced."""
+    def __init__(self, parent, accounts):
+        super().__init__(parent)
+        self.title("Tambah Jurnal Majemuk"); self.geometry("680x560"); self.configure(bg=WINDOW_BG)
+        self.result = None
+        ttk.Label(self, text="Tanggal (YYYY-MM-DD):").pack(anchor='w', padx=12, pady=6)
+        self.e_date = ttk.Entry(self); self.e_date.pack(fill='x', padx=12); self.e_date.insert(0, datetime.now().strftime("%Y-%m-%d"))
+        ttk.Label(self, text="Keterangan:").pack(anchor='w', padx=12, pady=6)
+        self.e_ket = ttk.Entry(self); self.e_ket.pack(fill='x', padx=12)
+        line = ttk.Frame(self); line.pack(fill='x', padx=12, pady=10)
+        self.combo_acc = ttk.Combobox(line, values=[f"{a[0]} - {a[1]}" for a in accounts], width=30); self.combo_acc.pack(side='left')
+        ttk.Label(line, text="Debit:").pack(side='left', padx=(8,2))
+        self.e_debit = ttk.Entry(line, width=12); self.e_debit.pack(side='left')
+        ttk.Label(line, text="Kredit:").pack(side='left', padx=(8,2))
+        self.e_kredit = ttk.Entry(line, width=12); self.e_kredit.pack(side='left')
+        ttk.Button(line, text="Tambah Baris", command=self.add_line).pack(side='left', padx=8)
+        self.tree = ttk.Treeview(self, columns=("Akun","Debit","Kredit"), show='headings', height=12)
+        for c in ("Akun","Debit","Kredit"):
+            self.tree.heading(c, text=c); self.tree.column(c, width=300 if c == "Akun" else 120, anchor='w' if c == "Akun" else 'e')
+        self.tree.pack(fill='both', expand=True, padx=12)
+        bottom = ttk.Frame(self); bottom.pack(fill='x', padx=12, pady=10)
+        self.lbl_total = ttk.Label(bottom); self.lbl_total.pack(side='left')
+        ttk.Button(bottom, text="Simpan", command=self.save).pack(side='right')
+        ttk.Button(bottom, text="Hapus Baris", command=self.remove_line).pack(side='right', padx=6)
+        self.lines = {}   # tree iid -> (no_akun, debit, kredit)
+        self.update_total()
+    def add_line(self):
+        sel = self.combo_acc.get().strip()
+        try:
+            # "," is a thousands separator here, as in the other journal dialogs
+            debit = from_cents(to_cents(self.e_debit.get().strip().replace(",","")))
+            kredit = from_cents(to_cents(self.e_kredit.get().strip().replace(",","")))
+        except ValueError as e:
+            messagebox.showerror("Error", str(e), parent=self); return
+        if not sel:
+            messagebox.showerror("Error","Pilih akun", parent=self); return
+        if debit < 0 or kredit < 0 or (debit == 0) == (kredit == 0):
+            messagebox.showerror("Error","Isi debit atau kredit (salah satu, tidak negatif)", parent=self); return
+        iid = self.tree.insert('', 'end', values=(sel, moneyfmt(debit) if debit else "", moneyfmt(kredit) if kredit else ""))
+        self.lines[iid] = (sel.split(" - ",1)[0].strip(), debit, kredit)
+        self.e_debit.delete(0,'end'); self.e_kredit.delete(0,'end')
+        self.update_total()
+    def remove_line(self):
+        for iid in self.tree.selection():
+            self.tree.delete(iid); self.lines.pop(iid, None)
+        self.update_total()
+    def totals(self):
+        return sum(l[1] for l in self.lines.values()), sum(l[2] for l in self.lines.values())
+    def update_total(self):
+        d, k = self.totals()
+        state = "seimbang" if d == k and d else f"selisih {moneyfmt(abs(d - k))}"
+        self.lbl_total.config(text=f"Total debit {moneyfmt(d)} / kredit {moneyfmt(k)} - {state}")
+    def save(self):
+        tanggal = self.e_date.get().strip(); ket = self.e_ket.get().strip()
+        d, k = self.totals()
+        try:
+            datetime.strptime(tanggal, "%Y-%m-%d")
+            if len(self.lines) < 2: raise ValueError("Jurnal minimal terdiri dari dua baris")
+            if d != k: raise ValueError("Total debit dan kredit harus sama")
+        except Exception as e:
+            messagebox.showerror("Error", str(e), parent=self); return
+        # tree order = line order
+        self.result = (tanggal, ket, [self.lines[iid] for iid in self.tree.get_children()])
+        self.destroy()
+
 class AdjustDialog(tk.Toplevel):
     def __init__(self, parent, accounts):
         super().__init__(parent)
@@ -182,6 +263,25 @@ class AdjustDialog(tk.Toplevel):
         except Exception as e:
             messagebox.showerror("Error", str(e))
 
+class ProgressDialog(tk.Toplevel):
+    """Status text + busy bar for a background job; Batal only raises a flag the job polls."""
+    def __init__(self, parent, title):
+        super().__init__(parent)
+        self.title(title); self.geometry("460x150"); self.configure(bg=WINDOW_BG); self.transient(parent)
+        self.cancelled = threading.Event()
+        self.lbl = ttk.Label(self, text="Memulai..."); self.lbl.pack(anchor='w', padx=12, pady=(14,6))
+        self.bar = ttk.Progressbar(self, mode='indeterminate'); self.bar.pack(fill='x', padx=12); self.bar.start(60)
+        self.btn = ttk.Button(self, text="Batal", command=self.cancel); self.btn.pack(pady=12)
+        self.protocol("WM_DELETE_WINDOW", self.cancel)
+
+    def set_status(self, text):
+        if self.winfo_exists():
+            self.lbl.config(text=text)
+
+    def cancel(self):
+        self.cancelled.set()
+        self.lbl.config(text="Membatalkan..."); self.btn.state(['disabled'])
+
 
 class MainApp(tk.Tk):
     def __init__(self, user_email):
@@ -198,11 +298,19 @@ class MainApp(tk.Tk):
         self.style.configure('TFrame', background=WINDOW_BG)
         self.style.configure('TLabel', background=WINDOW_BG, foreground=COLOR_TEXT, font=FONT)
         self.style.configure('Header.TLabel', font=("Segoe UI", 14, 'bold'), foreground=COLOR_PRIMARY, background=WINDOW_BG)
-        self._refresh_lock = threading.Lock()
+        # SQL and aggregation run here; widgets are only touched on the Tk thread
+        self.bg = BackgroundRunner(self)
+        self.exports = ExportManager(self, self.set_status, self._export_done, self._export_failed)
         self._debounce_timer = None
-        self.build_header(); self.build_notebook()
+        self._dirty = set(ALL_TABS)
+        # (date_from, date_to) per PERIOD_TABS tab, (None, None) = all data
+        self._periods = {tab: (None, None) for tab in PERIOD_TABS}
+        self.build_header(); self.build_statusbar(); self.build_notebook()
         self.after(200, self.refresh_all)
         self.bind("<F11>", lambda e: self.toggle_fullscreen()); self.bind("<Escape>", lambda e: self.exit_fullscreen_if_any())
+        # hidden query diagnostics panel
+        self.bind("<Control-Shift-D>", lambda e: self.show_diagnostics())
+        self._diagnostics = None
 
     def build_header(self):
         hdr = tk.Frame(self, bg=COLOR_PRIMARY, height=54); hdr.pack(fill='x', side='top')
@@ -216,6 +324,24 @@ class MainApp(tk.Tk):
         hdr.bind("<ButtonPress-1>", self.start_move); hdr.bind("<B1-Motion>", self.do_move)
         self._offsetx = 0; self._offsety = 0
 
+    def build_statusbar(self):
+        bar = tk.Frame(self, bg=CARD_BG); bar.pack(fill='x', side='bottom')
+        self.lbl_status = tk.Label(bar, text="Siap", bg=CARD_BG, fg=COLOR_TEXT, font=("Segoe UI", 9)); self.lbl_status.pack(side='left', padx=12, pady=2)
+        self.btn_cancel_exports = ttk.Button(bar, text="Batalkan Export", command=lambda: self.exports.cancel_all())
+        self.status_bar = ttk.Progressbar(bar, mode='indeterminate', length=160)
+
+    def set_status(self, text, busy=False):
+        self.lbl_status.config(text=text)
+        if busy and not self.status_bar.winfo_ismapped():
+            self.btn_cancel_exports.pack(side='right', padx=8); self.status_bar.pack(side='right', padx=8); self.status_bar.start(60)
+        elif not busy and self.status_bar.winfo_ismapped():
+            self.status_bar.stop(); self.status_bar.pack_forget(); self.btn_cancel_exports.pack_forget()
+
+    def show_diagnostics(self):
+        if self._diagnostics is not None and self._diagnostics.winfo_exists():
+            self._diagnostics.lift(); return
+        self._diagnostics = DiagnosticsWindow(self)
+
     def start_move(self, event): self._offsetx = event.x; self._offsety = event.y
     def do_move(self, event):
         if not self._is_fullscreen:
@@ -261,6 +387,11 @@ class MainApp(tk.Tk):
         self.nb.add(self.tab_trial_adj, text="Neraca Setelah Penyesuaian")
         self.nb.add(self.tab_reports, text="Laporan Keuangan")
         self.nb.add(self.tab_dashboard, text="Dashboard")
+        self._tab_names = {str(self.tab_accounts): 'accounts', str(self.tab_journal): 'journal',
+                           str(self.tab_ledger): 'ledger', str(self.tab_trial): 'trial',
+                           str(self.tab_adjust): 'adjust', str(self.tab_trial_adj): 'trial_adj',
+                           str(self.tab_reports): 'reports', str(self.tab_dashboard): 'dashboard'}
+        self.nb.bind("<<NotebookTabChanged>>", lambda e: self.refresh_visible())
         # build tabs
         self.build_accounts_tab(); self.build_journal_tab(); self.build_ledger_tab()
         self.build_trial_tab(); self.build_adjust_tab(); self.build_trial_adj_tab(); self.build_reports_tab(); self.build_dashboard_tab()
@@ -286,7 +417,7 @@ class MainApp(tk.Tk):
         if d.result:
             no,nama,tipe,sb = d.result
             try:
-                add_account_db(no,nama,tipe,sb); messagebox.showinfo("Sukses","Akun ditambahkan"); self.debounce_refresh()
+                add_account_db(no,nama,tipe,sb); messagebox.showinfo("Sukses","Akun ditambahkan"); self.debounce_refresh(tables=('akun',))
             except Exception as e: messagebox.showerror("Error", str(e))
 
     def ui_edit_account(self):
@@ -302,7 +433,7 @@ class MainApp(tk.Tk):
         if d.result:
             _, nama, tipe, sb = d.result
             try:
-                edit_account_db(no,nama,tipe,sb); messagebox.showinfo("Sukses","Akun diupdate"); self.debounce_refresh()
+                edit_account_db(no,nama,tipe,sb); messagebox.showinfo("Sukses","Akun diupdate"); self.debounce_refresh(tables=('akun',))
             except Exception as e: messagebox.showerror("Error", str(e))
 
     def ui_delete_account(self):
@@ -311,7 +442,7 @@ class MainApp(tk.Tk):
         vals = self.tree_accounts.item(sel[0])['values']; no = vals[0]
         if messagebox.askyesno("Konfirmasi", f"Hapus akun {no} - {vals[1]} ?"):
             try:
-                delete_account_db(no); messagebox.showinfo("Sukses","Akun dihapus"); self.debounce_refresh()
+                delete_account_db(no); messagebox.showinfo("Sukses","Akun dihapus"); self.debounce_refresh(tables=('akun',))
             except Exception as e: messagebox.showerror("Error", str(e))
 
     # Journal
@@ -319,13 +450,17 @@ class MainApp(tk.Tk):
         top = ttk.Frame(self.tab_journal); top.pack(fill='x', pady=6)
         ttk.Label(top, text="Jurnal Umum", style='Header.TLabel').pack(side='left', padx=8)
         ttk.Button(top, text="Tambah Jurnal", command=self.ui_add_journal).pack(side='right', padx=6)
+        ttk.Button(top, text="Jurnal Majemuk", command=self.ui_add_compound_journal).pack(side='right', padx=6)
         ttk.Button(top, text="Hapus Jurnal", command=self.ui_delete_journal).pack(side='right', padx=6)
         ttk.Button(top, text="Export Jurnal ke Excel", command=self.export_journal_excel).pack(side='right', padx=6)
+        ttk.Button(top, text="Import Jurnal (CSV/Excel)", command=self.ui_import_journal).pack(side='right', padx=6)
         cols = ("ID","Tanggal","Akun Debit","Akun Kredit","Debit","Kredit","Keterangan")
-        self.tree_journal = ttk.Treeview(self.tab_journal, columns=cols, show='headings', height=18)
+        # virtual grid: only the visible window of the journal is loaded
+        self.journal_grid = JournalGrid(self.tab_journal, cols, height=18)
+        self.tree_journal = self.journal_grid.tree
         for c in cols:
             self.tree_journal.heading(c, text=c); self.tree_journal.column(c, width=120 if c!="Keterangan" else 360)
-        self.tree_journal.pack(fill='both', expand=True, padx=12, pady=8)
+        self.journal_grid.pack(fill='both', expand=True, padx=12, pady=8)
 
     def ui_add_journal(self):
         accs = list_accounts()
@@ -336,7 +471,20 @@ class MainApp(tk.Tk):
             tanggal, debit_acc, credit_acc, debit_val, credit_val, ket = d.result
             try:
                 add_journal_db(tanggal, debit_acc, credit_acc, debit_val, credit_val, ket)
-                messagebox.showinfo("Sukses","Jurnal disimpan"); self.debounce_refresh()
+                messagebox.showinfo("Sukses","Jurnal disimpan"); self.debounce_refresh(tables=('jurnal',))
+            except Exception as e:
+                messagebox.showerror("Error", str(e))
+
+    def ui_add_compound_journal(self):
+        accs = list_accounts()
+        if not accs:
+            messagebox.showinfo("Info","Belum ada akun. Tambahkan akun dulu di tab Akun."); return
+        d = CompoundJournalDialog(self, accs); self.wait_window(d)
+        if d.result:
+            tanggal, ket, lines = d.result
+            try:
+                post_journal_entry(tanggal, ket, lines)
+                messagebox.showinfo("Sukses", f"Jurnal majemuk ({len(lines)} baris) disimpan"); self.debounce_refresh(tables=('jurnal',))
             except Exception as e:
                 messagebox.showerror("Error", str(e))
 
@@ -344,10 +492,34 @@ class MainApp(tk.Tk):
         sel = self.tree_journal.selection()
         if not sel: messagebox.showinfo("Info","Pilih jurnal untuk dihapus"); return
         ids = [self.tree_journal.item(s)['values'][0] for s in sel]
-        for _id in ids:
-            delete_journal_db(_id)
-        messagebox.showinfo("Sukses", f"{len(ids)} jurnal dihapus")
-        self.debounce_refresh()
+        try:
+            for _id in ids:
+                delete_journal_db(_id)
+        except ValueError as e:
+            # closed period
+            messagebox.showerror("Error", str(e))
+        else:
+            messagebox.showinfo("Sukses", f"{len(ids)} jurnal dihapus")
+        self.debounce_refresh(tables=('jurnal',))
+
+    def ui_import_journal(self):
+        path = filedialog.askopenfilename(filetypes=[("CSV / Excel","*.csv *.xlsx"), ("Semua file","*.*")])
+        if not path: return
+        dlg = ProgressDialog(self, "Import Jurnal")
+        def progress(res):
+            # worker thread -> Tk thread
+            self.bg.post(dlg.set_status, f"{res.rows_read:,} baris dibaca, {res.inserted:,} disimpan, "
+                                         f"{len(res.errors):,} gagal ({res.rows_read / max(res.elapsed, 1e-6):,.0f} baris/detik)")
+        def done(res):
+            dlg.destroy(); self.debounce_refresh(tables=('jurnal',))
+            messagebox.showinfo("Import Jurnal", res.summary())
+            if res.errors and messagebox.askyesno("Import Jurnal", "Simpan laporan baris yang gagal?"):
+                report = filedialog.asksaveasfilename(defaultextension=".csv", filetypes=[("CSV files","*.csv")])
+                if report: write_error_report(report, res)
+        def failed(e):
+            dlg.destroy(); self.debounce_refresh(tables=('jurnal',)); messagebox.showerror("Error", str(e))
+        self.bg.submit(lambda: import_journal(path, progress=progress, cancelled=dlg.cancelled.is_set),
+                       on_done=done, on_error=failed)
 
     # Ledger
     def build_ledger_tab(self):
@@ -368,27 +540,10 @@ class MainApp(tk.Tk):
         if not sel:
             messagebox.showinfo("Info","Pilih akun"); return
         no = sel.split(" - ",1)[0].strip()
-        rows = []
-        for r in list_journal_entries():
-            _id,tanggal,ad,ak,d,k,ket = r
-            if ad==no or ak==no:
-                rows.append(r)
         for r in self.tree_ledger_account.get_children(): self.tree_ledger_account.delete(r)
-        # compute starting balance
-        bal = to_decimal('0')
-        for a in list_accounts():
-            if a[0] == no:
-                sb = to_decimal(a[3]); t = (a[2] or "").lower()
-                if t in ('asset','aset','expense','beban','cost'):
-                    bal = sb
-                else:
-                    bal = -sb
-                break
-        for _id,tanggal,ad,ak,d,k,ket in rows:
-            if ad == no:
-                bal += to_decimal(d); debit = f"{d:,.2f}"; kredit = ""
-            else:
-                bal -= to_decimal(k); debit = ""; kredit = f"{k:,.2f}"
+        for tanggal,_id,ket,d,k,bal in ledger_for_account(no):
+            debit = f"{d:,.2f}" if d is not None else ""
+            kredit = f"{k:,.2f}" if k is not None else ""
             self.tree_ledger_account.insert("", "end", values=(tanggal, _id, ket, debit, kredit, f"{bal:,.2f}"))
 
     # Trial (before)
@@ -396,12 +551,60 @@ class MainApp(tk.Tk):
         top = ttk.Frame(self.tab_trial); top.pack(fill='x', pady=6)
         ttk.Label(top, text="Neraca Saldo (Sebelum Penyesuaian)", style='Header.TLabel').pack(side='left', padx=8)
         ttk.Button(top, text="Export Neraca ke Excel", command=lambda: self.export_trial_excel(False)).pack(side='right', padx=8)
+        ttk.Button(top, text="Buka Periode Terakhir", command=self.ui_reopen_period).pack(side='right', padx=6)
+        ttk.Button(top, text="Tutup Periode...", command=self.ui_close_period).pack(side='right', padx=6)
+        self.build_period_bar(self.tab_trial, 'trial')
         cols = ("No Akun","Nama Akun","Tipe","Debit","Kredit")
         self.tree_trial = ttk.Treeview(self.tab_trial, columns=cols, show='headings', height=18)
         for c in cols:
             self.tree_trial.heading(c, text=c); self.tree_trial.column(c, width=140 if c!="Nama Akun" else 360)
         self.tree_trial.pack(fill='both', expand=True, padx=12, pady=8)
 
+    # Dari/Sampai filter of a trial or report tab: Sampai alone = balances on that date,
+    # both = that period's movements only (the income statement for reports)
+    def build_period_bar(self, parent, tab):
+        bar = ttk.Frame(parent); bar.pack(fill='x', padx=8)
+        ttk.Label(bar, text="Dari (YYYY-MM-DD)").pack(side='left', padx=4)
+        ent_from = ttk.Entry(bar, width=12); ent_from.pack(side='left', padx=4)
+        ttk.Label(bar, text="Sampai").pack(side='left', padx=4)
+        ent_to = ttk.Entry(bar, width=12); ent_to.pack(side='left', padx=4)
+        def clear():
+            ent_from.delete(0, 'end'); ent_to.delete(0, 'end')
+            self.set_period(tab, None, None)
+        ttk.Button(bar, text="Terapkan", command=lambda: self.set_period(tab, ent_from.get().strip(), ent_to.get().strip())).pack(side='left', padx=6)
+        ttk.Button(bar, text="Semua", command=clear).pack(side='left', padx=2)
+
+    def set_period(self, tab, date_from, date_to):
+        try:
+            period = period_args(date_from=date_from, date_to=date_to)
+        except ValueError as e:
+            messagebox.showerror("Error", str(e)); return
+        if period != self._periods[tab]:
+            self._periods[tab] = period
+            self._dirty.add(tab)
+            self.refresh_visible()
+
+    def ui_close_period(self):
+        closed = closed_through()
+        note = f"Periode sampai {closed} sudah ditutup.\n" if closed else ""
+        date_to = simpledialog.askstring("Tutup Periode", note + "Tutup buku sampai tanggal (YYYY-MM-DD):", parent=self)
+        if not date_to: return
+        if not messagebox.askyesno("Tutup Periode", f"Jurnal sampai {date_to.strip()} tidak dapat diubah lagi setelah ditutup. Lanjutkan?"):
+            return
+        try:
+            close_period(date_to.strip())
+            messagebox.showinfo("Sukses", f"Periode sampai {date_to.strip()} ditutup")
+        except Exception as e:
+            messagebox.showerror("Error", str(e))
+
+    def ui_reopen_period(self):
+        closed = closed_through()
+        if not closed:
+            messagebox.showinfo("Info", "Belum ada periode yang ditutup"); return
+        if messagebox.askyesno("Buka Periode", f"Buka kembali periode sampai {closed}?"):
+            reopen_last_period()
+            messagebox.showinfo("Sukses", f"Periode sampai {closed} dibuka kembali")
+
     # Adjust tab (table for adjustments)
     def build_adjust_tab(self):
         top = ttk.Frame(self.tab_adjust); top.pack(fill='x', pady=6)
@@ -421,6 +624,7 @@ class MainApp(tk.Tk):
         top = ttk.Frame(self.tab_trial_adj); top.pack(fill='x', pady=6)
         ttk.Label(top, text="Neraca Saldo Setelah Penyesuaian", style='Header.TLabel').pack(side='left', padx=8)
         ttk.Button(top, text="Export Neraca Penyesuaian ke Excel", command=lambda: self.export_trial_excel(True)).pack(side='right', padx=8)
+        self.build_period_bar(self.tab_trial_adj, 'trial_adj')
         cols = ("No Akun","Nama Akun","Tipe","Debit","Kredit")
         self.tree_trial_adj = ttk.Treeview(self.tab_trial_adj, columns=cols, show='headings', height=18)
         for c in cols:
@@ -433,6 +637,7 @@ class MainApp(tk.Tk):
         ttk.Label(top, text="Laporan Keuangan (Setelah Penyesuaian)", style='Header.TLabel').pack(side='left', padx=8)
         ttk.Button(top, text="Export Laporan ke Excel", command=self.export_reports_excel).pack(side='right', padx=6)
         ttk.Button(top, text="Export Laporan ke PDF", command=self.export_reports_pdf).pack(side='right', padx=6)
+        self.build_period_bar(self.tab_reports, 'reports')
         frame = ttk.Frame(self.tab_reports); frame.pack(fill='both', expand=True, padx=12, pady=8)
         left = ttk.Frame(frame); left.pack(side='left', fill='both', expand=True, padx=6)
         mid = ttk.Frame(frame); mid.pack(side='left', fill='both', expand=True, padx=6)
@@ -471,82 +676,125 @@ class MainApp(tk.Tk):
         self.card3 = tk.Frame(cards_frame, bg=CARD_BG, bd=1, relief='flat'); self.card3.pack(side='left', fill='both', expand=True, padx=8, pady=8)
         tk.Label(self.card3, text="Solvabilitas (Debt-to-Equity)", bg=CARD_BG, fg=COLOR_PRIMARY, font=("Segoe UI", 12, "bold")).pack(anchor='nw', padx=12, pady=8)
         self.canvas3 = None
-        if plt and FigureCanvasTkAgg:
-            self.fig1 = plt.Figure(figsize=(4,2)); self.ax1 = self.fig1.add_subplot(111)
-            self.canvas1 = FigureCanvasTkAgg(self.fig1, master=self.card1); self.canvas1.get_tk_widget().pack(fill='both', expand=True, padx=8, pady=6)
-            self.fig2 = plt.Figure(figsize=(4,2)); self.ax2 = self.fig2.add_subplot(111)
-            self.canvas2 = FigureCanvasTkAgg(self.fig2, master=self.card2); self.canvas2.get_tk_widget().pack(fill='both', expand=True, padx=8, pady=6)
-            self.fig3 = plt.Figure(figsize=(4,2)); self.ax3 = self.fig3.add_subplot(111)
-            self.canvas3 = FigureCanvasTkAgg(self.fig3, master=self.card3); self.canvas3.get_tk_widget().pack(fill='both', expand=True, padx=8, pady=6)
-        else:
-            tk.Label(self.card1, text="matplotlib tidak tersedia", bg=CARD_BG).pack()
-            tk.Label(self.card2, text="matplotlib tidak tersedia", bg=CARD_BG).pack()
-            tk.Label(self.card3, text="matplotlib tidak tersedia", bg=CARD_BG).pack()
-
-    # Debounced refresh to avoid UI lag
-    def debounce_refresh(self, delay=0.15):
+        # charts are created by draw_dashboard() the first time the tab is shown
+        self._charts_built = False
+
+    def _build_charts(self):
+        # matplotlib is only imported here, not at startup
+        self._charts_built = True
+        backend = chart_backend()
+        if backend is None:
+            for card in (self.card1, self.card2, self.card3):
+                tk.Label(card, text="matplotlib tidak tersedia", bg=CARD_BG).pack()
+            return
+        Figure, FigureCanvasTkAgg = backend
+        self.fig1 = Figure(figsize=(4,2)); self.ax1 = self.fig1.add_subplot(111)
+        self.canvas1 = FigureCanvasTkAgg(self.fig1, master=self.card1); self.canvas1.get_tk_widget().pack(fill='both', expand=True, padx=8, pady=6)
+        self.fig2 = Figure(figsize=(4,2)); self.ax2 = self.fig2.add_subplot(111)
+        self.canvas2 = FigureCanvasTkAgg(self.fig2, master=self.card2); self.canvas2.get_tk_widget().pack(fill='both', expand=True, padx=8, pady=6)
+        self.fig3 = Figure(figsize=(4,2)); self.ax3 = self.fig3.add_subplot(111)
+        self.canvas3 = FigureCanvasTkAgg(self.fig3, master=self.card3); self.canvas3.get_tk_widget().pack(fill='both', expand=True, padx=8, pady=6)
+
+    # Debounced refresh to avoid UI lag. `tables` are the tables a write touched;
+    # the tabs showing them are marked dirty, only the visible one reloads now.
+    def debounce_refresh(self, delay=0.15, tables=None):
+        self.mark_dirty(tables)
         if self._debounce_timer:
             self.after_cancel(self._debounce_timer)
-        self._debounce_timer = self.after(int(delay*1000), self.refresh_all)
+        self._debounce_timer = self.after(int(delay*1000), self.refresh_visible)
 
-    # Refresh all (safe)
+    def mark_dirty(self, tables=None):
+        if tables is None:
+            self._dirty.update(ALL_TABS)
+        else:
+            for t in tables:
+                self._dirty.update(TAB_DEPENDENCIES.get(t, ALL_TABS))
+
+    # Refresh all (safe): everything is marked dirty, hidden tabs reload when shown
     def refresh_all(self):
-        with self._refresh_lock:
-            try:
-                # accounts
-                for r in self.tree_accounts.get_children(): self.tree_accounts.delete(r)
-                for no,nm,tipe,sb in list_accounts(): self.tree_accounts.insert("", "end", values=(no,nm,tipe, f"{to_decimal(sb):,.2f}"))
-                # journal
-                for r in self.tree_journal.get_children(): self.tree_journal.delete(r)
-                for id_,tgl,ad,ak,d,k,ket in list_journal_entries(): self.tree_journal.insert("", "end", values=(id_, tgl, ad, ak, f"{d:,.2f}", f"{k:,.2f}", ket))
-                # adjusting
-                if hasattr(self, 'tree_adjust'):
-                    for r in self.tree_adjust.get_children(): self.tree_adjust.delete(r)
-                    for id_,tgl,ad,ak,d,k,ket,ap in list_adjusting_entries(include_applied=True):
-                        self.tree_adjust.insert("", "end", values=(id_, tgl, ad, ak, f"{d:,.2f}", f"{k:,.2f}", ket, ap))
-                # trial (before)
-                for r in self.tree_trial.get_children(): self.tree_trial.delete(r)
-                for no,nm,tipe,d,c in compute_trial_rows(): self.tree_trial.insert("", "end", values=(no,nm,tipe, f"{d:,.2f}", f"{c:,.2f}"))
-                # trial adjusted (virtual)
-                for r in self.tree_trial_adj.get_children(): self.tree_trial_adj.delete(r)
-                for no,nm,tipe,d,c in compute_trial_rows(include_adjustments=True): self.tree_trial_adj.insert("", "end", values=(no,nm,tipe, f"{d:,.2f}", f"{c:,.2f}"))
-                # ledger combo
-                if hasattr(self, 'combo_ledger_accounts'):
-                    self.combo_ledger_accounts['values'] = [f"{a[0]} - {a[1]}" for a in list_accounts()]
-                # reports
-                self.refresh_reports()
-                # dashboard
-                self.draw_dashboard()
-            except Exception as e:
-                # UI should not crash
-                print("Error during refresh_all:", e)
+        self.mark_dirty()
+        self.refresh_visible()
 
-    def refresh_reports(self):
+    def current_tab(self):
         try:
-            inc, bal, eqrec = compute_financial_statements(include_adjustments=True)
-            # income
-            for r in self.tree_income.get_children(): self.tree_income.delete(r)
-            for no,nm,amt in inc['revenues']: self.tree_income.insert("", "end", values=("Pendapatan", no, nm, f"{amt:,.2f}"))
-            self.tree_income.insert("", "end", values=("","", "Total Pendapatan", f"{inc['total_revenue']:,.2f}"))
-            for no,nm,amt in inc['expenses']: self.tree_income.insert("", "end", values=("Beban", no, nm, f"{amt:,.2f}"))
-            self.tree_income.insert("", "end", values=("","", "Total Beban", f"{inc['total_expense']:,.2f}"))
-            self.tree_income.insert("", "end", values=("","", "Laba (Rugi) Bersih", f"{inc['net_income']:,.2f}"))
+            return self._tab_names.get(str(self.nb.select()))
+        except Exception:
+            return None
+
+    def refresh_visible(self):
+        self._debounce_timer = None
+        tab = self.current_tab()
+        if tab not in self._dirty:
+            return
+        self._dirty.discard(tab)
+        # load in the background, apply on the Tk thread; a newer load of the same
+        # tab cancels one still running, so only the latest result is shown
+        def failed(e):
+            self._dirty.add(tab)
+            print("Error during refresh:", e)
+        self.bg.submit(load_tab, tab, self._periods.get(tab, (None, None)), key=f"tab:{tab}", pass_job=True,
+                       on_done=lambda data: self._apply_tab(tab, data), on_error=failed)
+
+    def _apply_tab(self, tab, data):
+        try:
+            # trees are diffed by key (sync_tree), so unchanged rows cost nothing
+            if tab == 'accounts':
+                sync_tree(self.tree_accounts, data)
+            elif tab == 'journal':
+                self.journal_grid.refresh()
+            elif tab == 'ledger':
+                self.combo_ledger_accounts['values'] = data
+                if self.combo_ledger_accounts.get():
+                    self.refresh_ledger_for_account()
+            elif tab == 'adjust':
+                sync_tree(self.tree_adjust, data)
+            else:
+                snap, rows = data
+                if tab == 'trial':
+                    sync_tree(self.tree_trial, rows)
+                elif tab == 'trial_adj':
+                    sync_tree(self.tree_trial_adj, rows)
+                elif tab == 'reports':
+                    self.refresh_reports(snap)
+                elif tab == 'dashboard':
+                    self.draw_dashboard(snap)
+        except Exception as e:
+            # UI should not crash
+            self._dirty.add(tab)
+            print("Error during refresh:", e)
+
+    def destroy(self):
+        self.exports.close()
+        self.bg.close()
+        super().destroy()
+
+    def refresh_reports(self, snapshot=None):
+        try:
+            inc, bal, eqrec = (snapshot or build_snapshot()).adjusted.statements()
+            # income (keys: section + account, totals by name)
+            rows = [(f"rev:{no}", ("Pendapatan", no, nm, f"{amt:,.2f}")) for no,nm,amt in inc['revenues']]
+            rows.append(("total_revenue", ("","", "Total Pendapatan", f"{inc['total_revenue']:,.2f}")))
+            rows += [(f"exp:{no}", ("Beban", no, nm, f"{amt:,.2f}")) for no,nm,amt in inc['expenses']]
+            rows.append(("total_expense", ("","", "Total Beban", f"{inc['total_expense']:,.2f}")))
+            rows.append(("net_income", ("","", "Laba (Rugi) Bersih", f"{inc['net_income']:,.2f}")))
+            sync_tree(self.tree_income, rows)
             # equity
-            for r in self.tree_equity.get_children(): self.tree_equity.delete(r)
-            for label, amt in eqrec: self.tree_equity.insert("", "end", values=(label, f"{amt:,.2f}"))
+            sync_tree(self.tree_equity, ((f"eq:{i}", (label, f"{amt:,.2f}")) for i, (label, amt) in enumerate(eqrec)))
             # balance
-            for r in self.tree_balance.get_children(): self.tree_balance.delete(r)
-            for no,nm,amt in bal['assets']: self.tree_balance.insert("", "end", values=("Aset", no, nm, f"{amt:,.2f}"))
-            self.tree_balance.insert("", "end", values=("", "", "Total Aset", f"{bal['total_assets']:,.2f}"))
-            for no,nm,amt in bal['liabilities']: self.tree_balance.insert("", "end", values=("Kewajiban", no, nm, f"{amt:,.2f}"))
-            for no,nm,amt in bal['equity']: self.tree_balance.insert("", "end", values=("Ekuitas", no, nm, f"{amt:,.2f}"))
-            self.tree_balance.insert("", "end", values=("", "", "Total Kewajiban + Ekuitas", f"{(bal['total_liabilities'] + bal['total_equity']):,.2f}"))
+            rows = [(f"asset:{no}", ("Aset", no, nm, f"{amt:,.2f}")) for no,nm,amt in bal['assets']]
+            rows.append(("total_assets", ("", "", "Total Aset", f"{bal['total_assets']:,.2f}")))
+            rows += [(f"liab:{no}", ("Kewajiban", no, nm, f"{amt:,.2f}")) for no,nm,amt in bal['liabilities']]
+            rows += [(f"equity:{no}", ("Ekuitas", no, nm, f"{amt:,.2f}")) for no,nm,amt in bal['equity']]
+            rows.append(("total_le", ("", "", "Total Kewajiban + Ekuitas", f"{(bal['total_liabilities'] + bal['total_equity']):,.2f}")))
+            sync_tree(self.tree_balance, rows)
         except Exception as e:
             print("Error refresh_reports:", e)
 
-    def draw_dashboard(self):
+    def draw_dashboard(self, snapshot=None):
+        if not self._charts_built:
+            self._build_charts()
         try:
-            stats = prepare_balance_and_ratios(include_adjustments=False)
+            stats = (snapshot or build_snapshot()).base.ratios
             aset = float(stats['assets']); liab = float(stats['liabilities'])
             if self.canvas1:
                 self.ax1.clear(); self.ax1.bar(['Aset','Kewajiban'], [aset, liab], color=[COLOR_PRIMARY, COLOR_ACCENT]); self.canvas1.draw()
@@ -565,41 +813,48 @@ class MainApp(tk.Tk):
         except Exception as e:
             print("Error draw_dashboard:", e)
 
-    # Export wrappers
+    # Export wrappers: queued on the export manager, progress in the status bar
+    def _run_export(self, title, export, path, **kwargs):
+        self.exports.submit(title, export, path, **kwargs)
+
+    def _export_done(self, title, path, reused):
+        self.set_status(f"{title} selesai: {path}" + (" (dari hasil sebelumnya)" if reused else ""), False)
+        messagebox.showinfo("Sukses", f"{title} disimpan ke {path}")
+
+    def _export_failed(self, title, e):
+        self.set_status(f"{title} gagal", False)
+        messagebox.showerror("Error", str(e))
+
     def export_trial_excel(self, include_adjustments=False):
         path = filedialog.asksaveasfilename(defaultextension=".xlsx", filetypes=[("Excel files","*.xlsx")])
         if not path: return
-        try:
-            export_trial_to_excel(path, include_adjustments); messagebox.showinfo("Sukses","Neraca disimpan.")
-        except Exception as e: messagebox.showerror("Error", str(e))
+        date_from, date_to = self._periods['trial_adj' if include_adjustments else 'trial']
+        self._run_export("Export Neraca", export_trial_to_excel, path, include_adjustments=include_adjustments,
+                         date_from=date_from, date_to=date_to)
 
     def export_journal_excel(self):
         path = filedialog.asksaveasfilename(defaultextension=".xlsx", filetypes=[("Excel files","*.xlsx")])
         if not path: return
-        try:
-            export_journal_to_excel(path); messagebox.showinfo("Sukses","Jurnal disimpan.")
-        except Exception as e: messagebox.showerror("Error", str(e))
+        self._run_export("Export Jurnal", export_journal_to_excel, path)
 
     def export_adjust_excel(self):
         path = filedialog.asksaveasfilename(defaultextension=".xlsx", filetypes=[("Excel files","*.xlsx")])
         if not path: return
-        try:
-            export_adjusting_to_excel(path); messagebox.showinfo("Sukses","Penyesuaian disimpan.")
-        except Exception as e: messagebox.showerror("Error", str(e))
+        self._run_export("Export Penyesuaian", export_adjusting_to_excel, path)
 
     def export_reports_pdf(self):
         path = filedialog.asksaveasfilename(defaultextension=".pdf", filetypes=[("PDF files","*.pdf")])
         if not path: return
-        try:
-            export_reports_to_pdf(path, include_adjustments=True); messagebox.showinfo("Sukses","Laporan PDF disimpan.")
-        except Exception as e: messagebox.showerror("Error", str(e))
+        date_from, date_to = self._periods['reports']
+        self._run_export("Export Laporan PDF", export_reports_to_pdf, path, include_adjustments=True,
+                         date_from=date_from, date_to=date_to)
 
     def export_reports_excel(self):
         path = filedialog.asksaveasfilename(defaultextension=".xlsx", filetypes=[("Excel files","*.xlsx")])
         if not path: return
-        try:
-            export_reports_to_excel(path, include_adjustments=True); messagebox.showinfo("Sukses","Laporan Excel disimpan.")
-        except Exception as e: messagebox.showerror("Error", str(e))
+        date_from, date_to = self._periods['reports']
+        self._run_export("Export Laporan Excel", export_reports_to_excel, path, include_adjustments=True,
+                         date_from=date_from, date_to=date_to)
 
     # Adjust UI actions
     def ui_add_adjust(self):
@@ -611,7 +866,7 @@ class MainApp(tk.Tk):
             tanggal, debit_acc, credit_acc, debit_val, credit_val, ket = d.result
             try:
                 add_adjusting_db(tanggal, debit_acc, credit_acc, debit_val, credit_val, ket)
-                messagebox.showinfo("Sukses","Penyesuaian disimpan"); self.debounce_refresh()
+                messagebox.showinfo("Sukses","Penyesuaian disimpan"); self.debounce_refresh(tables=('adjusting',))
             except Exception as e:
                 messagebox.showerror("Error", str(e))
 
@@ -621,18 +876,14 @@ class MainApp(tk.Tk):
         ids = [self.tree_adjust.item(s)['values'][0] for s in sel]
         for _id in ids:
             delete_adjusting_db(_id)
-        messagebox.showinfo("Sukses", f"{len(ids)} penyesuaian dihapus"); self.debounce_refresh()
+        messagebox.showinfo("Sukses", f"{len(ids)} penyesuaian dihapus"); self.debounce_refresh(tables=('adjusting',))
 
     def ui_apply_adjustments(self):
-        # run apply in background to keep UI responsive
-        def worker():
-            try:
-                applied = apply_adjustments()
-                self.debounce_refresh()
-                messagebox.showinfo("Selesai", f"{applied} penyesuaian diterapkan ke jurnal (tanggal hari ini).")
-            except Exception as e:
-                messagebox.showerror("Error", str(e))
-        threading.Thread(target=worker, daemon=True).start()
+        # run apply in background to keep UI responsive; dialogs/refresh happen on the Tk thread
+        def done(result):
+            self.debounce_refresh(tables=('jurnal', 'adjusting'))
+            messagebox.showinfo("Selesai", f"{result.summary()}, tanggal hari ini.")
+        self.bg.submit(apply_adjustments, on_done=done, on_error=lambda e: messagebox.showerror("Error", str(e)))
 
     # Automation: run_cycle
     def run_cycle(self):
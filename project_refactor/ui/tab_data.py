@@ -0,0 +1,45 @@
+"""
+What each MainApp tab shows, computed without touching Tk, so it can run on a
+worker thread (and headless, e.g. in bench/bench_suite.py).
+"""
+from utils.helpers import to_decimal
+from core.accounting import list_accounts, list_adjusting_entries, build_snapshot
+
+# tabs that show data from each table; a write marks only these dirty
+ALL_TABS = ('accounts', 'journal', 'ledger', 'trial', 'adjust', 'trial_adj', 'reports', 'dashboard')
+TAB_DEPENDENCIES = {
+    'akun': ('accounts', 'ledger', 'trial', 'trial_adj', 'reports', 'dashboard'),
+    'jurnal': ('journal', 'ledger', 'trial', 'trial_adj', 'reports', 'dashboard'),
+    'adjusting': ('adjust', 'trial_adj', 'reports'),
+}
+
+
+# tabs with a period filter (Dari/Sampai); the dashboard always shows everything
+PERIOD_TABS = ('trial', 'trial_adj', 'reports')
+
+
+def load_tab(job, tab, period=(None, None)):
+    """
+    Rows (already formatted) for one tab; job.check() stops a superseded load.
+    period: (date_from, date_to) for the PERIOD_TABS, see build_snapshot().
+    """
+    trial = lambda rows: tuple((no, (no,nm,tipe, f"{d:,.2f}", f"{c:,.2f}")) for no,nm,tipe,d,c in rows)
+    if tab == 'accounts':
+        return tuple((no, (no,nm,tipe, f"{to_decimal(sb):,.2f}")) for no,nm,tipe,sb in list_accounts())
+    if tab == 'ledger':
+        return [f"{a[0]} - {a[1]}" for a in list_accounts()]
+    if tab == 'adjust':
+        return tuple((id_, (id_, tgl, ad, ak, f"{d:,.2f}", f"{k:,.2f}", ket, ap))
+                     for id_,tgl,ad,ak,d,k,ket,ap in list_adjusting_entries(include_applied=True))
+    if tab == 'journal':
+        # the grid reads its own page on the Tk thread (one indexed query)
+        return None
+    # one snapshot (cached per data version) feeds trials, reports, dashboard and exports
+    date_from, date_to = period if tab in PERIOD_TABS else (None, None)
+    snap = build_snapshot(date_from=date_from, date_to=date_to)
+    job.check()
+    if tab == 'trial':
+        return snap, trial(snap.base.trial_rows)
+    if tab == 'trial_adj':
+        return snap, trial(snap.adjusted.trial_rows)
+    return snap, None
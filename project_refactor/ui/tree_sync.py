@@ -0,0 +1,75 @@
+"""
+Keyed reconciliation for ttk.Treeview.
+
+Instead of deleting every row and inserting them all again, sync_tree() compares
+the wanted rows with what the tree showed last time and only issues the
+inserts, value updates, deletes and moves that differ. Rows are identified by a
+key (used as the Treeview iid), e.g. no_akun or the jurnal id.
+"""
+
+
+def _state(tree):
+    # values last written per iid; kept on the widget because Tk hands
+    # values back converted (numbers, stripped strings) and can't be compared
+    state = getattr(tree, '_sync_rows', None)
+    if state is None:
+        state = tree._sync_rows = {}
+    return state
+
+
+def sync_tree(tree, rows):
+    """
+    Make the top-level rows of `tree` equal to `rows`, an iterable of
+    (key, values) in display order. Keys must be unique. Returns a dict with the
+    number of rows inserted, updated, deleted and moved.
+    """
+    state = _state(tree)
+    wanted = [(str(key), tuple('' if v is None else str(v) for v in values)) for key, values in rows]
+    keys = {key for key, _ in wanted}
+    if len(keys) != len(wanted):
+        raise ValueError("Kunci baris Treeview tidak unik")
+    stats = {'inserted': 0, 'updated': 0, 'deleted': 0, 'moved': 0}
+
+    # rows that are gone (or were put there by someone else)
+    current = list(tree.get_children())
+    on_screen = set(current)
+    for iid in [iid for iid in state if iid not in on_screen]:
+        del state[iid]
+    stale = [iid for iid in current if iid not in keys or iid not in state]
+    if stale:
+        tree.delete(*stale)
+        for iid in stale:
+            state.pop(iid, None)
+        stats['deleted'] = len(stale)
+        stale = set(stale)
+        current = [iid for iid in current if iid not in stale]
+
+    # walk the wanted order; `current[j]` is the first surviving row not yet placed,
+    # which is always the one sitting at position i in the tree
+    placed = set()
+    j = 0
+    for i, (key, values) in enumerate(wanted):
+        while j < len(current) and current[j] in placed:
+            j += 1
+        if key not in state:
+            tree.insert("", i, iid=key, values=values)
+            stats['inserted'] += 1
+        else:
+            if j < len(current) and current[j] == key:
+                j += 1
+            else:
+                tree.move(key, "", i)
+                stats['moved'] += 1
+            if state[key] != values:
+                tree.item(key, values=values)
+                stats['updated'] += 1
+        state[key] = values
+        placed.add(key)
+    return stats
+
+
+def clear_tree(tree):
+    children = tree.get_children()
+    if children:
+        tree.delete(*children)
+    _state(tree).clear()
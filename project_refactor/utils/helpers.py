@@ -1,3 +1,9 @@
+import hashlib
+from decimal import Decimal, InvalidOperation, getcontext, ROUND_HALF_UP
+
+getcontext().prec = 28
+
+
 def hash_password(pw: str) -> str:
     return hashlib.sha256(pw.encode('utf-8')).hexdigest()
 
@@ -13,3 +19,28 @@ def moneyfmt(x):
         return f"{d:,.2f}"
     except Exception:
         return str(x)
+
+# Money is stored and aggregated as integer sen (1/100 rupiah); Decimal is only
+# produced at the presentation edge with from_cents().
+SEN_PER_UNIT = 100
+
+def to_cents(x):
+    """
+    Amount in rupiah (str/float/Decimal/int) -> int sen, rounded half-up.
+    None and "" mean no amount (0). Anything else must be a plain number with a
+    decimal point: "1.000.000", "1,5" or "abc" raise ValueError instead of being
+    guessed, since the separators depend on the locale.
+    """
+    if x is None or (isinstance(x, str) and not x.strip()):
+        return 0
+    try:
+        d = Decimal(str(x).strip())
+    except InvalidOperation:
+        raise ValueError(f"Nominal tidak valid: {x}")
+    if not d.is_finite():
+        raise ValueError(f"Nominal tidak valid: {x}")
+    return int((d * SEN_PER_UNIT).to_integral_value(ROUND_HALF_UP))
+
+def from_cents(c):
+    """int sen -> exact Decimal rupiah with two places."""
+    return Decimal(int(c or 0)).scaleb(-2)
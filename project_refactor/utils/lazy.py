@@ -0,0 +1,31 @@
+"""
+Optional heavy libraries (openpyxl, reportlab, matplotlib) imported on first
+use instead of at startup, so the login window and the CLI don't pay for them.
+"""
+import importlib
+
+
+def optional(name, package=None):
+    """
+    Import module `name` now (a no-op after the first time, Python caches it).
+    Raises RuntimeError("<package> tidak terpasang") when it is not installed,
+    the same error the exporters always raised.
+    """
+    try:
+        return importlib.import_module(name)
+    except ImportError:
+        raise RuntimeError(f"{package or name.split('.')[0]} tidak terpasang")
+
+
+def chart_backend():
+    """
+    (Figure, FigureCanvasTkAgg) for embedding charts in Tk, or None without
+    matplotlib. Uses matplotlib.figure directly; pyplot is not needed and
+    costs more to import.
+    """
+    try:
+        figure = optional("matplotlib.figure")
+        tkagg = optional("matplotlib.backends.backend_tkagg")
+    except RuntimeError:
+        return None
+    return figure.Figure, tkagg.FigureCanvasTkAgg